@@ -0,0 +1,205 @@
+# accounts/authentication.py
+"""
+JWT authentication that trusts role, department and manager claims.
+
+Tokens issued through ``ClaimsRefreshToken`` carry ``role``,
+``department_id``, ``manager_id`` and an ``auth_version`` stamp. While the
+stamp matches the user's current version, ``ClaimsJWTAuthentication`` returns
+a ``ClaimsUser`` proxy built from the token alone; the ``User`` row is loaded
+only when code touches an attribute the claims do not cover.
+
+``accounts.signals`` increments ``User.auth_version`` in the database when a
+user's role, manager, department or active flag changes, or they are deleted,
+in the same transaction as the change. Tokens with an older stamp fall back
+to the regular per-request lookup until the client refreshes, and the refresh
+endpoint re-stamps current claims. Versions are memoized in-process for
+``AUTH_CLAIMS['VERSION_TTL']`` seconds, which bounds how long another process
+may keep trusting outdated claims. Bulk ``update()`` calls on those fields
+must call ``bump_auth_version``.
+"""
+import copy
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Model
+from django.utils.functional import LazyObject, empty
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .models import User
+
+DEFAULTS = {
+    'VERSION_TTL': 5,  # seconds a process may reuse a user's auth version before reading it again
+    'MAX_ENTRIES': 10000,
+}
+CLAIM_FIELDS = ('role', 'department_id', 'manager_id')
+VERSION_CLAIM = 'auth_version'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'AUTH_CLAIMS', {})}
+
+
+class VersionCache:
+    """In-process TTL memo of ``User.auth_version`` (``None`` for missing users)"""
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        now = time.monotonic()
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+        version = User.objects.filter(pk=user_id).values_list('auth_version', flat=True).first()
+        config = get_config()
+        with self._lock:
+            if len(self._entries) >= config['MAX_ENTRIES']:
+                self._entries.clear()
+            self._entries[user_id] = (now + config['VERSION_TTL'], version)
+        return version
+
+    def forget(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+
+_versions = VersionCache()
+
+
+def get_auth_version(user_id):
+    return _versions.get(str(user_id))
+
+
+def bump_auth_version(user_id):
+    """Invalidate the claims of every token issued to ``user_id`` so far.
+
+    The increment is part of the caller's transaction, so it commits (or rolls
+    back) together with the change that made the claims stale.
+    """
+    User.objects.filter(pk=user_id).update(auth_version=F('auth_version') + 1)
+    transaction.on_commit(lambda: _versions.forget(str(user_id)))
+
+
+def user_claims(user):
+    claims = {field: getattr(user, field) for field in CLAIM_FIELDS}
+    # Tokens of inactive users get no stamp, so they always take the checked lookup
+    if user.is_active:
+        claims[VERSION_CLAIM] = user.auth_version
+    return claims
+
+
+class ClaimsRefreshToken(RefreshToken):
+    """Refresh token whose access tokens carry the user's claims"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        token.payload.update(user_claims(user))
+        return token
+
+
+class ClaimsUser(LazyObject):
+    """
+    Request user backed by token claims. ``pk``, ``role``, ``department_id``
+    and ``manager_id`` are answered from the token; anything else loads the
+    ``User`` row once, after which the loaded row answers everything.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    # Deactivation bumps the auth version, so claims are only trusted for active users
+    is_active = True
+    _meta = User._meta
+
+    def __init__(self, claims):
+        self.__dict__['_claims'] = claims
+        super().__init__()
+
+    def _setup(self):
+        self._wrapped = User.objects.get(pk=self._claims['pk'])
+
+    def __getattr__(self, name):
+        if self._wrapped is empty:
+            if name in self._claims:
+                return self._claims[name]
+            # Probes such as hasattr(value, 'resolve_expression') in the ORM fail without a query
+            if name != '_state' and not hasattr(User, name):
+                raise AttributeError(name)
+            self._setup()
+        return getattr(self._wrapped, name)
+
+    @property
+    def __class__(self):
+        # isinstance checks (e.g. queryset filters on request.user) must not load the row
+        return User
+
+    def __eq__(self, other):
+        return isinstance(other, Model) and other._meta.concrete_model is User and other.pk == self.pk
+
+    def __hash__(self):
+        return hash(self.pk)
+
+    def __bool__(self):
+        # ``request.user and request.user.is_authenticated`` must not load the row
+        return True
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            return ClaimsUser(dict(self._claims))
+        return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            return ClaimsUser(copy.deepcopy(self._claims, memo))
+        return copy.deepcopy(self._wrapped, memo)
+
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+
+    @property
+    def is_manager(self):
+        return self.role == 'manager'
+
+    @property
+    def is_employee(self):
+        return self.role == 'employee'
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that skips the user query while the token's claims are current"""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as error:
+            raise InvalidToken('Token contained no recognizable user identification') from error
+        if VERSION_CLAIM not in validated_token or validated_token[VERSION_CLAIM] != get_auth_version(user_id):
+            return super().get_user(validated_token)
+        claims = {field: validated_token.get(field) for field in CLAIM_FIELDS}
+        pk = User._meta.pk.to_python(user_id)
+        return ClaimsUser({**claims, 'pk': pk, 'id': pk})
+
+
+class ClaimsTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = ClaimsRefreshToken
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Re-stamps claims on refresh when the user's auth version has moved on"""
+    token_class = ClaimsRefreshToken
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user_id = access[api_settings.USER_ID_CLAIM]
+        if access.get(VERSION_CLAIM) != get_auth_version(user_id):
+            access.payload.update(user_claims(User.objects.get(pk=user_id)))
+            data['access'] = str(access)
+        return data
@@ -0,0 +1,129 @@
+# accounts/hashers.py
+"""
+Password hashing policy and a bounded pool for the hashing work.
+
+``TunedArgon2PasswordHasher`` takes its time/memory/parallelism costs from
+``settings.PASSWORD_HASHING``. Listing it first in ``PASSWORD_HASHERS`` makes
+it the active policy: Django's ``check_password`` re-encodes a user's hash on
+their next successful login whenever it was made by another hasher or with
+other costs, so changing the policy needs no migration.
+
+The pooled hashers run only the CPU-bound ``encode``/``verify`` calls on a
+process-wide thread pool of ``POOL_SIZE`` workers (argon2 and PBKDF2 release
+the GIL while hashing); database work stays on the request thread. At most
+``MAX_PENDING`` hashes may wait for a worker; beyond that, callers wait up
+to ``QUEUE_TIMEOUT`` seconds for room and then get ``HashingBusy`` (503), so a
+login storm is shed instead of piling up on every web worker. DRF views turn
+the exception into a 503 themselves; ``accounts.middleware.HashingBusyMiddleware``
+does the same for plain Django views such as the admin login.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import (
+    Argon2PasswordHasher, PBKDF2PasswordHasher, PBKDF2SHA1PasswordHasher, ScryptPasswordHasher,
+)
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+DEFAULTS = {
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,  # KiB
+    'ARGON2_PARALLELISM': 1,
+    'POOL_SIZE': None,  # defaults to the number of CPU cores
+    'MAX_PENDING': 64,
+    'QUEUE_TIMEOUT': 2.0,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'PASSWORD_HASHING', {})}
+
+
+class HashingBusy(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many sign-ins are in progress, please try again shortly.'
+    default_code = 'hashing_busy'
+    wait = 1  # seconds; sent as Retry-After
+
+
+class HashingPool:
+    """Thread pool with a bounded number of admitted hashing jobs"""
+
+    def __init__(self, size, max_pending, timeout):
+        self.size = size
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='password-hashing')
+        self._slots = threading.BoundedSemaphore(size + max_pending)
+        self._local = threading.local()
+
+    def _run(self, function, args):
+        self._local.inside = True
+        try:
+            return function(*args)
+        finally:
+            self._local.inside = False
+            self._slots.release()
+
+    def run(self, function, *args):
+        # Hashers calling each other (PBKDF2 verify encodes) stay on the worker
+        if getattr(self._local, 'inside', False):
+            return function(*args)
+        if not self._slots.acquire(timeout=self.timeout):
+            raise HashingBusy()
+        try:
+            future = self._executor.submit(self._run, function, args)
+        except BaseException:
+            self._slots.release()
+            raise
+        return future.result()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_hashing_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = get_config()
+                _pool = HashingPool(
+                    config['POOL_SIZE'] or os.cpu_count() or 1, config['MAX_PENDING'], config['QUEUE_TIMEOUT']
+                )
+    return _pool
+
+
+class PooledHasherMixin:
+    """Run a hasher's encode/verify on the shared hashing pool"""
+
+    def encode(self, password, salt, *args):
+        return get_hashing_pool().run(super().encode, password, salt, *args)
+
+    def verify(self, password, encoded):
+        return get_hashing_pool().run(super().verify, password, encoded)
+
+
+class TunedArgon2PasswordHasher(PooledHasherMixin, Argon2PasswordHasher):
+    """Argon2id with the costs configured in ``settings.PASSWORD_HASHING``"""
+
+    def __init__(self):
+        config = get_config()
+        self.time_cost = config['ARGON2_TIME_COST']
+        self.memory_cost = config['ARGON2_MEMORY_COST']
+        self.parallelism = config['ARGON2_PARALLELISM']
+
+
+class PooledPBKDF2PasswordHasher(PooledHasherMixin, PBKDF2PasswordHasher):
+    """Django's PBKDF2 on the hashing pool; verifies (and upgrades) existing hashes"""
+
+
+class PooledPBKDF2SHA1PasswordHasher(PooledHasherMixin, PBKDF2SHA1PasswordHasher):
+    """Django's PBKDF2-SHA1 on the hashing pool, for legacy hashes"""
+
+
+class PooledScryptPasswordHasher(PooledHasherMixin, ScryptPasswordHasher):
+    """Django's scrypt on the hashing pool, for legacy hashes"""
@@ -0,0 +1,85 @@
+# accounts/hierarchy.py
+"""
+Maintenance of the ``UserHierarchy`` closure table.
+
+Every user has a depth-0 row to themselves plus one row per manager above
+them, so "all descendants of X" and "is Y under X" are single lookups on the
+(ancestor, descendant) unique index. ``accounts.signals`` keeps the table in
+step with ``User.manager``: a change moves the user's whole subtree by
+deleting its links to the old chain and inserting the cross product with the
+new one. Bulk ``update(manager=...)`` calls bypass the signals; run
+``manage.py rebuild_hierarchy`` after those.
+"""
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import User, UserHierarchy
+
+BATCH_SIZE = 1000
+
+
+def would_create_cycle(user_id, manager_id):
+    """Whether making ``manager_id`` the manager of ``user_id`` would loop the chain"""
+    if manager_id is None or user_id is None:
+        return False
+    return manager_id == user_id or UserHierarchy.objects.filter(
+        ancestor_id=user_id, descendant_id=manager_id
+    ).exists()
+
+
+def validate_manager(user_id, manager_id):
+    if would_create_cycle(user_id, manager_id):
+        raise ValidationError({'manager': 'A user cannot report to themselves or to someone in their own team.'})
+
+
+def manager_ids_above(user_id):
+    """Ids of every manager in the chain above ``user_id``"""
+    return list(UserHierarchy.objects.filter(descendant_id=user_id, depth__gt=0).values_list('ancestor_id', flat=True))
+
+
+def move_subtree(user_id, manager_id):
+    """Re-link ``user_id`` and everyone under them beneath ``manager_id`` (or detach them)"""
+    with transaction.atomic():
+        UserHierarchy.objects.get_or_create(ancestor_id=user_id, descendant_id=user_id, defaults={'depth': 0})
+        subtree = list(UserHierarchy.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth'))
+        UserHierarchy.objects.filter(
+            descendant_id__in=[descendant for descendant, _ in subtree],
+            ancestor_id__in=manager_ids_above(user_id),
+        ).delete()
+        if manager_id is None:
+            return
+        chain = UserHierarchy.objects.filter(descendant_id=manager_id).values_list('ancestor_id', 'depth')
+        UserHierarchy.objects.bulk_create(
+            [
+                UserHierarchy(ancestor_id=ancestor, descendant_id=descendant, depth=above + below + 1)
+                for ancestor, above in chain
+                for descendant, below in subtree
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+
+def closure_rows(managers):
+    """``(ancestor, descendant, depth)`` rows for a ``{user_id: manager_id}`` mapping"""
+    for user_id in managers:
+        yield user_id, user_id, 0
+        seen = {user_id}
+        ancestor, depth = managers.get(user_id), 1
+        # Stop at broken links and at loops left behind by bulk updates
+        while ancestor is not None and ancestor in managers and ancestor not in seen:
+            yield ancestor, user_id, depth
+            seen.add(ancestor)
+            ancestor, depth = managers[ancestor], depth + 1
+
+
+def rebuild_hierarchy():
+    """Recompute the whole closure table from ``User.manager``; returns the row count"""
+    managers = dict(User.objects.values_list('id', 'manager_id'))
+    rows = [
+        UserHierarchy(ancestor_id=ancestor, descendant_id=descendant, depth=depth)
+        for ancestor, descendant, depth in closure_rows(managers)
+    ]
+    with transaction.atomic():
+        UserHierarchy.objects.all().delete()
+        UserHierarchy.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
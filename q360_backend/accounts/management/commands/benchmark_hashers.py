@@ -0,0 +1,56 @@
+# accounts/management/commands/benchmark_hashers.py
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import get_hashers
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.hashers import TunedArgon2PasswordHasher
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _verify_rate(hasher, encoded, duration):
+    """Verifications per second on the calling thread"""
+    count, started = 0, time.perf_counter()
+    while time.perf_counter() - started < duration:
+        hasher.verify(PASSWORD, encoded)
+        count += 1
+    return count / (time.perf_counter() - started)
+
+
+class Command(BaseCommand):
+    help = 'Measure password verifications (logins) per second for each configured hashing policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--duration', type=float, default=2.0, help='Seconds to measure each policy')
+        parser.add_argument('--threads', type=int, default=os.cpu_count() or 1,
+                            help='Concurrent logins for the aggregate figure')
+        parser.add_argument('--argon2', action='append', default=[], metavar='TIME,MEMORY_KIB,PARALLELISM',
+                            help='Extra argon2 cost variant to compare (repeatable)')
+
+    def handle(self, *args, **options):
+        policies = [(hasher.algorithm, hasher) for hasher in get_hashers()]
+        for variant in options['argon2']:
+            try:
+                time_cost, memory_cost, parallelism = (int(value) for value in variant.split(','))
+            except ValueError:
+                raise CommandError(f'--argon2 expects TIME,MEMORY_KIB,PARALLELISM, got {variant!r}')
+            hasher = TunedArgon2PasswordHasher()
+            hasher.time_cost, hasher.memory_cost, hasher.parallelism = time_cost, memory_cost, parallelism
+            policies.append((f'argon2 t={time_cost} m={memory_cost} p={parallelism}', hasher))
+
+        threads = options['threads']
+        self.stdout.write(f'{os.cpu_count()} cores, {threads} concurrent logins')
+        for name, hasher in policies:
+            encoded = hasher.encode(PASSWORD, hasher.salt())
+            per_core = _verify_rate(hasher, encoded, options['duration'])
+            with ThreadPoolExecutor(max_workers=threads) as executor:
+                total = sum(executor.map(
+                    lambda _: _verify_rate(hasher, encoded, options['duration']), range(threads)
+                ))
+            self.stdout.write(
+                f'{name:<32} {1000 / per_core:8.1f} ms/login  {per_core:8.1f} logins/s/core  '
+                f'{total:9.1f} logins/s with {threads} threads'
+            )
@@ -0,0 +1,10 @@
+# accounts/management/commands/rebuild_hierarchy.py
+from django.core.management.base import BaseCommand
+from accounts.hierarchy import rebuild_hierarchy
+
+class Command(BaseCommand):
+    help = 'Recompute the user hierarchy index from User.manager (e.g. after bulk updates)'
+
+    def handle(self, *args, **options):
+        rows = rebuild_hierarchy()
+        self.stdout.write(self.style.SUCCESS(f'Wrote {rows} hierarchy links'))
@@ -0,0 +1,24 @@
+# accounts/middleware.py
+from django.http import HttpResponse
+
+from .hashers import HashingBusy
+
+
+class HashingBusyMiddleware:
+    """
+    Answer ``HashingBusy`` raised outside DRF (e.g. the admin login) with a
+    503 instead of a server error; DRF views already handle it themselves.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_exception(self, request, exception):
+        if isinstance(exception, HashingBusy):
+            return HttpResponse(
+                str(exception.detail), status=exception.status_code,
+                content_type='text/plain; charset=utf-8', headers={'Retry-After': str(exception.wait)},
+            )
+        return None
@@ -0,0 +1,79 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_hierarchy(apps, schema_editor):
+    # Same walk as accounts.hierarchy.closure_rows, inlined so later edits there cannot change this migration
+    User = apps.get_model("accounts", "User")
+    UserHierarchy = apps.get_model("accounts", "UserHierarchy")
+    managers = dict(User.objects.values_list("id", "manager_id"))
+    rows = []
+    for user_id in managers:
+        rows.append(UserHierarchy(ancestor_id=user_id, descendant_id=user_id, depth=0))
+        seen = {user_id}
+        ancestor, depth = managers.get(user_id), 1
+        while ancestor is not None and ancestor in managers and ancestor not in seen:
+            rows.append(UserHierarchy(ancestor_id=ancestor, descendant_id=user_id, depth=depth))
+            seen.add(ancestor)
+            ancestor, depth = managers[ancestor], depth + 1
+    UserHierarchy.objects.bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0003_user_mfa_backup_codes_user_mfa_enabled_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="UserHierarchy",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("depth", models.PositiveIntegerField()),
+                (
+                    "ancestor",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="descendant_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+                (
+                    "descendant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="ancestor_links",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "User Hierarchy Link",
+                "verbose_name_plural": "User Hierarchy Links",
+                "indexes": [
+                    models.Index(
+                        fields=["descendant", "depth"], name="user_hierarchy_up_idx"
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="userhierarchy",
+            constraint=models.UniqueConstraint(
+                fields=("ancestor", "descendant"), name="user_hierarchy_unique"
+            ),
+        ),
+        migrations.RunPython(build_hierarchy, migrations.RunPython.noop),
+    ]
@@ -47,6 +47,9 @@ class User(AbstractUser):
     mfa_secret = models.CharField(max_length=100, blank=True)
     mfa_backup_codes = models.JSONField(default=list, blank=True)
     
+    # Bumped whenever token claims go stale (see accounts/authentication.py)
+    auth_version = models.PositiveIntegerField(default=0, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -55,6 +58,11 @@ class User(AbstractUser):
     def __str__(self):
         return f"{self.get_full_name() or self.username} ({self.get_role_display()})"
     
+    def clean(self):
+        super().clean()
+        from .hierarchy import validate_manager
+        validate_manager(self.pk, self.manager_id)
+    
     @property
     def is_admin(self):
         return self.role == 'admin'
@@ -73,6 +81,23 @@ class User(AbstractUser):
             return User.objects.filter(manager=self)
         return User.objects.none()
     
+    def get_descendants(self, max_depth=None):
+        """Everyone reporting to this user directly or indirectly (one indexed query)"""
+        links = UserHierarchy.objects.filter(ancestor=self, depth__gt=0)
+        if max_depth is not None:
+            links = links.filter(depth__lte=max_depth)
+        return User.objects.filter(pk__in=links.values('descendant_id'))
+    
+    def get_ancestors(self):
+        """This user's management chain, nearest manager first"""
+        return User.objects.filter(
+            descendant_links__descendant=self, descendant_links__depth__gt=0
+        ).order_by('descendant_links__depth')
+    
+    def is_ancestor_of(self, other):
+        """Whether ``other`` reports to this user at any level"""
+        return UserHierarchy.objects.filter(ancestor=self, descendant=other, depth__gt=0).exists()
+    
     def generate_email_verification_token(self):
         """Generate a unique token for email verification"""
         self.email_verification_token = get_random_string(50)
@@ -120,4 +145,24 @@ class User(AbstractUser):
             self.mfa_backup_codes.remove(code)
             self.save()
             return True
-        return False
\ No newline at end of file
+        return False
+
+
+class UserHierarchy(models.Model):
+    """Closure table of ``User.manager`` (see accounts/hierarchy.py)"""
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='descendant_links')
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name='ancestor_links')
+    depth = models.PositiveIntegerField()
+    
+    class Meta:
+        verbose_name = 'User Hierarchy Link'
+        verbose_name_plural = 'User Hierarchy Links'
+        constraints = [
+            models.UniqueConstraint(fields=['ancestor', 'descendant'], name='user_hierarchy_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['descendant', 'depth'], name='user_hierarchy_up_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
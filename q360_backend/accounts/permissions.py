@@ -1,19 +1,99 @@
 # accounts/permissions.py
-from rest_framework import permissions
+from django.utils.functional import cached_property
+from rest_framework import filters, permissions
+from .models import UserHierarchy
+
+class PermissionContext:
+    """
+    Role and reporting scope of a request's user, resolved once per request.
+
+    The subordinate id set is loaded lazily with one query on the hierarchy
+    index; ``scope`` filters querysets in SQL so list endpoints never check
+    rows one at a time.
+    """
+    def __init__(self, user):
+        self.user = user
+        self.is_authenticated = bool(user and user.is_authenticated)
+        self.user_id = user.pk if self.is_authenticated else None
+        self.role = user.role if self.is_authenticated else None
+        self.department_id = user.department_id if self.is_authenticated else None
+    
+    @property
+    def is_admin(self):
+        return self.role == 'admin'
+    
+    @property
+    def is_manager(self):
+        return self.role == 'manager'
+    
+    @cached_property
+    def subordinate_ids(self):
+        """Ids of everyone reporting to the user at any level"""
+        if not self.is_manager:
+            return frozenset()
+        return frozenset(UserHierarchy.objects.filter(ancestor_id=self.user_id, depth__gt=0).values_list(
+            'descendant_id', flat=True
+        ))
+    
+    def manages(self, user):
+        return getattr(user, 'pk', user) in self.subordinate_ids
+    
+    def can_access_user(self, user):
+        """Whether the user may see ``user``'s personal data"""
+        return self.is_admin or getattr(user, 'pk', user) == self.user_id or self.manages(user)
+    
+    def can_access_all(self, users):
+        """Whether the user may see every user in the ``users`` queryset (one query)"""
+        if self.is_admin:
+            return True
+        visible = self.scope(users.model.objects.all()).values('pk')
+        return not users.exclude(pk__in=visible).exists()
+    
+    def scope(self, queryset, user_field='pk'):
+        """Limit ``queryset`` to rows whose ``user_field`` the user may see"""
+        if not self.is_authenticated:
+            return queryset.none()
+        if self.is_admin:
+            return queryset
+        if self.is_manager:
+            # The depth-0 self row makes the subtree include the manager
+            subtree = UserHierarchy.objects.filter(ancestor_id=self.user_id).values('descendant_id')
+            return queryset.filter(**{f'{user_field}__in': subtree})
+        return queryset.filter(**{user_field: self.user_id})
+
+def get_permission_context(request):
+    """The request's ``PermissionContext``, built on first use"""
+    context = getattr(request, '_permission_context', None)
+    if context is None or context.user is not request.user:
+        context = PermissionContext(request.user)
+        request._permission_context = context
+    return context
+
+class ReportingScopeFilter(filters.BaseFilterBackend):
+    """
+    Filter backend limiting a view's queryset to users the requester may see.
+    Views name the user field with ``scope_field``; ``get_object`` goes through
+    the same filter, so out-of-scope objects are 404s.
+    """
+    def filter_queryset(self, request, queryset, view):
+        field = getattr(view, 'scope_field', None)
+        if field is None:
+            return queryset
+        return get_permission_context(request).scope(queryset, field)
 
 class IsAdmin(permissions.BasePermission):
     """
     Custom permission to only allow admin users to access the view.
     """
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.is_admin
+        return get_permission_context(request).is_admin
 
 class IsManager(permissions.BasePermission):
     """
     Custom permission to only allow managers to access the view.
     """
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.is_manager
+        return get_permission_context(request).is_manager
 
 class IsOwnerOrReadOnly(permissions.BasePermission):
     """
@@ -33,8 +113,9 @@ class IsManagerOfEmployee(permissions.BasePermission):
     Custom permission to only allow managers to access their team members' data.
     """
     def has_object_permission(self, request, view, obj):
-        # Check if the user is a manager and the object (employee) is in their team
-        if request.user.is_manager:
-            # Assuming obj is an employee/user object
-            return obj.manager == request.user
+        # Check if the user is a manager and the object (employee) is anywhere in their reporting subtree
+        context = get_permission_context(request)
+        if context.is_manager:
+            # Assuming obj is an employee/user object; the subtree is loaded once per request
+            return context.manages(obj)
         return False
\ No newline at end of file
@@ -1,5 +1,6 @@
 # accounts/serializers.py
 from rest_framework import serializers
+from q360.serializers import DynamicFieldsMixin
 from django.contrib.auth import authenticate
 from .models import User, Department
 
@@ -8,7 +9,7 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = '__all__'
 
-class UserSerializer(serializers.ModelSerializer):
+class UserSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     manager = serializers.StringRelatedField(read_only=True)
     
@@ -0,0 +1,53 @@
+# accounts/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete
+from django.dispatch import receiver
+from .authentication import CLAIM_FIELDS, bump_auth_version
+from .hierarchy import manager_ids_above, move_subtree, validate_manager
+from .models import User
+
+# Fields whose change invalidates issued token claims
+TRACKED_FIELDS = (*CLAIM_FIELDS, 'is_active')
+
+@receiver(pre_save, sender=User)
+def remember_previous(sender, instance, update_fields=None, **kwargs):
+    # Saves that touch none of the tracked fields (e.g. last_login) skip the lookup
+    if update_fields is not None and not {'role', 'department', 'manager', 'is_active'} & set(update_fields):
+        return
+    if instance.pk is None:
+        return
+    previous = User.objects.filter(pk=instance.pk).values(*TRACKED_FIELDS).first()
+    if previous is None:
+        return
+    if previous['manager_id'] != instance.manager_id:
+        validate_manager(instance.pk, instance.manager_id)
+        instance._previous_manager_id = previous['manager_id']
+        # The old chain, read before the move, for receivers such as reports.signals
+        instance._previous_manager_ids = manager_ids_above(instance.pk)
+    if any(previous[field] != getattr(instance, field) for field in TRACKED_FIELDS):
+        instance._claims_changed = True
+
+@receiver(post_save, sender=User)
+def update_hierarchy(sender, instance, created, **kwargs):
+    if created:
+        move_subtree(instance.pk, instance.manager_id)
+    elif hasattr(instance, '_previous_manager_id'):
+        del instance._previous_manager_id
+        move_subtree(instance.pk, instance.manager_id)
+
+@receiver(post_save, sender=User)
+def invalidate_claims(sender, instance, created, **kwargs):
+    if not created and instance.__dict__.pop('_claims_changed', False):
+        bump_auth_version(instance.pk)
+        # A later save() of this instance must not write the old version back
+        instance.refresh_from_db(fields=['auth_version'])
+
+@receiver(pre_delete, sender=User)
+def detach_subordinates(sender, instance, **kwargs):
+    # Deleting a manager nulls their reports' manager without save signals
+    subordinate_ids = list(User.objects.filter(manager=instance).values_list('pk', flat=True))
+    for subordinate_id in subordinate_ids:
+        move_subtree(subordinate_id, None)
+    # Reports whose manager claim is about to be nulled need fresh lookups; deleted
+    # users have no version left to match, so their tokens take the checked lookup
+    for user_id in subordinate_ids:
+        bump_auth_version(user_id)
@@ -1,3 +1,269 @@
-from django.test import TestCase
+import threading
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import identify_hasher, make_password
+from django.core.exceptions import ValidationError
+from django.core.management import call_command
+from django.test import Client, RequestFactory, TestCase
+from rest_framework.test import APIClient
+
+from . import authentication
+from .authentication import (
+    ClaimsJWTAuthentication, ClaimsRefreshToken, ClaimsTokenRefreshSerializer, ClaimsUser, VersionCache,
+)
+from .hashers import HashingBusy, HashingPool, PooledHasherMixin
+from .hierarchy import manager_ids_above, rebuild_hierarchy
+from .permissions import IsManagerOfEmployee, get_permission_context
+from .models import User, UserHierarchy
+
+
+class HierarchyTests(TestCase):
+    def setUp(self):
+        self.ceo = User.objects.create_user('ceo', 'ceo@q360.az', 'pass', role='manager')
+        self.vp = User.objects.create_user('vp', 'vp@q360.az', 'pass', role='manager', manager=self.ceo)
+        self.lead = User.objects.create_user('lead', 'lead@q360.az', 'pass', role='manager', manager=self.vp)
+        self.dev = User.objects.create_user('dev', 'dev@q360.az', 'pass', manager=self.lead)
+        self.other = User.objects.create_user('other', 'other@q360.az', 'pass', role='manager')
+
+    def closure(self):
+        return set(UserHierarchy.objects.filter(depth__gt=0).values_list(
+            'ancestor__username', 'descendant__username', 'depth'
+        ))
+
+    def assertMatchesRebuild(self):
+        maintained = set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+        rebuild_hierarchy()
+        self.assertEqual(set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth')), maintained)
+
+    def test_new_users_link_to_every_manager_above(self):
+        self.assertEqual(set(manager_ids_above(self.dev.pk)), {self.lead.pk, self.vp.pk, self.ceo.pk})
+        self.assertTrue(UserHierarchy.objects.filter(ancestor=self.dev, descendant=self.dev, depth=0).exists())
+        self.assertMatchesRebuild()
+
+    def test_moving_a_manager_moves_their_subtree(self):
+        self.lead.manager = self.other
+        self.lead.save()
+
+        self.assertEqual(self.closure(), {
+            ('ceo', 'vp', 1),
+            ('other', 'lead', 1), ('other', 'dev', 2), ('lead', 'dev', 1),
+        })
+        self.assertMatchesRebuild()
+
+    def test_detaching_a_manager_keeps_their_own_team(self):
+        self.lead.manager = None
+        self.lead.save()
+
+        self.assertEqual(self.closure(), {('ceo', 'vp', 1), ('lead', 'dev', 1)})
+        self.assertMatchesRebuild()
+
+    def test_loops_are_rejected(self):
+        before = self.closure()
+        for manager in (self.vp, self.dev):
+            self.vp.manager = manager
+            with self.assertRaises(ValidationError):
+                self.vp.save()
+
+        self.vp.refresh_from_db()
+        self.assertEqual(self.vp.manager, self.ceo)
+        self.assertEqual(self.closure(), before)
+
+    def test_deleting_a_manager_detaches_their_reports(self):
+        self.lead.delete()
+
+        self.dev.refresh_from_db()
+        self.assertIsNone(self.dev.manager)
+        self.assertEqual(self.closure(), {('ceo', 'vp', 1)})
+        self.assertMatchesRebuild()
+
+    def test_rebuild_repairs_bulk_updates(self):
+        # Queryset updates bypass the signals that maintain the table
+        User.objects.filter(pk=self.dev.pk).update(manager=self.other)
+        self.assertIn(('lead', 'dev', 1), self.closure())
+
+        output = StringIO()
+        call_command('rebuild_hierarchy', stdout=output)
+
+        self.assertIn('Wrote 9 hierarchy links', output.getvalue())
+        self.assertEqual(self.closure(), {('ceo', 'vp', 1), ('ceo', 'lead', 2), ('vp', 'lead', 1), ('other', 'dev', 1)})
+
+    def test_rebuild_stops_at_loops_left_by_bulk_updates(self):
+        User.objects.filter(pk=self.ceo.pk).update(manager=self.lead)
+
+        rebuild_hierarchy()
+
+        self.assertEqual(set(manager_ids_above(self.dev.pk)), {self.lead.pk, self.vp.pk, self.ceo.pk})
+        self.assertEqual(set(manager_ids_above(self.ceo.pk)), {self.lead.pk, self.vp.pk})
+
+
+class PermissionContextTests(TestCase):
+    def setUp(self):
+        self.director = User.objects.create_user('director', 'director@q360.az', 'pass', role='manager')
+        self.manager = User.objects.create_user(
+            'manager', 'manager@q360.az', 'pass', role='manager', manager=self.director
+        )
+        self.employee = User.objects.create_user('employee', 'employee@q360.az', 'pass', manager=self.manager)
+        self.outsider = User.objects.create_user('outsider', 'outsider@q360.az', 'pass')
+
+    def request(self, user):
+        request = RequestFactory().get('/')
+        request.user = user
+        return request
+
+    def test_context_is_resolved_once_per_request(self):
+        request = self.request(self.director)
+        context = get_permission_context(request)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(context.subordinate_ids, {self.manager.pk, self.employee.pk})
+            self.assertTrue(context.manages(self.employee))
+            self.assertIs(get_permission_context(request), context)
+
+    def test_managers_reach_their_whole_subtree_only(self):
+        permission = IsManagerOfEmployee()
+        request = self.request(self.director)
+
+        self.assertTrue(permission.has_object_permission(request, None, self.employee))
+        self.assertFalse(permission.has_object_permission(request, None, self.outsider))
+        self.assertFalse(permission.has_object_permission(self.request(self.employee), None, self.employee))
+        self.assertEqual(
+            set(get_permission_context(request).scope(User.objects.all())),
+            {self.director, self.manager, self.employee},
+        )
+
+
+class AuthClaimsTests(TestCase):
+    def setUp(self):
+        versions = mock.patch.object(authentication, '_versions', VersionCache())
+        versions.start()
+        self.addCleanup(versions.stop)
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.user = User.objects.create_user('employee', 'employee@q360.az', 'pass', manager=self.manager)
+
+    def authenticate(self, access):
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {access}')
+        user, _ = ClaimsJWTAuthentication().authenticate(request)
+        return user
+
+    def test_tokens_are_stamped_with_claims_and_version(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+
+        self.assertEqual(
+            {field: access[field] for field in ('role', 'department_id', 'manager_id', 'auth_version')},
+            {'role': 'employee', 'department_id': None, 'manager_id': self.manager.pk, 'auth_version': 0},
+        )
+
+    def test_current_claims_skip_the_user_query(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+
+        with self.assertNumQueries(1):  # the version, then memoized
+            user = self.authenticate(access)
+            self.assertIsInstance(self.authenticate(access), ClaimsUser)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.role, user.manager_id), (self.user.pk, 'employee', self.manager.pk))
+            self.assertIsInstance(user, User)
+            self.assertEqual(user, self.user)
+        # Anything outside the claims loads the row once
+        with self.assertNumQueries(1):
+            self.assertEqual((user.email, user.username), ('employee@q360.az', 'employee'))
+
+    def test_claim_changes_bump_the_stored_version(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+        self.authenticate(access)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.role = 'manager'
+            self.user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).auth_version, 1)
+        # A later full save of the same instance keeps the bumped version
+        self.user.first_name = 'Aysel'
+        self.user.save()
+        self.assertEqual(User.objects.get(pk=self.user.pk).auth_version, 1)
+
+        user = self.authenticate(access)
+        self.assertNotIsInstance(user, ClaimsUser)
+        self.assertEqual(user.role, 'manager')
+
+    def test_unrelated_saves_keep_tokens_trusted(self):
+        self.user.first_name = 'Aysel'
+        self.user.save()
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).auth_version, 0)
+        self.assertIsInstance(self.authenticate(ClaimsRefreshToken.for_user(self.user).access_token), ClaimsUser)
+
+    def test_deleting_a_manager_invalidates_their_reports(self):
+        access = ClaimsRefreshToken.for_user(self.user).access_token
+
+        self.manager.delete()
+
+        self.assertEqual(User.objects.get(pk=self.user.pk).auth_version, 1)
+        self.assertIsNone(self.authenticate(access).manager_id)
+
+    def test_refresh_restamps_outdated_claims(self):
+        refresh = ClaimsRefreshToken.for_user(self.user)
+        self.user.role = 'manager'
+        self.user.save()
+
+        serializer = ClaimsTokenRefreshSerializer(data={'refresh': str(refresh)})
+        self.assertTrue(serializer.is_valid(), serializer.errors)
+        access = serializer.validated_data['access']
+
+        user = self.authenticate(access)
+        self.assertIsInstance(user, ClaimsUser)
+        self.assertEqual(user.role, 'manager')
+
+
+class PasswordHashingTests(TestCase):
+    def test_pool_sheds_callers_beyond_its_admission_limit(self):
+        pool = HashingPool(size=1, max_pending=0, timeout=0.05)
+        started, release = threading.Event(), threading.Event()
+
+        def hash_slowly():
+            started.set()
+            release.wait(5)
+            return 'done'
+
+        results = []
+        worker = threading.Thread(target=lambda: results.append(pool.run(hash_slowly)))
+        worker.start()
+        started.wait(5)
+        with self.assertRaises(HashingBusy):
+            pool.run(str, 'rejected')
+        release.set()
+        worker.join(5)
+
+        self.assertEqual(results, ['done'])
+        # The slot is returned once the job finishes
+        self.assertEqual(pool.run(str, 'admitted'), 'admitted')
+
+    def test_nested_hashing_stays_on_the_worker(self):
+        pool = HashingPool(size=1, max_pending=0, timeout=0.05)
+
+        # A second admission would need a slot the outer call holds
+        self.assertEqual(pool.run(lambda: pool.run(str, 'inner')), 'inner')
+
+    def test_legacy_hashes_are_pooled_and_upgraded_to_argon2_on_login(self):
+        user = User.objects.create_user('employee', 'employee@q360.az', 'pass')
+        for algorithm in ('pbkdf2_sha256', 'pbkdf2_sha1', 'scrypt'):
+            encoded = make_password('Parol-2025', hasher=algorithm)
+            self.assertIsInstance(identify_hasher(encoded), PooledHasherMixin)
+            User.objects.filter(pk=user.pk).update(password=encoded)
+
+            self.assertEqual(authenticate(username='employee', password='Parol-2025'), user)
+
+            user.refresh_from_db()
+            self.assertTrue(user.password.startswith('argon2$argon2id$'), algorithm)
+            self.assertTrue(user.check_password('Parol-2025'))
+
+    def test_busy_pool_answers_503_inside_and_outside_drf(self):
+        User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin', is_staff=True)
+
+        with mock.patch.object(HashingPool, 'run', side_effect=HashingBusy()):
+            api = APIClient().post('/api/auth/login/', {'username': 'admin', 'password': 'pass'}, format='json')
+            admin = Client().post('/admin/login/', {'username': 'admin', 'password': 'pass'})
+
+        for response in (api, admin):
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response['Retry-After'], '1')
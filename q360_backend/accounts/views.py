@@ -6,9 +6,11 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from django.utils import timezone
-from django.core.mail import send_mail
-from django.conf import settings
+from django.db import transaction
 from .models import User
+from .authentication import ClaimsRefreshToken
+from activity.stream import record_activity
+from notifications.outbox import enqueue_email
 from .serializers import UserSerializer, UserCreateSerializer, LoginSerializer, PasswordResetRequestSerializer, PasswordResetConfirmSerializer, EmailVerificationSerializer, MFASetupSerializer, MFATokenSerializer, MFAEnableSerializer
 
 class UserListView(generics.ListAPIView):
@@ -26,10 +28,17 @@ class UserDetailView(generics.RetrieveUpdateAPIView):
 def register_view(request):
     serializer = UserCreateSerializer(data=request.data)
     if serializer.is_valid():
-        user = serializer.save()
-        # Send email verification
-        send_verification_email(user)
-        refresh = RefreshToken.for_user(user)
+        # The verification email is queued in the same transaction as the new user
+        with transaction.atomic():
+            user = serializer.save()
+            record_activity(
+                'user_registered', user,
+                f'Yeni istifadəçi qeydiyyatdan keçdi: {user.get_full_name() or user.username}',
+                target=user,
+            )
+            # Send email verification
+            send_verification_email(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -53,7 +62,7 @@ def login_view(request):
                 'message': 'MFA required'
             }, status=status.HTTP_200_OK)
         
-        refresh = RefreshToken.for_user(user)
+        refresh = ClaimsRefreshToken.for_user(user)
         return Response({
             'user': UserSerializer(user).data,
             'refresh': str(refresh),
@@ -70,7 +79,7 @@ def mfa_verify_view(request):
         user_id = request.data.get('user_id')
         try:
             user = User.objects.get(id=user_id)
-            refresh = RefreshToken.for_user(user)
+            refresh = ClaimsRefreshToken.for_user(user)
             return Response({
                 'user': UserSerializer(user).data,
                 'refresh': str(refresh),
@@ -105,9 +114,10 @@ def password_reset_request_view(request):
         email = serializer.validated_data['email']
         try:
             user = User.objects.get(email=email)
-            token = user.generate_password_reset_token()
-            # Send password reset email
-            send_password_reset_email(user, token)
+            with transaction.atomic():
+                token = user.generate_password_reset_token()
+                # Send password reset email
+                send_password_reset_email(user, token)
             return Response({'message': 'Password reset email sent'}, status=status.HTTP_200_OK)
         except User.DoesNotExist:
             # We don't want to reveal if the email exists or not for security reasons
@@ -208,37 +218,19 @@ def mfa_disable_view(request):
 
 # Helper functions
 def send_verification_email(user):
-    """Send email verification to the user"""
-    # In a real application, you would use a proper email service
-    # For now, we'll just print to console but also send actual email
-    print(f"Send verification email to {user.email} with token {user.email_verification_token}")
-    
-    # Send actual email
-    try:
-        send_mail(
-            'Verify your email',
-            f'Please verify your email by clicking this link: http://localhost:3000/verify-email?token={user.email_verification_token}',
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        print(f"Failed to send verification email: {e}")
+    """Queue the email verification message for the user (see notifications/outbox.py)"""
+    enqueue_email(
+        'Verify your email',
+        f'Please verify your email by clicking this link: http://localhost:3000/verify-email?token={user.email_verification_token}',
+        [user.email],
+        category='verification',
+    )
 
 def send_password_reset_email(user, token):
-    """Send password reset email to the user"""
-    # In a real application, you would use a proper email service
-    # For now, we'll just print to console but also send actual email
-    print(f"Send password reset email to {user.email} with token {token}")
-    
-    # Send actual email
-    try:
-        send_mail(
-            'Password reset',
-            f'Use this link to reset your password: http://localhost:3000/reset-password?token={token}',
-            settings.DEFAULT_FROM_EMAIL,
-            [user.email],
-            fail_silently=False,
-        )
-    except Exception as e:
-        print(f"Failed to send password reset email: {e}")
\ No newline at end of file
+    """Queue the password reset message for the user (see notifications/outbox.py)"""
+    enqueue_email(
+        'Password reset',
+        f'Use this link to reset your password: http://localhost:3000/reset-password?token={token}',
+        [user.email],
+        category='password_reset',
+    )
\ No newline at end of file
@@ -0,0 +1,13 @@
+# activity/management/commands/ingest_activity.py
+from django.core.management.base import BaseCommand
+from activity.stream import ingest_activity
+
+class Command(BaseCommand):
+    help = 'Write staged activity events to their feeds'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Override ACTIVITY_STREAM INGEST_BATCH_SIZE')
+
+    def handle(self, *args, **options):
+        ingested = ingest_activity(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'Ingested {ingested} activity events'))
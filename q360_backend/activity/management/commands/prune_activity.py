@@ -0,0 +1,22 @@
+# activity/management/commands/prune_activity.py
+from django.core.management.base import BaseCommand
+from activity.stream import prune_activity
+
+class Command(BaseCommand):
+    help = 'Apply the activity stream retention and feed compaction policy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retention-days', type=int, help='Override ACTIVITY_STREAM RETENTION_DAYS')
+        parser.add_argument('--feed-max-entries', type=int, help='Override ACTIVITY_STREAM FEED_MAX_ENTRIES')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed')
+
+    def handle(self, *args, **options):
+        report = prune_activity(
+            retention_days=options['retention_days'],
+            feed_max_entries=options['feed_max_entries'],
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        for key, count in report.items():
+            self.stdout.write(f"{key.replace('_', ' ')}: {count}")
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:29
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ActivityEvent",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "verb",
+                    models.CharField(
+                        choices=[
+                            ("evaluation_submitted", "Evaluation Submitted"),
+                            ("idea_created", "Idea Created"),
+                            ("idea_liked", "Idea Liked"),
+                            ("idea_commented", "Idea Commented"),
+                            ("user_registered", "User Registered"),
+                            ("report_generated", "Report Generated"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("target_type", models.CharField(blank=True, max_length=50)),
+                ("target_id", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("summary", models.CharField(max_length=255)),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        db_index=True, default=django.utils.timezone.now
+                    ),
+                ),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="activities",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Activity Event",
+                "verbose_name_plural": "Activity Events",
+                "ordering": ["-created_at"],
+            },
+        ),
+        migrations.CreateModel(
+            name="ActivityFeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("feed", models.CharField(max_length=40)),
+                ("created_at", models.DateTimeField()),
+                (
+                    "event",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="activity.activityevent",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Activity Feed Entry",
+                "verbose_name_plural": "Activity Feed Entries",
+                "indexes": [
+                    models.Index(
+                        fields=["feed", "-created_at"], name="activity_feed_latest_idx"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("activity", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PendingActivity",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "verb",
+                    models.CharField(
+                        choices=[
+                            ("evaluation_submitted", "Evaluation Submitted"),
+                            ("idea_created", "Idea Created"),
+                            ("idea_liked", "Idea Liked"),
+                            ("idea_commented", "Idea Commented"),
+                            ("user_registered", "User Registered"),
+                            ("report_generated", "Report Generated"),
+                        ],
+                        max_length=30,
+                    ),
+                ),
+                ("target_type", models.CharField(blank=True, max_length=50)),
+                ("target_id", models.PositiveBigIntegerField(blank=True, null=True)),
+                ("summary", models.CharField(max_length=255)),
+                ("user_ids", models.JSONField(blank=True, default=list)),
+                ("created_at", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "actor",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Pending Activity",
+                "verbose_name_plural": "Pending Activities",
+            },
+        ),
+    ]
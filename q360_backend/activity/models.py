@@ -0,0 +1,66 @@
+# activity/models.py
+from django.db import models
+from django.utils import timezone
+from accounts.models import User
+
+class ActivityEvent(models.Model):
+    VERB_CHOICES = [
+        ('evaluation_submitted', 'Evaluation Submitted'),
+        ('idea_created', 'Idea Created'),
+        ('idea_liked', 'Idea Liked'),
+        ('idea_commented', 'Idea Commented'),
+        ('user_registered', 'User Registered'),
+        ('report_generated', 'Report Generated'),
+    ]
+    
+    verb = models.CharField(max_length=30, choices=VERB_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='activities')
+    target_type = models.CharField(max_length=50, blank=True)  # app_label.model
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    summary = models.CharField(max_length=255)
+    
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Activity Event'
+        verbose_name_plural = 'Activity Events'
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return self.summary
+
+class ActivityFeedEntry(models.Model):
+    """Fan-out index row placing an event in one feed ('global', 'user:<id>', 'manager:<id>')"""
+    feed = models.CharField(max_length=40)
+    event = models.ForeignKey(ActivityEvent, on_delete=models.CASCADE, related_name='feed_entries')
+    # Copied from the event so "latest N of a feed" is a single index range scan
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        verbose_name = 'Activity Feed Entry'
+        verbose_name_plural = 'Activity Feed Entries'
+        indexes = [
+            models.Index(fields=['feed', '-created_at'], name='activity_feed_latest_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.feed}: {self.event}"
+
+class PendingActivity(models.Model):
+    """An event recorded by a request, waiting to be fanned out by ``ingest_activity`` (see activity/stream.py)"""
+    verb = models.CharField(max_length=30, choices=ActivityEvent.VERB_CHOICES)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    target_type = models.CharField(max_length=50, blank=True)
+    target_id = models.PositiveBigIntegerField(null=True, blank=True)
+    summary = models.CharField(max_length=255)
+    # Other users the event concerns; their feeds and their managers' feeds receive it
+    user_ids = models.JSONField(default=list, blank=True)
+    
+    created_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        verbose_name = 'Pending Activity'
+        verbose_name_plural = 'Pending Activities'
+    
+    def __str__(self):
+        return self.summary
@@ -0,0 +1,161 @@
+# activity/stream.py
+"""
+Append-only activity stream.
+
+``record_activity`` stages the event as one narrow ``PendingActivity`` row
+inside the caller's transaction, so an event exists exactly when the change
+it describes committed and survives restarts; the request does no fan-out.
+``ingest_activity`` (run by the periodic ``ingest_activity_task``) turns
+staged rows into events and feed entries in batches, resolving every batch's
+management chains with one hierarchy query.
+
+Every event is fanned out to the ``global`` feed, to ``user:<id>`` for each
+user it concerns and to ``manager:<id>`` for every manager above them. Reading
+the latest N entries of a feed is a single index range scan.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from accounts.models import UserHierarchy
+from .models import ActivityEvent, ActivityFeedEntry, PendingActivity
+
+DEFAULTS = {
+    'RETENTION_DAYS': 90,
+    'FEED_MAX_ENTRIES': 500,
+    'INGEST_BATCH_SIZE': 500,
+    'INGEST_MAX_BATCHES': 20,  # per ingestion run, so one run cannot hold a worker forever
+}
+
+GLOBAL_FEED = 'global'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'ACTIVITY_STREAM', {})}
+
+
+def user_feed(user_id):
+    return f'user:{user_id}'
+
+
+def manager_feed(manager_id):
+    return f'manager:{manager_id}'
+
+
+def managers_above(user_ids):
+    """Every manager above each of ``user_ids``, by user (one query on the hierarchy index)"""
+    managers = {}
+    for user_id, manager_id in UserHierarchy.objects.filter(
+        descendant_id__in=user_ids, depth__gt=0
+    ).values_list('descendant_id', 'ancestor_id'):
+        managers.setdefault(user_id, []).append(manager_id)
+    return managers
+
+
+def feeds_for(user_ids, managers):
+    """Feeds an event concerning ``user_ids`` is written to, given their ``managers_above``"""
+    feeds = [GLOBAL_FEED]
+    for user_id in user_ids:
+        if user_id is None:
+            continue
+        feeds.append(user_feed(user_id))
+        feeds.extend(manager_feed(manager_id) for manager_id in managers.get(user_id, ()))
+    return list(dict.fromkeys(feeds))
+
+
+def record_activity(verb, actor, summary, target=None, users=()):
+    """Stage an event concerning ``actor`` and ``users``; it reaches the feeds on the next ingestion"""
+    return PendingActivity.objects.create(
+        verb=verb,
+        actor=actor,
+        summary=summary[:255],
+        target_type=target._meta.label_lower if target is not None else '',
+        target_id=target.pk if target is not None else None,
+        user_ids=[user.pk for user in users if user is not None],
+    )
+
+
+def ingest_activity(batch_size=None, max_batches=None):
+    """Write staged events and their feed entries in batches; returns the number ingested"""
+    config = get_config()
+    batch_size = batch_size or config['INGEST_BATCH_SIZE']
+    max_batches = max_batches or config['INGEST_MAX_BATCHES']
+    ingested = 0
+    for _ in range(max_batches):
+        with transaction.atomic():
+            # Concurrent runs skip each other's rows instead of ingesting them twice
+            staged = list(PendingActivity.objects.order_by('pk').select_for_update(skip_locked=True)[:batch_size])
+            if not staged:
+                break
+            events = ActivityEvent.objects.bulk_create([
+                ActivityEvent(
+                    verb=pending.verb, actor_id=pending.actor_id, summary=pending.summary,
+                    target_type=pending.target_type, target_id=pending.target_id, created_at=pending.created_at,
+                )
+                for pending in staged
+            ])
+            concerned = {user_id for pending in staged for user_id in [pending.actor_id, *pending.user_ids]}
+            managers = managers_above(concerned)
+            ActivityFeedEntry.objects.bulk_create([
+                ActivityFeedEntry(feed=feed, event=event, created_at=event.created_at)
+                for pending, event in zip(staged, events)
+                for feed in feeds_for([pending.actor_id, *pending.user_ids], managers)
+            ], batch_size=batch_size)
+            PendingActivity.objects.filter(pk__in=[pending.pk for pending in staged]).delete()
+        ingested += len(staged)
+    return ingested
+
+
+def latest_activities(feed, limit=10):
+    """Most recent events of a feed, newest first"""
+    entries = ActivityFeedEntry.objects.filter(feed=feed).select_related('event').order_by('-created_at')
+    return [entry.event for entry in entries[:limit]]
+
+
+def prune_activity(retention_days=None, feed_max_entries=None, batch_size=1000, dry_run=False):
+    """Apply the retention policy; returns counts of what was (or would be) removed.
+
+    Events older than ``retention_days`` are deleted in batches. Feeds longer
+    than ``feed_max_entries`` are compacted by dropping their oldest entries,
+    and events left without any feed entry are deleted as well.
+    """
+    config = get_config()
+    retention_days = config['RETENTION_DAYS'] if retention_days is None else retention_days
+    feed_max_entries = config['FEED_MAX_ENTRIES'] if feed_max_entries is None else feed_max_entries
+    report = {'expired_events': 0, 'trimmed_entries': 0, 'orphaned_events': 0}
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = ActivityEvent.objects.filter(created_at__lt=cutoff)
+    report['expired_events'] = _delete_in_batches(expired, batch_size, dry_run)
+
+    oversized = ActivityFeedEntry.objects.values('feed').annotate(total=Count('id')).filter(
+        total__gt=feed_max_entries
+    ).values_list('feed', flat=True)
+    for feed in oversized:
+        boundary = ActivityFeedEntry.objects.filter(feed=feed).order_by('-created_at', '-id').values_list(
+            'created_at', 'id'
+        )[feed_max_entries - 1]
+        stale = ActivityFeedEntry.objects.filter(feed=feed).filter(
+            created_at__lte=boundary[0]
+        ).exclude(created_at=boundary[0], id__gte=boundary[1])
+        report['trimmed_entries'] += _delete_in_batches(stale, batch_size, dry_run)
+
+    if not dry_run:
+        orphaned = ActivityEvent.objects.filter(feed_entries__isnull=True)
+        report['orphaned_events'] = _delete_in_batches(orphaned, batch_size, dry_run)
+    return report
+
+
+def _delete_in_batches(queryset, batch_size, dry_run):
+    if dry_run:
+        return queryset.count()
+    deleted = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return deleted
+        queryset.model.objects.filter(pk__in=ids).delete()
+        deleted += len(ids)
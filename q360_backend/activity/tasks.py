@@ -0,0 +1,9 @@
+# activity/tasks.py
+from celery import shared_task
+from .stream import ingest_activity
+
+
+@shared_task
+def ingest_activity_task():
+    """Fan staged activity events out to their feeds"""
+    return ingest_activity()
@@ -0,0 +1,93 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import User
+from ideas.models import Idea
+from .models import ActivityEvent, ActivityFeedEntry, PendingActivity
+from .stream import (
+    GLOBAL_FEED, ingest_activity, latest_activities, manager_feed, prune_activity, record_activity, user_feed,
+)
+
+
+class ActivityStreamTests(TestCase):
+    def setUp(self):
+        self.director = User.objects.create_user('director', 'director@q360.az', 'pass', role='manager')
+        self.manager = User.objects.create_user(
+            'manager', 'manager@q360.az', 'pass', role='manager', manager=self.director
+        )
+        self.employee = User.objects.create_user('employee', 'employee@q360.az', 'pass', manager=self.manager)
+        self.other = User.objects.create_user('other', 'other@q360.az', 'pass')
+        self.idea = Idea.objects.create(title='Idea', description='Text', submitter=self.employee)
+
+    def test_event_is_fanned_out_to_every_concerned_feed(self):
+        record_activity('idea_liked', self.other, 'Fikir bəyənildi: Idea', target=self.idea, users=[self.employee])
+        self.assertEqual(ingest_activity(), 1)
+
+        event = ActivityEvent.objects.get()
+        self.assertEqual(set(event.feed_entries.values_list('feed', flat=True)), {
+            GLOBAL_FEED, user_feed(self.other.pk), user_feed(self.employee.pk),
+            # Every manager up the chain, as on the manager dashboard
+            manager_feed(self.manager.pk), manager_feed(self.director.pk),
+        })
+        self.assertEqual((event.target_type, event.target_id), ('ideas.idea', self.idea.pk))
+
+    def test_request_only_stages_the_event(self):
+        with self.assertNumQueries(1):
+            record_activity('idea_created', self.employee, 'Yeni fikir təqdim edildi: Idea', target=self.idea)
+        self.assertFalse(ActivityEvent.objects.exists())
+
+        ingest_activity()
+
+        # Staged rows are shared, so any process's ingestion makes the event readable
+        self.assertEqual([event.verb for event in latest_activities(manager_feed(self.director.pk))], ['idea_created'])
+        self.assertFalse(PendingActivity.objects.exists())
+        self.assertEqual(ingest_activity(), 0)
+
+    def test_ingestion_writes_in_batches_in_order(self):
+        for index in range(5):
+            record_activity('idea_created', self.employee, f'Fikir {index}')
+
+        self.assertEqual(ingest_activity(batch_size=2, max_batches=2), 4)
+        self.assertEqual(list(PendingActivity.objects.values_list('summary', flat=True)), ['Fikir 4'])
+        self.assertEqual(ingest_activity(batch_size=2), 1)
+        self.assertEqual(ActivityFeedEntry.objects.filter(feed=manager_feed(self.director.pk)).count(), 5)
+
+    def test_rolled_back_change_leaves_no_event(self):
+        try:
+            with transaction.atomic():
+                record_activity('idea_created', self.employee, 'Yeni fikir', target=self.idea)
+                raise RuntimeError('request failed')
+        except RuntimeError:
+            pass
+
+        self.assertFalse(PendingActivity.objects.exists())
+
+    def test_latest_activities_is_newest_first_and_limited(self):
+        for index in range(3):
+            record_activity('idea_created', self.employee, f'Fikir {index}')
+        ingest_activity()
+
+        self.assertEqual(
+            [event.summary for event in latest_activities(user_feed(self.employee.pk), limit=2)],
+            ['Fikir 2', 'Fikir 1'],
+        )
+
+    def test_prune_expires_old_events_and_compacts_long_feeds(self):
+        record_activity('idea_created', self.other, 'Köhnə')
+        PendingActivity.objects.update(created_at=timezone.now() - timedelta(days=120))
+        for index in range(3):
+            record_activity('idea_created', self.employee, f'Fikir {index}')
+        ingest_activity()
+
+        self.assertEqual(prune_activity(retention_days=90, feed_max_entries=5, dry_run=True)['expired_events'], 1)
+        report = prune_activity(retention_days=90, feed_max_entries=2)
+
+        self.assertEqual(report['expired_events'], 1)
+        # The global, employee, manager and director feeds each held three events
+        self.assertEqual(report['trimmed_entries'], 4)
+        self.assertEqual(report['orphaned_events'], 1)
+        self.assertEqual([event.summary for event in latest_activities(GLOBAL_FEED)], ['Fikir 2', 'Fikir 1'])
+        self.assertFalse(ActivityFeedEntry.objects.filter(event__summary='Fikir 0').exists())
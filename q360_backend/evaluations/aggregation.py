@@ -0,0 +1,86 @@
+# evaluations/aggregation.py
+import math
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+
+from .models import Answer, CompetencyScore
+
+SCORE_KEY_FIELDS = ['cycle', 'evaluatee', 'competency', 'evaluation_type']
+SCORE_VALUE_FIELDS = ['answer_count', 'rating_sum', 'rating_sum_squares', 'mean', 'stddev', 'updated_at']
+
+
+def _build_scores(answers):
+    """Group submitted answers into unsaved CompetencyScore rows (one query)"""
+    rows = answers.filter(evaluation__is_submitted=True).values(
+        'evaluation__cycle_id',
+        'evaluation__evaluatee_id',
+        'question__competency_id',
+        'evaluation__evaluation_type',
+    ).annotate(
+        total=Count('id'),
+        total_rating=Sum('rating'),
+        total_squares=Sum(F('rating') * F('rating')),
+    ).order_by()
+
+    scores = []
+    for row in rows:
+        count = row['total']
+        mean = row['total_rating'] / count
+        # Population variance from running totals; clamp float noise below zero
+        variance = max(row['total_squares'] / count - mean * mean, 0.0)
+        scores.append(CompetencyScore(
+            cycle_id=row['evaluation__cycle_id'],
+            evaluatee_id=row['evaluation__evaluatee_id'],
+            competency_id=row['question__competency_id'],
+            evaluation_type=row['evaluation__evaluation_type'],
+            answer_count=count,
+            rating_sum=row['total_rating'],
+            rating_sum_squares=row['total_squares'],
+            mean=mean,
+            stddev=math.sqrt(variance),
+        ))
+    return scores
+
+
+def _materialize(answers, existing):
+    """Replace the score rows in ``existing`` with fresh aggregates of ``answers``"""
+    scores = _build_scores(answers)
+    with transaction.atomic():
+        # Competencies that no longer have submitted answers drop out of the scope
+        existing.exclude(competency_id__in=[score.competency_id for score in scores]).delete()
+        CompetencyScore.objects.bulk_create(
+            scores,
+            update_conflicts=True,
+            unique_fields=SCORE_KEY_FIELDS,
+            update_fields=SCORE_VALUE_FIELDS,
+        )
+    return scores
+
+
+def refresh_evaluation_scores(evaluation):
+    """Recompute the score rows touched by a single evaluation.
+
+    Only the (cycle, evaluatee, evaluation_type) group the evaluation belongs to
+    is re-aggregated, so submitting an evaluation costs a handful of queries
+    regardless of how many answers exist elsewhere.
+    """
+    scope = {
+        'cycle_id': evaluation.cycle_id,
+        'evaluatee_id': evaluation.evaluatee_id,
+        'evaluation_type': evaluation.evaluation_type,
+    }
+    answers = Answer.objects.filter(**{f'evaluation__{key}': value for key, value in scope.items()})
+    return _materialize(answers, CompetencyScore.objects.filter(**scope))
+
+
+def rebuild_cycle_scores(cycle):
+    """Recompute every score row of a cycle from scratch"""
+    answers = Answer.objects.filter(evaluation__cycle=cycle)
+    existing = CompetencyScore.objects.filter(cycle=cycle)
+    with transaction.atomic():
+        # A full rebuild also has to drop evaluatees/types without submissions
+        scores = _build_scores(answers)
+        existing.delete()
+        CompetencyScore.objects.bulk_create(scores)
+    return scores
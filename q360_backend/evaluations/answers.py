@@ -0,0 +1,92 @@
+# evaluations/answers.py
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Answer
+
+VALID_RATINGS = range(1, 6)
+
+
+def _parse_item(item):
+    """Return (question_id, rating, comment, error) for one payload entry"""
+    if not isinstance(item, dict):
+        return None, None, '', 'Answer must be an object'
+    try:
+        question_id = int(item.get('question'))
+    except (TypeError, ValueError):
+        return None, None, '', 'A valid question ID is required'
+    try:
+        rating = int(item.get('rating'))
+    except (TypeError, ValueError):
+        return question_id, None, '', 'A valid rating is required'
+    if rating not in VALID_RATINGS:
+        return question_id, rating, '', 'Rating must be between 1 and 5'
+    return question_id, rating, item.get('comment') or '', None
+
+
+def bulk_save_answers(evaluation, answers_data):
+    """Create or update many answers of an evaluation in a fixed number of queries.
+
+    The payload is validated against the evaluation's question set with a
+    single query, existing answers are read once, and the writes go out as one
+    upserting ``bulk_create`` plus one ``bulk_update``; an answer another
+    request inserted after the read is overwritten instead of raising an
+    ``IntegrityError``. Returns a result entry per item.
+    """
+    parsed = [_parse_item(item) for item in answers_data]
+    requested_ids = {question_id for question_id, _, _, error in parsed if question_id and not error}
+
+    valid_ids = set(
+        evaluation.get_questions().filter(id__in=requested_ids).values_list('id', flat=True)
+    )
+    existing = {
+        answer.question_id: answer
+        for answer in Answer.objects.filter(evaluation=evaluation, question_id__in=valid_ids)
+    }
+
+    results = []
+    to_create = {}
+    to_update = {}
+    seen = set()
+    now = timezone.now()
+    for question_id, rating, comment, error in parsed:
+        result = {'question': question_id}
+        if error is None and question_id not in valid_ids:
+            error = 'Question does not belong to this evaluation'
+        if error is None and question_id in seen:
+            error = 'Duplicate answer for this question'
+        if error is not None:
+            result.update({'status': 'error', 'error': error})
+            results.append(result)
+            continue
+
+        seen.add(question_id)
+        answer = existing.get(question_id)
+        if answer is None:
+            to_create[question_id] = Answer(
+                evaluation=evaluation,
+                question_id=question_id,
+                rating=rating,
+                comment=comment,
+            )
+            result['status'] = 'created'
+        elif answer.rating != rating or answer.comment != comment:
+            answer.rating = rating
+            answer.comment = comment
+            answer.updated_at = now
+            to_update[question_id] = answer
+            result['status'] = 'updated'
+        else:
+            result['status'] = 'unchanged'
+        results.append(result)
+
+    with transaction.atomic():
+        if to_create:
+            Answer.objects.bulk_create(
+                to_create.values(), update_conflicts=True, unique_fields=['evaluation', 'question'],
+                update_fields=['rating', 'comment', 'updated_at'],
+            )
+        if to_update:
+            Answer.objects.bulk_update(to_update.values(), ['rating', 'comment', 'updated_at'])
+
+    return results
@@ -0,0 +1,92 @@
+# evaluations/exports.py
+"""
+Constant-memory export of a cycle's answers.
+
+Rows are read with ``values_list(...).iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL), so no model instances are built and at most one chunk
+is held at a time. The same row generator feeds the streaming HTTP response
+and the offline ``export_answers`` command.
+"""
+import csv
+
+from reports.writers import XlsxWriter
+from .models import Answer
+
+CHUNK_SIZE = 2000
+
+EXPORT_HEADER = [
+    'evaluation_id', 'evaluation_type', 'submitted', 'evaluatee', 'evaluatee_name', 'evaluator',
+    'competency', 'question', 'rating', 'comment', 'updated_at',
+]
+
+
+def answer_rows(cycle, answers=None, chunk_size=CHUNK_SIZE, header=True):
+    """Yield the export header and one row per answer of ``cycle``.
+
+    ``answers`` narrows the export to a subset of ``Answer`` rows (e.g. the
+    requester's reporting scope); by default every answer of the cycle is read.
+    """
+    if header:
+        yield EXPORT_HEADER
+    answers = Answer.objects.all() if answers is None else answers
+    rows = answers.filter(evaluation__cycle=cycle).order_by('evaluation_id', 'question_id').values_list(
+        'evaluation_id', 'evaluation__evaluation_type', 'evaluation__is_submitted',
+        'evaluation__evaluatee__username', 'evaluation__evaluatee__first_name', 'evaluation__evaluatee__last_name',
+        'evaluation__evaluator__username', 'question__competency__name', 'question__text',
+        'rating', 'comment', 'updated_at',
+    )
+    for (evaluation_id, evaluation_type, submitted, evaluatee, first_name, last_name,
+         evaluator, competency, question, rating, comment, updated_at) in rows.iterator(chunk_size=chunk_size):
+        yield [
+            evaluation_id, evaluation_type, submitted, evaluatee, f'{first_name} {last_name}'.strip(),
+            # Anonymous cycles never reveal who answered
+            '' if cycle.is_anonymous else evaluator,
+            competency, question, rating, comment, updated_at.isoformat(),
+        ]
+
+
+class _Echo:
+    """File-like object handing each write back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    yield '\ufeff'  # BOM so Excel detects UTF-8
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ChunkBuffer:
+    """Write-only sink collecting bytes until the generator drains them"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def stream_xlsx(rows, sheet_name='Answers', flush_every=500):
+    """Yield an XLSX file in pieces while the rows are still being read"""
+    buffer = _ChunkBuffer()
+    sheet = XlsxWriter(buffer, sheet_name)
+    for index, row in enumerate(rows, start=1):
+        sheet.write_row(row)
+        if index % flush_every == 0:
+            data = buffer.drain()
+            if data:
+                yield data
+    sheet.close()
+    yield buffer.drain()
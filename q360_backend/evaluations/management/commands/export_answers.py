@@ -0,0 +1,61 @@
+# evaluations/management/commands/export_answers.py
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from evaluations.exports import answer_rows
+from evaluations.models import EvaluationCycle
+from reports.models import GeneratedReport
+from reports.writers import FILE_EXTENSIONS, write_csv, write_xlsx
+
+class Command(BaseCommand):
+    help = "Export a cycle's answers to CSV/XLSX with constant memory use"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, required=True, help='Evaluation cycle ID')
+        parser.add_argument('--format', choices=['csv', 'excel'], default='csv', dest='export_format')
+        parser.add_argument('--report', type=int, help='Store the file on this GeneratedReport (file_path), replacing its report')
+        parser.add_argument('--output', help='Write to this local path instead of a report')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        try:
+            cycle = EvaluationCycle.objects.get(pk=options['cycle'])
+        except EvaluationCycle.DoesNotExist:
+            raise CommandError(f"Evaluation cycle {options['cycle']} does not exist")
+        if bool(options['report']) == bool(options['output']):
+            raise CommandError('Pass exactly one of --report or --output')
+
+        export_format = options['export_format']
+        write = write_csv if export_format == 'csv' else write_xlsx
+        rows = answer_rows(cycle, chunk_size=options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                write(rows, output)
+            self.stdout.write(self.style.SUCCESS(f"Exported answers of {cycle.name} to {options['output']}"))
+            return
+
+        try:
+            report = GeneratedReport.objects.get(pk=options['report'])
+        except GeneratedReport.DoesNotExist:
+            raise CommandError(f"Generated report {options['report']} does not exist")
+        # Outside reports/cache/: artifacts there are shared by every report with the same key
+        directory = f'reports/{report.pk}/'
+        name = f'{directory}cycle-{cycle.pk}-answers.{FILE_EXTENSIONS[export_format]}'
+        with tempfile.TemporaryFile() as buffer:
+            write(rows, buffer)
+            buffer.seek(0)
+            if report.file_path.startswith(directory):
+                # Only a previous export of this command belongs to this row alone
+                default_storage.delete(report.file_path)
+            file_path = default_storage.save(name, File(buffer))
+        # The row no longer holds the cached report, so find_artifact must not serve this file for its key
+        GeneratedReport.objects.filter(pk=report.pk).update(
+            file_path=file_path, file_size=default_storage.size(file_path), format=export_format,
+            status='completed', progress=100, completed_at=timezone.now(),
+            cache_key='', summary={}, content_path='', content_etag='', content_size=0,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Exported answers of {cycle.name} to {file_path}'))
@@ -0,0 +1,21 @@
+# evaluations/management/commands/rebuild_competency_scores.py
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.models import EvaluationCycle
+from evaluations.aggregation import rebuild_cycle_scores
+
+class Command(BaseCommand):
+    help = 'Rebuild materialized competency scores from submitted answers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, help='Only rebuild the cycle with this ID')
+
+    def handle(self, *args, **options):
+        cycles = EvaluationCycle.objects.all()
+        if options['cycle']:
+            cycles = cycles.filter(pk=options['cycle'])
+            if not cycles.exists():
+                raise CommandError(f"Evaluation cycle {options['cycle']} does not exist")
+
+        for cycle in cycles:
+            scores = rebuild_cycle_scores(cycle)
+            self.stdout.write(f'Rebuilt {len(scores)} score rows for cycle: {cycle.name}')
@@ -0,0 +1,84 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("evaluations", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="CompetencyScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "evaluation_type",
+                    models.CharField(
+                        choices=[
+                            ("self", "Self Evaluation"),
+                            ("peer", "Peer Evaluation"),
+                            ("manager", "Manager Evaluation"),
+                        ],
+                        max_length=20,
+                    ),
+                ),
+                ("answer_count", models.PositiveIntegerField(default=0)),
+                ("rating_sum", models.PositiveIntegerField(default=0)),
+                ("rating_sum_squares", models.PositiveIntegerField(default=0)),
+                ("mean", models.FloatField(default=0)),
+                ("stddev", models.FloatField(default=0)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+                (
+                    "competency",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="scores",
+                        to="evaluations.competency",
+                    ),
+                ),
+                (
+                    "cycle",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="competency_scores",
+                        to="evaluations.evaluationcycle",
+                    ),
+                ),
+                (
+                    "evaluatee",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="competency_scores",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Competency Score",
+                "verbose_name_plural": "Competency Scores",
+                "indexes": [
+                    models.Index(
+                        fields=["cycle", "competency"],
+                        name="evaluations_cycle_i_6a7d19_idx",
+                    )
+                ],
+                "unique_together": {
+                    ("cycle", "evaluatee", "competency", "evaluation_type")
+                },
+            },
+        ),
+    ]
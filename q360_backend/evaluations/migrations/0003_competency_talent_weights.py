@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("evaluations", "0002_competencyscore"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="competency",
+            name="measures_potential",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name="competency",
+            name="weight",
+            field=models.FloatField(default=1.0),
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 4.2.30 on 2026-10-18 11:02
+
+import math
+
+from django.db import migrations
+from django.db.models import Count, F, Sum
+
+
+def backfill_scores(apps, schema_editor):
+    # Same grouping as evaluations.aggregation._build_scores, inlined so later edits there cannot change this migration
+    Answer = apps.get_model("evaluations", "Answer")
+    CompetencyScore = apps.get_model("evaluations", "CompetencyScore")
+    rows = (
+        Answer.objects.filter(evaluation__is_submitted=True)
+        .values(
+            "evaluation__cycle_id",
+            "evaluation__evaluatee_id",
+            "question__competency_id",
+            "evaluation__evaluation_type",
+        )
+        .annotate(
+            total=Count("id"),
+            total_rating=Sum("rating"),
+            total_squares=Sum(F("rating") * F("rating")),
+        )
+        .order_by()
+    )
+    scores = []
+    for row in rows:
+        count = row["total"]
+        mean = row["total_rating"] / count
+        variance = max(row["total_squares"] / count - mean * mean, 0.0)
+        scores.append(
+            CompetencyScore(
+                cycle_id=row["evaluation__cycle_id"],
+                evaluatee_id=row["evaluation__evaluatee_id"],
+                competency_id=row["question__competency_id"],
+                evaluation_type=row["evaluation__evaluation_type"],
+                answer_count=count,
+                rating_sum=row["total_rating"],
+                rating_sum_squares=row["total_squares"],
+                mean=mean,
+                stddev=math.sqrt(variance),
+            )
+        )
+    CompetencyScore.objects.all().delete()
+    CompetencyScore.objects.bulk_create(scores, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("evaluations", "0003_competency_talent_weights"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_scores, migrations.RunPython.noop),
+    ]
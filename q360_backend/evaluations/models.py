@@ -29,6 +29,10 @@ class Competency(models.Model):
     department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)
     order = models.PositiveIntegerField(default=0)
     
+    # Talent matrix inputs (see reports/talent.py)
+    weight = models.FloatField(default=1.0)
+    measures_potential = models.BooleanField(default=False)
+    
     class Meta:
         verbose_name = 'Competency'
         verbose_name_plural = 'Competencies'
@@ -73,6 +77,10 @@ class Evaluation(models.Model):
     
     def __str__(self):
         return f"{self.cycle.name} - {self.evaluatee} by {self.evaluator}"
+    
+    def get_questions(self):
+        """Return the questions that apply to this evaluation's evaluatee"""
+        return Question.objects.filter(competency__department_id=self.evaluatee.department_id)
 
 class Answer(models.Model):
     evaluation = models.ForeignKey(Evaluation, on_delete=models.CASCADE, related_name='answers')
@@ -91,6 +99,33 @@ class Answer(models.Model):
     def __str__(self):
         return f"Answer to {self.question.text[:30]}... ({self.rating})"
 
+class CompetencyScore(models.Model):
+    """Materialized rating statistics per cycle, evaluatee, competency and evaluation type"""
+    cycle = models.ForeignKey(EvaluationCycle, on_delete=models.CASCADE, related_name='competency_scores')
+    evaluatee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='competency_scores')
+    competency = models.ForeignKey(Competency, on_delete=models.CASCADE, related_name='scores')
+    evaluation_type = models.CharField(max_length=20, choices=Evaluation.EVALUATION_TYPE_CHOICES)
+
+    # Running totals allow mean/stddev to be derived without rescanning answers
+    answer_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_sum_squares = models.PositiveIntegerField(default=0)
+    mean = models.FloatField(default=0)
+    stddev = models.FloatField(default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['cycle', 'evaluatee', 'competency', 'evaluation_type']
+        indexes = [
+            models.Index(fields=['cycle', 'competency']),
+        ]
+        verbose_name = 'Competency Score'
+        verbose_name_plural = 'Competency Scores'
+
+    def __str__(self):
+        return f"{self.evaluatee} - {self.competency} ({self.evaluation_type}): {self.mean:.2f}"
+
 class DevelopmentPlan(models.Model):
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='development_plans')
     title = models.CharField(max_length=200)
@@ -1,8 +1,9 @@
 # evaluations/serializers.py
 from rest_framework import serializers
+from q360.serializers import DynamicFieldsMixin
 from .models import (
     EvaluationCycle, Competency, Question, 
-    Evaluation, Answer, DevelopmentPlan, DevelopmentGoal
+    Evaluation, Answer, CompetencyScore, DevelopmentPlan, DevelopmentGoal
 )
 from accounts.models import User, Department
 
@@ -16,33 +17,33 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'email', 'role', 'position']
 
-class EvaluationCycleSerializer(serializers.ModelSerializer):
+class EvaluationCycleSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = EvaluationCycle
         fields = '__all__'
 
-class CompetencySerializer(serializers.ModelSerializer):
+class CompetencySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     
     class Meta:
         model = Competency
         fields = '__all__'
 
-class QuestionSerializer(serializers.ModelSerializer):
+class QuestionSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     competency = CompetencySerializer(read_only=True)
     
     class Meta:
         model = Question
         fields = '__all__'
 
-class AnswerSerializer(serializers.ModelSerializer):
+class AnswerSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     question = QuestionSerializer(read_only=True)
     
     class Meta:
         model = Answer
         fields = '__all__'
 
-class EvaluationSerializer(serializers.ModelSerializer):
+class EvaluationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     evaluatee = UserSerializer(read_only=True)
     evaluator = UserSerializer(read_only=True)
     cycle = EvaluationCycleSerializer(read_only=True)
@@ -52,12 +53,20 @@ class EvaluationSerializer(serializers.ModelSerializer):
         model = Evaluation
         fields = '__all__'
 
-class DevelopmentGoalSerializer(serializers.ModelSerializer):
+class CompetencyScoreSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = CompetencyScore
+        fields = [
+            'id', 'cycle', 'evaluatee', 'competency', 'evaluation_type',
+            'answer_count', 'mean', 'stddev', 'updated_at'
+        ]
+
+class DevelopmentGoalSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = DevelopmentGoal
         fields = '__all__'
 
-class DevelopmentPlanSerializer(serializers.ModelSerializer):
+class DevelopmentPlanSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     employee = UserSerializer(read_only=True)
     goals = DevelopmentGoalSerializer(many=True, read_only=True)
     
@@ -1,3 +1,327 @@
-from django.test import TestCase
+import datetime
+import math
+import tempfile
+from importlib import import_module
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User, Department
+from reports.cache import artifact_name, find_artifact
+from reports.models import GeneratedReport, ReportTemplate
+from q360.testing import QueryCountAssertionsMixin
+from .aggregation import rebuild_cycle_scores
+from .answers import bulk_save_answers
+from .models import EvaluationCycle, Competency, Question, Evaluation, Answer, CompetencyScore
+
+
+class EvaluationQueryCountTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Engineering')
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def add_evaluation(self, answers=3):
+        index = Evaluation.objects.count()
+        employee = User.objects.create_user(
+            f'employee{index}', f'employee{index}@q360.az', 'pass', department=self.department
+        )
+        evaluation = Evaluation.objects.create(
+            cycle=self.cycle, evaluatee=employee, evaluator=self.manager, evaluation_type='manager'
+        )
+        for position in range(answers):
+            competency = Competency.objects.create(name=f'Competency {index}.{position}', department=self.department)
+            question = Question.objects.create(competency=competency, text='How well?')
+            Answer.objects.create(evaluation=evaluation, question=question, rating=4)
+        return evaluation
+
+    def test_list_query_count_is_independent_of_page_contents(self):
+        self.add_evaluation()
+        self.assertConstantQueries(
+            lambda: self.client.get('/api/evaluations/evaluations/'),
+            grow=lambda: self.add_evaluation(answers=5),
+        )
+
+    def test_get_answers_query_count_is_independent_of_answer_count(self):
+        evaluation = self.add_evaluation(answers=1)
+
+        def grow():
+            competency = Competency.objects.create(name='Extra', department=self.department)
+            question = Question.objects.create(competency=competency, text='Extra?')
+            Answer.objects.create(evaluation=evaluation, question=question, rating=3)
+
+        self.assertConstantQueries(
+            lambda: self.client.get(f'/api/evaluations/evaluations/{evaluation.pk}/get_answers/'),
+            grow=grow,
+        )
+
+
+class CompetencyScoreAggregationTests(TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Engineering')
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.employee = User.objects.create_user(
+            'employee', 'employee@q360.az', 'pass', department=self.department
+        )
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        self.competency = Competency.objects.create(name='Teamwork', department=self.department)
+        self.questions = [
+            Question.objects.create(competency=self.competency, text=f'Question {index}?') for index in range(3)
+        ]
+        self.evaluation = Evaluation.objects.create(
+            cycle=self.cycle, evaluatee=self.employee, evaluator=self.manager, evaluation_type='manager'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def save_draft(self, ratings):
+        answers = [{'question': question.pk, 'rating': rating} for question, rating in zip(self.questions, ratings)]
+        return self.client.post(
+            f'/api/evaluations/evaluations/{self.evaluation.pk}/save_draft/', {'answers': answers}, format='json'
+        )
+
+    def score(self):
+        return CompetencyScore.objects.get(
+            cycle=self.cycle, evaluatee=self.employee, competency=self.competency, evaluation_type='manager'
+        )
+
+    def test_drafts_are_not_aggregated(self):
+        self.save_draft([3, 4, 5])
+        self.assertFalse(CompetencyScore.objects.exists())
+
+    def test_submit_materializes_mean_and_stddev(self):
+        self.save_draft([3, 4, 5])
+        response = self.client.post(f'/api/evaluations/evaluations/{self.evaluation.pk}/submit/')
+
+        self.assertEqual(response.status_code, 200)
+        score = self.score()
+        self.assertEqual((score.answer_count, score.rating_sum, score.rating_sum_squares), (3, 12, 50))
+        self.assertAlmostEqual(score.mean, 4.0)
+        self.assertAlmostEqual(score.stddev, math.sqrt(2 / 3))
+
+    def test_save_draft_after_submit_refreshes_scores(self):
+        self.save_draft([3, 4, 5])
+        self.client.post(f'/api/evaluations/evaluations/{self.evaluation.pk}/submit/')
+
+        self.save_draft([5, 5, 5])
+
+        score = self.score()
+        self.assertAlmostEqual(score.mean, 5.0)
+        self.assertAlmostEqual(score.stddev, 0.0)
+
+    def test_rebuild_and_backfill_match_incremental_scores(self):
+        backfill = import_module('evaluations.migrations.0004_backfill_competency_scores').backfill_scores
+
+        self.save_draft([2, 4, 5])
+        self.client.post(f'/api/evaluations/evaluations/{self.evaluation.pk}/submit/')
+        incremental = self.score()
+
+        for rebuild in (lambda: rebuild_cycle_scores(self.cycle), lambda: backfill(apps, None)):
+            CompetencyScore.objects.all().delete()
+            rebuild()
+            score = self.score()
+            self.assertEqual(score.rating_sum_squares, incremental.rating_sum_squares)
+            self.assertAlmostEqual(score.mean, incremental.mean)
+            self.assertAlmostEqual(score.stddev, incremental.stddev)
+
+
+class BulkSaveAnswersTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.department = Department.objects.create(name='Engineering')
+        other_department = Department.objects.create(name='Sales')
+        manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        employee = User.objects.create_user('employee', 'employee@q360.az', 'pass', department=self.department)
+        cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        competency = Competency.objects.create(name='Teamwork', department=self.department)
+        self.questions = [Question.objects.create(competency=competency, text=f'Q{index}?') for index in range(3)]
+        foreign = Competency.objects.create(name='Selling', department=other_department)
+        self.foreign_question = Question.objects.create(competency=foreign, text='Closed deals?')
+        self.evaluation = Evaluation.objects.create(
+            cycle=cycle, evaluatee=employee, evaluator=manager, evaluation_type='manager'
+        )
+
+    def test_upserts_answers(self):
+        first, second, third = self.questions
+        Answer.objects.create(evaluation=self.evaluation, question=first, rating=2, comment='old')
+        Answer.objects.create(evaluation=self.evaluation, question=second, rating=4)
+
+        results = bulk_save_answers(self.evaluation, [
+            {'question': first.pk, 'rating': 3, 'comment': 'new'},
+            {'question': second.pk, 'rating': 4},
+            {'question': third.pk, 'rating': 5},
+        ])
+
+        self.assertEqual([result['status'] for result in results], ['updated', 'unchanged', 'created'])
+        self.assertEqual(
+            dict(self.evaluation.answers.values_list('question_id', 'rating')),
+            {first.pk: 3, second.pk: 4, third.pk: 5},
+        )
+        self.assertEqual(self.evaluation.answers.get(question=first).comment, 'new')
+
+    def test_rejects_invalid_items_without_touching_valid_ones(self):
+        question = self.questions[0]
+        results = bulk_save_answers(self.evaluation, [
+            {'question': self.foreign_question.pk, 'rating': 3},
+            {'question': 999999, 'rating': 3},
+            {'question': 'abc', 'rating': 3},
+            {'question': question.pk, 'rating': 9},
+            {'question': question.pk, 'rating': 4},
+            {'question': question.pk, 'rating': 5},
+            'not an object',
+        ])
+
+        self.assertEqual([result['status'] for result in results], ['error'] * 4 + ['created'] + ['error'] * 2)
+        self.assertEqual(results[0]['error'], 'Question does not belong to this evaluation')
+        self.assertEqual(results[1]['error'], 'Question does not belong to this evaluation')
+        self.assertEqual(results[5]['error'], 'Duplicate answer for this question')
+        self.assertEqual(list(self.evaluation.answers.values_list('question_id', 'rating')), [(question.pk, 4)])
+
+    def test_answers_inserted_by_a_concurrent_save_are_overwritten(self):
+        question = self.questions[0]
+        # The other autosave commits between this one's read and its write
+        concurrent = Answer.objects.none()
+        with mock.patch.object(Answer.objects, 'filter', return_value=concurrent):
+            Answer.objects.create(evaluation=self.evaluation, question=question, rating=2, comment='other tab')
+            results = bulk_save_answers(self.evaluation, [{'question': question.pk, 'rating': 5, 'comment': 'mine'}])
+
+        self.assertEqual(results, [{'question': question.pk, 'status': 'created'}])
+        self.assertEqual(list(self.evaluation.answers.values_list('rating', 'comment')), [(5, 'mine')])
+
+    def test_query_count_is_independent_of_payload_size(self):
+        payload = [{'question': self.questions[0].pk, 'rating': 3}]
+
+        def grow():
+            question = Question.objects.create(competency=self.questions[0].competency, text='More?')
+            payload.append({'question': question.pk, 'rating': 3})
+
+        self.assertConstantQueries(lambda: bulk_save_answers(self.evaluation, list(payload)), grow=grow)
+
+
+class AnswerExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.report = User.objects.create_user('report', 'report@q360.az', 'pass', manager=self.manager)
+        self.outsider = User.objects.create_user('outsider', 'outsider@q360.az', 'pass')
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        question = Question.objects.create(competency=Competency.objects.create(name='Teamwork'), text='Q?')
+        for evaluatee in (self.report, self.outsider):
+            evaluation = Evaluation.objects.create(
+                cycle=self.cycle, evaluatee=evaluatee, evaluator=self.admin, evaluation_type='manager'
+            )
+            Answer.objects.create(evaluation=evaluation, question=question, rating=4)
+        self.client = APIClient()
+
+    def exported_evaluatees(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get(f'/api/evaluations/cycles/{self.cycle.pk}/export_answers/')
+        self.assertEqual(response.status_code, 200)
+        rows = b''.join(response.streaming_content).decode('utf-8-sig').splitlines()[1:]
+        return {row.split(',')[3] for row in rows}
+
+    def test_admin_exports_every_answer(self):
+        self.assertEqual(self.exported_evaluatees(self.admin), {'report', 'outsider'})
+
+    def test_manager_exports_only_their_reporting_line(self):
+        self.assertEqual(self.exported_evaluatees(self.manager), {'report'})
+
+    def test_employee_cannot_export(self):
+        self.client.force_authenticate(self.report)
+        response = self.client.get(f'/api/evaluations/cycles/{self.cycle.pk}/export_answers/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_command_export_leaves_shared_report_artifacts_alone(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storage = override_settings(MEDIA_ROOT=media.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        artifact = default_storage.save(artifact_name('a' * 64, 'csv'), ContentFile(b'cached report'))
+        template = ReportTemplate.objects.create(name='Company', category='company')
+        reports = [
+            GeneratedReport.objects.create(
+                template=template, title='Company', format='csv', status='completed', cache_key='a' * 64,
+                file_path=artifact, content_path='reports/content/blob.json.gz', content_etag='b' * 64,
+            )
+            for _ in range(2)
+        ]
+
+        call_command('export_answers', cycle=self.cycle.pk, report=reports[0].pk, stdout=StringIO())
+
+        exported = GeneratedReport.objects.get(pk=reports[0].pk)
+        self.assertTrue(exported.file_path.startswith(f'reports/{exported.pk}/'))
+        self.assertEqual((exported.cache_key, exported.content_path, exported.content_etag), ('', '', ''))
+        with default_storage.open(exported.file_path) as export:
+            self.assertIn(b'outsider', export.read())
+        # The other report still has its artifact, and it is the only one served for the key
+        self.assertEqual(find_artifact('a' * 64)['file_path'], artifact)
+        with default_storage.open(artifact) as cached:
+            self.assertEqual(cached.read(), b'cached report')
+
+
+class CompetencyScoreScopeTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.director = User.objects.create_user('director', 'director@q360.az', 'pass', role='manager')
+        self.manager = User.objects.create_user(
+            'manager', 'manager@q360.az', 'pass', role='manager', manager=self.director
+        )
+        self.employee = User.objects.create_user('employee', 'employee@q360.az', 'pass', manager=self.manager)
+        self.outsider = User.objects.create_user('outsider', 'outsider@q360.az', 'pass')
+        cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        competency = Competency.objects.create(name='Teamwork')
+        self.scores = {
+            user.username: CompetencyScore.objects.create(
+                cycle=cycle, evaluatee=user, competency=competency, evaluation_type='manager',
+                answer_count=1, rating_sum=4, mean=4,
+            )
+            for user in (self.director, self.manager, self.employee, self.outsider)
+        }
+        self.client = APIClient()
+
+    def listed(self, user):
+        self.client.force_authenticate(user)
+        data = self.client.get('/api/evaluations/scores/').json()
+        rows = data['results'] if isinstance(data, dict) else data
+        return {row['id'] for row in rows}
+
+    def ids(self, *usernames):
+        return {self.scores[username].pk for username in usernames}
+
+    def test_lists_follow_the_reporting_line(self):
+        self.assertEqual(self.listed(self.employee), self.ids('employee'))
+        self.assertEqual(self.listed(self.manager), self.ids('manager', 'employee'))
+        # Indirect reports are included
+        self.assertEqual(self.listed(self.director), self.ids('director', 'manager', 'employee'))
+        self.assertEqual(self.listed(self.admin), self.ids('director', 'manager', 'employee', 'outsider'))
+
+    def test_rows_outside_the_scope_are_not_found(self):
+        for user, visible, hidden in [
+            (self.employee, 'employee', 'manager'),
+            (self.manager, 'employee', 'director'),
+            (self.admin, 'outsider', None),
+        ]:
+            self.client.force_authenticate(user)
+            response = self.client.get(f'/api/evaluations/scores/{self.scores[visible].pk}/')
+            self.assertEqual(response.status_code, 200, user.username)
+            if hidden:
+                response = self.client.get(f'/api/evaluations/scores/{self.scores[hidden].pk}/')
+                self.assertEqual(response.status_code, 404, user.username)
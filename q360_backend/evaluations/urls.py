@@ -9,6 +9,7 @@ router.register(r'competencies', views.CompetencyViewSet)
 router.register(r'questions', views.QuestionViewSet)
 router.register(r'evaluations', views.EvaluationViewSet)
 router.register(r'answers', views.AnswerViewSet)
+router.register(r'scores', views.CompetencyScoreViewSet)
 router.register(r'development-plans', views.DevelopmentPlanViewSet)
 router.register(r'development-goals', views.DevelopmentGoalViewSet)
 
@@ -5,16 +5,28 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from q360.query_planner import QueryPlanMixin, plan_queryset
+from django.db import transaction
+from django.utils import timezone
+from django.http import StreamingHttpResponse
 from .models import (
     EvaluationCycle, Competency, Question, 
-    Evaluation, Answer, DevelopmentPlan, DevelopmentGoal
+    Evaluation, Answer, CompetencyScore, DevelopmentPlan, DevelopmentGoal
 )
 from .serializers import (
     EvaluationCycleSerializer, CompetencySerializer, QuestionSerializer,
-    EvaluationSerializer, AnswerSerializer, DevelopmentPlanSerializer, DevelopmentGoalSerializer
+    EvaluationSerializer, AnswerSerializer, CompetencyScoreSerializer,
+    DevelopmentPlanSerializer, DevelopmentGoalSerializer
 )
+from .aggregation import refresh_evaluation_scores
+from .answers import bulk_save_answers
+from .exports import answer_rows, stream_csv, stream_xlsx
+from reports.writers import CONTENT_TYPES, FILE_EXTENSIONS
+from activity.stream import record_activity
+from accounts.permissions import IsAdmin, IsManager, ReportingScopeFilter, get_permission_context
+from notifications.dispatch import dispatch, cycle_evaluators, pending_cycle_evaluators
 
-class EvaluationCycleViewSet(viewsets.ModelViewSet):
+class EvaluationCycleViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = EvaluationCycle.objects.all()
     serializer_class = EvaluationCycleSerializer
     permission_classes = [IsAuthenticated]
@@ -23,14 +35,49 @@ class EvaluationCycleViewSet(viewsets.ModelViewSet):
     search_fields = ['name', 'description']
     ordering_fields = ['start_date', 'end_date', 'created_at']
 
-class CompetencyViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin | IsManager])
+    def notify_evaluators(self, request, pk=None):
+        cycle = self.get_object()
+        # {"pending": true} reminds only evaluators with unsubmitted evaluations
+        pending_only = request.data.get('pending') in (True, 'true', '1', 1)
+        recipients = pending_cycle_evaluators(cycle) if pending_only else cycle_evaluators(cycle)
+        with transaction.atomic():
+            sent = dispatch(
+                'evaluations',
+                request.data.get('title') or f'Qiymətləndirmə dövrü: {cycle.name}',
+                request.data.get('message') or f'{cycle.name} dövrü üzrə qiymətləndirmələrinizi {cycle.end_date} tarixinədək tamamlayın.',
+                recipients,
+                sender=request.user,
+                related_object=cycle,
+            )
+        return Response(sent)
+
+    @action(detail=True, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin | IsManager])
+    def export_answers(self, request, pk=None):
+        cycle = self.get_object()
+        # Managers export only the answers about people in their reporting line
+        answers = get_permission_context(request).scope(Answer.objects.all(), 'evaluation__evaluatee')
+        # Not `format`, which DRF reserves for renderer selection
+        export_format = request.query_params.get('export_format', 'csv')
+        if export_format == 'csv':
+            content = stream_csv(answer_rows(cycle, answers))
+        elif export_format == 'excel':
+            content = stream_xlsx(answer_rows(cycle, answers))
+        else:
+            return Response({'error': 'export_format must be csv or excel'}, status=status.HTTP_400_BAD_REQUEST)
+        response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[export_format])
+        filename = f'cycle-{cycle.pk}-answers.{FILE_EXTENSIONS[export_format]}'
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+class CompetencyViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Competency.objects.all()
     serializer_class = CompetencySerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     search_fields = ['name', 'description']
 
-class QuestionViewSet(viewsets.ModelViewSet):
+class QuestionViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Question.objects.all()
     serializer_class = QuestionSerializer
     permission_classes = [IsAuthenticated]
@@ -38,7 +85,7 @@ class QuestionViewSet(viewsets.ModelViewSet):
     filterset_fields = ['competency']
     search_fields = ['text']
 
-class EvaluationViewSet(viewsets.ModelViewSet):
+class EvaluationViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Evaluation.objects.all()
     serializer_class = EvaluationSerializer
     permission_classes = [IsAuthenticated]
@@ -46,12 +93,26 @@ class EvaluationViewSet(viewsets.ModelViewSet):
     filterset_fields = ['cycle', 'evaluatee', 'evaluator', 'evaluation_type', 'is_submitted']
     search_fields = ['cycle__name']
 
+    def _serialize_planned(self, evaluation):
+        """Serialize a single evaluation, fetching its nested graph in a fixed number of queries"""
+        evaluation = plan_queryset(Evaluation.objects.filter(pk=evaluation.pk), self.get_serializer()).get()
+        return self.get_serializer(evaluation).data
+
     @action(detail=True, methods=['post'])
     def submit(self, request, pk=None):
         """Submit the evaluation"""
         evaluation = self.get_object()
-        evaluation.is_submitted = True
-        evaluation.save()
+        with transaction.atomic():
+            evaluation.is_submitted = True
+            evaluation.submitted_at = timezone.now()
+            evaluation.save()
+            # Keep the materialized competency scores in step with submissions
+            refresh_evaluation_scores(evaluation)
+            record_activity(
+                'evaluation_submitted', request.user,
+                f'Qiymətləndirmə tamamlandı: {evaluation.cycle.name}',
+                target=evaluation, users=[evaluation.evaluatee],
+            )
         return Response({'status': 'Evaluation submitted successfully'})
 
     @action(detail=True, methods=['post'])
@@ -59,42 +120,28 @@ class EvaluationViewSet(viewsets.ModelViewSet):
         """Save evaluation as draft with answers"""
         evaluation = self.get_object()
         answers_data = request.data.get('answers', [])
+        if not isinstance(answers_data, list):
+            return Response({'error': 'Answers must be a list'}, status=status.HTTP_400_BAD_REQUEST)
         
-        # Save each answer
-        for answer_data in answers_data:
-            question_id = answer_data.get('question')
-            rating = answer_data.get('rating')
-            comment = answer_data.get('comment', '')
-            
-            if question_id and rating:
-                # Get or create the answer
-                answer, created = Answer.objects.get_or_create(
-                    evaluation=evaluation,
-                    question_id=question_id,
-                    defaults={
-                        'rating': rating,
-                        'comment': comment
-                    }
-                )
-                # If answer already exists, update it
-                if not created:
-                    answer.rating = rating
-                    answer.comment = comment
-                    answer.save()
-        
-        # Update evaluation to indicate it has draft data
-        evaluation.save()
+        with transaction.atomic():
+            results = bulk_save_answers(evaluation, answers_data)
+            # Update evaluation to indicate it has draft data
+            evaluation.save()
+            # Edits after submission change ratings that are already aggregated
+            if evaluation.is_submitted:
+                refresh_evaluation_scores(evaluation)
         
         return Response({
             'status': 'Draft saved successfully',
-            'evaluation': EvaluationSerializer(evaluation).data
+            'results': results,
+            'evaluation': self._serialize_planned(evaluation)
         })
 
     @action(detail=True, methods=['get'])
     def get_questions(self, request, pk=None):
         """Get all questions for this evaluation's cycle"""
         evaluation = self.get_object()
-        questions = Question.objects.filter(competency__department=evaluation.evaluatee.department)
+        questions = plan_queryset(evaluation.get_questions(), QuestionSerializer())
         serializer = QuestionSerializer(questions, many=True)
         return Response(serializer.data)
 
@@ -102,18 +149,27 @@ class EvaluationViewSet(viewsets.ModelViewSet):
     def get_answers(self, request, pk=None):
         """Get all answers for this evaluation"""
         evaluation = self.get_object()
-        answers = evaluation.answers.all()
+        answers = plan_queryset(evaluation.answers.all(), AnswerSerializer())
         serializer = AnswerSerializer(answers, many=True)
         return Response(serializer.data)
 
-class AnswerViewSet(viewsets.ModelViewSet):
+class AnswerViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Answer.objects.all()
     serializer_class = AnswerSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['evaluation', 'question']
 
-class DevelopmentPlanViewSet(viewsets.ModelViewSet):
+class CompetencyScoreViewSet(QueryPlanMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = CompetencyScore.objects.order_by('cycle', 'evaluatee', 'competency', 'evaluation_type')
+    serializer_class = CompetencyScoreSerializer
+    permission_classes = [IsAuthenticated]
+    filter_backends = [ReportingScopeFilter, DjangoFilterBackend, filters.OrderingFilter]
+    scope_field = 'evaluatee'
+    filterset_fields = ['cycle', 'evaluatee', 'competency', 'evaluation_type']
+    ordering_fields = ['mean', 'answer_count', 'updated_at']
+
+class DevelopmentPlanViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = DevelopmentPlan.objects.all()
     serializer_class = DevelopmentPlanSerializer
     permission_classes = [IsAuthenticated]
@@ -121,7 +177,7 @@ class DevelopmentPlanViewSet(viewsets.ModelViewSet):
     filterset_fields = ['employee', 'status']
     search_fields = ['title', 'description']
 
-class DevelopmentGoalViewSet(viewsets.ModelViewSet):
+class DevelopmentGoalViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = DevelopmentGoal.objects.all()
     serializer_class = DevelopmentGoalSerializer
     permission_classes = [IsAuthenticated]
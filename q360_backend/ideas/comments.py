@@ -0,0 +1,71 @@
+# ideas/comments.py
+"""
+In-memory assembly of idea comment threads.
+
+All comments of an idea are fetched with a single query and linked to their
+parents in Python. Every comment gets a ``tree_replies`` list that
+``IdeaCommentSerializer`` renders instead of querying ``obj.replies`` for each
+node.
+"""
+from collections import defaultdict
+
+from .models import IdeaComment
+
+
+def comment_queryset():
+    return IdeaComment.objects.select_related('author').order_by('created_at', 'id')
+
+
+def build_comment_tree(comments, root_id=None, max_depth=None):
+    """Link ``comments`` into threads and return the ones directly below ``root_id``.
+
+    ``root_id=None`` returns the top-level threads. Comments deeper than
+    ``max_depth`` levels (1 = the returned level only) keep an empty
+    ``tree_replies`` and are marked with ``replies_truncated``.
+    """
+    children = defaultdict(list)
+    for comment in comments:
+        children[comment.parent_id].append(comment)
+
+    roots = children.get(root_id, [])
+    level = roots
+    depth = 1
+    while level:
+        next_level = []
+        for comment in level:
+            replies = children.get(comment.pk, [])
+            if max_depth is not None and depth >= max_depth:
+                comment.tree_replies = []
+                comment.replies_truncated = bool(replies)
+            else:
+                comment.tree_replies = replies
+                comment.replies_truncated = False
+                next_level.extend(replies)
+        level = next_level
+        depth += 1
+    return roots
+
+
+def load_comment_tree(idea, parent_id=None, max_depth=None):
+    """Return the threads of ``idea`` (or the replies below ``parent_id``) in one query"""
+    comments = list(comment_queryset().filter(idea=idea))
+    return build_comment_tree(comments, root_id=parent_id, max_depth=max_depth)
+
+
+def attach_comment_trees(comments):
+    """Populate ``tree_replies`` on arbitrary comments with one query per call.
+
+    Used when comments come from somewhere other than ``load_comment_tree``
+    (the comments viewset, a freshly created comment); the full threads of
+    every idea involved are loaded together.
+    """
+    pending = [comment for comment in comments if not hasattr(comment, 'tree_replies')]
+    if not pending:
+        return
+    loaded = list(comment_queryset().filter(idea_id__in={comment.idea_id for comment in pending}))
+    build_comment_tree(loaded)
+    by_pk = {comment.pk: comment for comment in loaded}
+    for comment in pending:
+        node = by_pk.get(comment.pk)
+        comment.tree_replies = node.tree_replies if node is not None else []
+        comment.replies_truncated = False
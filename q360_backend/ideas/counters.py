@@ -0,0 +1,76 @@
+# ideas/counters.py
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from .models import Idea, IdeaLike, IdeaComment
+
+# Counter column -> related model whose rows it counts
+COUNTED_RELATIONS = {
+    'likes_count': IdeaLike,
+    'comments_count': IdeaComment,
+}
+
+
+def _current_likes(idea_id):
+    return Idea.objects.values_list('likes_count', flat=True).get(pk=idea_id)
+
+
+def add_like(idea, user):
+    """Like an idea; returns (created, likes_count).
+
+    The IdeaLike insert and the ``F()`` counter update (ideas.signals) commit
+    together, and the unique (idea, user) constraint makes double clicks a no-op.
+    """
+    try:
+        with transaction.atomic():
+            IdeaLike.objects.create(idea=idea, user=user)
+    except IntegrityError:
+        return False, _current_likes(idea.pk)
+    return True, _current_likes(idea.pk)
+
+
+def remove_like(idea, user):
+    """Remove a like if present; returns (removed, likes_count)"""
+    with transaction.atomic():
+        deleted, _ = IdeaLike.objects.filter(idea=idea, user=user).delete()
+    return bool(deleted), _current_likes(idea.pk)
+
+
+def toggle_like(idea, user):
+    """Like the idea, or unlike it when the user already liked it"""
+    created, likes_count = add_like(idea, user)
+    if created:
+        return True, likes_count
+    _, likes_count = remove_like(idea, user)
+    return False, likes_count
+
+
+def _count_subquery(model):
+    counts = model.objects.filter(idea=OuterRef('pk')).order_by().values('idea').annotate(
+        total=Count('id')
+    ).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def reconcile_idea_counters(batch_size=1000, dry_run=False):
+    """Recompute denormalized counters from their source tables.
+
+    Drifted ideas are found with one query and rewritten in ``batch_size``
+    chunks of a single correlated UPDATE. Returns the number of ideas fixed
+    per counter.
+    """
+    fixed = {}
+    for column, model in COUNTED_RELATIONS.items():
+        drifted = list(
+            Idea.objects.annotate(actual=_count_subquery(model))
+            .filter(~Q(**{column: F('actual')}))
+            .values_list('pk', flat=True)
+        )
+        fixed[column] = len(drifted)
+        if dry_run:
+            continue
+        for start in range(0, len(drifted), batch_size):
+            Idea.objects.filter(pk__in=drifted[start:start + batch_size]).update(
+                **{column: _count_subquery(model)}
+            )
+    return fixed
@@ -0,0 +1,16 @@
+# ideas/management/commands/flush_idea_views.py
+from django.core.management.base import BaseCommand, CommandError
+from ideas.tracking import get_view_buffer
+
+class Command(BaseCommand):
+    help = 'Flush buffered idea views into Idea.views_count (shared buffers, e.g. the Redis backend)'
+
+    def handle(self, *args, **options):
+        buffer = get_view_buffer()
+        if not buffer.backend.shared:
+            raise CommandError(
+                f'{type(buffer.backend).__name__} buffers views inside each web process, so this command '
+                'cannot reach them; set IDEA_VIEW_BUFFER["BACKEND"] to ideas.tracking.RedisViewCountBackend'
+            )
+        written = buffer.flush()
+        self.stdout.write(f'Flushed {written} buffered idea views')
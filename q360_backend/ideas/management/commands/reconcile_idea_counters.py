@@ -0,0 +1,16 @@
+# ideas/management/commands/reconcile_idea_counters.py
+from django.core.management.base import BaseCommand
+from ideas.counters import reconcile_idea_counters
+
+class Command(BaseCommand):
+    help = 'Recompute Idea.likes_count and Idea.comments_count from their source rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_idea_counters(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        verb = 'would be fixed' if options['dry_run'] else 'fixed'
+        for column, count in fixed.items():
+            self.stdout.write(f'{column}: {count} ideas {verb}')
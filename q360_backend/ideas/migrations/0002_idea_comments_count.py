@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:23
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_comments_count(apps, schema_editor):
+    Idea = apps.get_model("ideas", "Idea")
+    IdeaComment = apps.get_model("ideas", "IdeaComment")
+    counts = (
+        IdeaComment.objects.filter(idea=OuterRef("pk"))
+        .order_by()
+        .values("idea")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Idea.objects.update(comments_count=Coalesce(Subquery(counts), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("ideas", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="idea",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_comments_count, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="idea",
+            index=models.Index(
+                fields=["-created_at", "-id"], name="idea_feed_recent_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="idea",
+            index=models.Index(
+                fields=["-likes_count", "-id"], name="idea_feed_popular_idx"
+            ),
+        ),
+    ]
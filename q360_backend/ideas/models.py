@@ -35,6 +35,7 @@ class Idea(models.Model):
     
     likes_count = models.PositiveIntegerField(default=0)
     views_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)  # Kept in sync by ideas.signals
     
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -43,6 +44,11 @@ class Idea(models.Model):
         verbose_name = 'Idea'
         verbose_name_plural = 'Ideas'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination for the ideas feed
+            models.Index(fields=['-created_at', '-id'], name='idea_feed_recent_idx'),
+            models.Index(fields=['-likes_count', '-id'], name='idea_feed_popular_idx'),
+        ]
     
     def __str__(self):
         return self.title
@@ -0,0 +1,97 @@
+# ideas/pagination.py
+import base64
+import json
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over a composite ``(sort column, id)`` key.
+
+    Unlike ``CursorPagination`` (which falls back to an offset for ties on the
+    first column) every page is a plain indexed range scan, so ties in
+    ``likes_count`` cost nothing and page N is as cheap as page 1.
+    """
+    cursor_query_param = 'cursor'
+    sort_query_param = 'sort'
+    page_size_query_param = 'page_size'
+    page_size = 20
+    max_page_size = 100
+    # sort name -> (column, parser for the cursor value)
+    sort_keys = {
+        'recent': ('created_at', parse_datetime),
+        'popular': ('likes_count', int),
+    }
+    default_sort = 'recent'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, encoded, parse):
+        try:
+            value, pk = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            value = parse(value)
+            pk = int(pk)
+        except (TypeError, ValueError, UnicodeDecodeError):
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        if value is None:
+            raise ValidationError({self.cursor_query_param: 'Invalid cursor'})
+        return value, pk
+
+    def encode_cursor(self, value, pk):
+        if hasattr(value, 'isoformat'):
+            value = value.isoformat()
+        return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.sort = request.query_params.get(self.sort_query_param, self.default_sort)
+        if self.sort not in self.sort_keys:
+            raise ValidationError({self.sort_query_param: f'Must be one of: {", ".join(self.sort_keys)}'})
+        column, parse = self.sort_keys[self.sort]
+        self.column = column
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded:
+            value, pk = self.decode_cursor(encoded, parse)
+            queryset = queryset.filter(Q(**{f'{column}__lt': value}) | Q(**{column: value, 'pk__lt': pk}))
+
+        page_size = self.get_page_size(request)
+        # Fetch one extra row to learn whether another page exists
+        page = list(queryset.order_by(f'-{column}', '-pk')[:page_size + 1])
+        self.has_next = len(page) > page_size
+        self.page = page[:page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        url = self.request.build_absolute_uri()
+        url = replace_query_param(url, self.sort_query_param, self.sort)
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(getattr(last, self.column), last.pk)
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+
+class CommentThreadPagination(LimitOffsetPagination):
+    """Optional ``?limit=&offset=`` paging of top-level comment threads"""
+    # Without ``limit`` the full list is returned, as before
+    default_limit = None
+    max_limit = 100
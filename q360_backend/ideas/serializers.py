@@ -1,6 +1,10 @@
 # ideas/serializers.py
+from django.db import models
+from django.db.models import Prefetch
 from rest_framework import serializers
+from q360.serializers import DynamicFieldsMixin, nested_context
 from .models import Idea, IdeaCategory, IdeaLike, IdeaComment
+from .comments import attach_comment_trees, build_comment_tree, comment_queryset
 from accounts.models import User, Department
 
 class UserSerializer(serializers.ModelSerializer):
@@ -13,43 +17,81 @@ class DepartmentSerializer(serializers.ModelSerializer):
         model = Department
         fields = '__all__'
 
-class IdeaCategorySerializer(serializers.ModelSerializer):
+class IdeaCategorySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = IdeaCategory
         fields = '__all__'
 
-class IdeaLikeSerializer(serializers.ModelSerializer):
+class IdeaLikeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = IdeaLike
         fields = '__all__'
 
-class IdeaCommentSerializer(serializers.ModelSerializer):
+class IdeaCommentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        comments = list(data.all() if isinstance(data, models.Manager) else data)
+        # Load the threads of every comment on the page at once instead of per node
+        attach_comment_trees(comments)
+        return super().to_representation(comments)
+
+class IdeaCommentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     replies = serializers.SerializerMethodField()
+    replies_truncated = serializers.SerializerMethodField()
     
     class Meta:
         model = IdeaComment
         fields = '__all__'
+        expandable_fields = ['replies']
+        list_serializer_class = IdeaCommentListSerializer
     
     def get_replies(self, obj):
-        if obj.replies.exists():
-            return IdeaCommentSerializer(obj.replies.all(), many=True).data
-        return []
+        if not hasattr(obj, 'tree_replies'):
+            attach_comment_trees([obj])
+        return IdeaCommentSerializer(obj.tree_replies, many=True, context=nested_context(self.context)).data
+    
+    def get_replies_truncated(self, obj):
+        return getattr(obj, 'replies_truncated', False)
 
-class IdeaSerializer(serializers.ModelSerializer):
+class IdeaSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     submitter = UserSerializer(read_only=True)
     category = IdeaCategorySerializer(read_only=True)
     department = DepartmentSerializer(read_only=True)
     likes = IdeaLikeSerializer(many=True, read_only=True)
-    comments = IdeaCommentSerializer(many=True, read_only=True)
+    comments = serializers.SerializerMethodField()
     likes_count = serializers.IntegerField(read_only=True)
-    comments_count = serializers.SerializerMethodField()
+    comments_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = Idea
         fields = '__all__'
+        expandable_fields = ['likes', 'comments']
+        query_hints = {
+            'comments': {'prefetch_related': [Prefetch('comments', queryset=comment_queryset())]},
+        }
+    
+    def get_comments(self, obj):
+        """Top-level threads, assembled from the idea's prefetched comments"""
+        if 'comments' in getattr(obj, '_prefetched_objects_cache', {}):
+            comments = obj.comments.all()
+        else:
+            comments = comment_queryset().filter(idea=obj)
+        threads = build_comment_tree(comments)
+        return IdeaCommentSerializer(threads, many=True, context=nested_context(self.context)).data
+
+class IdeaFeedSerializer(serializers.ModelSerializer):
+    """Lean projection used by the ideas board feed"""
+    submitter_name = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = Idea
+        fields = [
+            'id', 'title', 'status', 'category', 'department', 'submitter', 'submitter_name',
+            'likes_count', 'comments_count', 'views_count', 'created_at'
+        ]
+        read_only_fields = fields
     
-    def get_comments_count(self, obj):
-        return obj.comments.count()
\ No newline at end of file
+    def get_submitter_name(self, obj):
+        return obj.submitter.get_full_name() or obj.submitter.username
\ No newline at end of file
@@ -0,0 +1,28 @@
+# ideas/signals.py
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Idea, IdeaLike, IdeaComment
+
+@receiver(post_save, sender=IdeaComment)
+def increment_comments_count(sender, instance, created, **kwargs):
+    if created:
+        Idea.objects.filter(pk=instance.idea_id).update(comments_count=F('comments_count') + 1)
+
+@receiver(post_delete, sender=IdeaComment)
+def decrement_comments_count(sender, instance, **kwargs):
+    # Replies removed by cascade fire this signal too, keeping the count exact
+    Idea.objects.filter(pk=instance.idea_id, comments_count__gt=0).update(
+        comments_count=F('comments_count') - 1
+    )
+
+@receiver(post_save, sender=IdeaLike)
+def increment_likes_count(sender, instance, created, **kwargs):
+    if created:
+        Idea.objects.filter(pk=instance.idea_id).update(likes_count=F('likes_count') + 1)
+
+@receiver(post_delete, sender=IdeaLike)
+def decrement_likes_count(sender, instance, **kwargs):
+    Idea.objects.filter(pk=instance.idea_id, likes_count__gt=0).update(
+        likes_count=F('likes_count') - 1
+    )
@@ -0,0 +1,12 @@
+# ideas/tasks.py
+from celery import shared_task
+from .tracking import get_view_buffer
+
+
+@shared_task
+def flush_idea_views_task():
+    """Write out views buffered by workers that have gone idle (shared backends only)"""
+    buffer = get_view_buffer()
+    if not buffer.backend.shared:
+        return 0
+    return buffer.flush()
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import threading
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test import TestCase, TransactionTestCase
+
+from rest_framework.test import APIClient
+
+from accounts.models import User, Department
+from q360.query_planner import plan_queryset
+from q360.testing import QueryCountAssertionsMixin
+from .comments import build_comment_tree
+from .counters import add_like, remove_like, toggle_like, reconcile_idea_counters
+from .models import Idea, IdeaCategory, IdeaComment, IdeaLike
+from .serializers import IdeaSerializer
+from .tracking import LocalViewCountBackend, ViewCountBuffer, write_view_counts
+
+
+class IdeaLikeCounterTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', 'author@q360.az', 'pass')
+        self.idea = Idea.objects.create(title='Idea', description='Text', submitter=self.author)
+
+    def test_toggle_like_keeps_counter_in_step(self):
+        self.assertEqual(toggle_like(self.idea, self.author), (True, 1))
+        self.assertEqual(toggle_like(self.idea, self.author), (False, 0))
+
+    def test_duplicate_like_and_missing_unlike_are_noops(self):
+        add_like(self.idea, self.author)
+        self.assertEqual(add_like(self.idea, self.author), (False, 1))
+        remove_like(self.idea, self.author)
+        self.assertEqual(remove_like(self.idea, self.author), (False, 0))
+
+    def test_reconcile_repairs_drifted_counters(self):
+        add_like(self.idea, self.author)
+        Idea.objects.filter(pk=self.idea.pk).update(likes_count=7, comments_count=3)
+        self.assertEqual(reconcile_idea_counters(), {'likes_count': 1, 'comments_count': 1})
+        self.idea.refresh_from_db()
+        self.assertEqual((self.idea.likes_count, self.idea.comments_count), (1, 0))
+
+
+class IdeaQueryPlanTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', 'author@q360.az', 'pass')
+        self.category = IdeaCategory.objects.create(name='Process')
+        self.department = Department.objects.create(name='Engineering')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def add_idea(self):
+        index = Idea.objects.count()
+        idea = Idea.objects.create(
+            title=f'Idea {index}', description='Text', submitter=self.user,
+            category=self.category, department=self.department,
+        )
+        liker = User.objects.create_user(f'liker{index}', f'liker{index}@q360.az', 'pass')
+        IdeaLike.objects.create(idea=idea, user=liker)
+        comment = IdeaComment.objects.create(idea=idea, author=liker, content='Nice')
+        IdeaComment.objects.create(idea=idea, author=self.user, content='Thanks', parent=comment)
+        return idea
+
+    def test_plan_joins_single_relations_and_prefetches_collections(self):
+        queryset = plan_queryset(Idea.objects.all(), IdeaSerializer())
+
+        self.assertEqual(queryset.query.select_related, {'submitter': {}, 'category': {}, 'department': {}})
+        self.assertEqual(
+            [getattr(lookup, 'prefetch_to', lookup) for lookup in queryset._prefetch_related_lookups],
+            ['likes', 'comments'],
+        )
+
+    def test_list_query_count_is_independent_of_page_contents(self):
+        self.add_idea()
+        self.assertConstantQueries(lambda: self.client.get('/api/ideas/ideas/'), grow=self.add_idea)
+
+    def test_retrieve_query_count_is_independent_of_comment_count(self):
+        idea = self.add_idea()
+        self.assertConstantQueries(
+            lambda: self.client.get(f'/api/ideas/ideas/{idea.pk}/'),
+            grow=lambda: IdeaComment.objects.create(idea=idea, author=self.user, content='More'),
+        )
+
+
+class DynamicFieldsTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', 'author@q360.az', 'pass')
+        category = IdeaCategory.objects.create(name='Process')
+        self.idea = Idea.objects.create(title='Idea', description='Text', submitter=self.user, category=category)
+        IdeaLike.objects.create(idea=self.idea, user=self.user)
+        IdeaComment.objects.create(idea=self.idea, author=self.user, content='Nice')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_first(self, query):
+        response, queries = self.count_queries(self.client.get, f'/api/ideas/ideas/{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results'][0], queries
+
+    def test_without_parameters_payload_keeps_declared_nesting(self):
+        idea, queries = self.get_first('')
+        self.assertEqual(idea['submitter']['username'], 'author')
+        self.assertEqual(len(idea['likes']), 1)
+        self.assertEqual(len(idea['comments']), 1)
+        # Page count, ideas with joins, likes prefetch, comments prefetch
+        self.assertEqual(queries, 4)
+
+    def test_fields_limits_payload_and_skips_prefetches(self):
+        idea, queries = self.get_first('?fields=id,title')
+        self.assertEqual(idea, {'id': self.idea.pk, 'title': 'Idea'})
+        self.assertEqual(queries, 2)
+
+    def test_expand_nests_only_listed_relations(self):
+        idea, queries = self.get_first('?expand=submitter')
+        self.assertEqual(idea['submitter']['username'], 'author')
+        self.assertEqual(idea['category'], self.idea.category_id)
+        self.assertNotIn('likes', idea)
+        self.assertNotIn('comments', idea)
+        self.assertEqual(queries, 2)
+
+    def test_fields_and_expand_combine(self):
+        idea, queries = self.get_first('?fields=id,submitter,likes&expand=likes')
+        self.assertEqual(set(idea), {'id', 'submitter', 'likes'})
+        self.assertEqual(idea['submitter'], self.user.pk)
+        self.assertEqual(idea['likes'][0]['user']['username'], 'author')
+        self.assertEqual(queries, 3)
+
+    def test_parameters_do_not_leak_into_nested_comments(self):
+        IdeaComment.objects.create(
+            idea=self.idea, author=self.user, content='Reply', parent=IdeaComment.objects.get(idea=self.idea)
+        )
+        idea, _ = self.get_first('?fields=id,comments&expand=comments')
+        self.assertEqual(set(idea), {'id', 'comments'})
+        thread = idea['comments'][0]
+        self.assertEqual(thread['content'], 'Nice')
+        self.assertEqual(thread['author']['username'], 'author')
+        self.assertEqual(thread['replies'][0]['content'], 'Reply')
+
+    def test_comment_endpoint_parameters_apply_to_top_level_only(self):
+        comment = IdeaComment.objects.get(idea=self.idea)
+        IdeaComment.objects.create(idea=self.idea, author=self.user, content='Reply', parent=comment)
+        response = self.client.get(f'/api/ideas/comments/{comment.pk}/?fields=id,replies&expand=replies')
+        self.assertEqual(set(response.json()), {'id', 'replies'})
+        self.assertEqual(response.json()['replies'][0]['content'], 'Reply')
+
+    def test_empty_expand_flattens_everything(self):
+        idea, _ = self.get_first('?expand=')
+        self.assertEqual(idea['submitter'], self.user.pk)
+        self.assertEqual(idea['category'], self.idea.category_id)
+
+
+class CommentThreadTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user('author', 'author@q360.az', 'pass')
+        self.idea = Idea.objects.create(title='Idea', description='Text', submitter=self.author)
+        self.threads = [
+            IdeaComment.objects.create(idea=self.idea, author=self.author, content=f'Thread {index}')
+            for index in range(3)
+        ]
+        self.reply = IdeaComment.objects.create(
+            idea=self.idea, author=self.author, content='Reply', parent=self.threads[0]
+        )
+        self.nested = IdeaComment.objects.create(
+            idea=self.idea, author=self.author, content='Nested', parent=self.reply
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.author)
+
+    def get(self, **params):
+        return self.client.get(f'/api/ideas/ideas/{self.idea.pk}/comments/', params)
+
+    def test_build_comment_tree_truncates_below_max_depth(self):
+        comments = list(IdeaComment.objects.order_by('created_at', 'id'))
+
+        roots = build_comment_tree(comments, max_depth=2)
+
+        self.assertEqual([comment.pk for comment in roots], [thread.pk for thread in self.threads])
+        first = roots[0]
+        self.assertEqual((first.tree_replies, first.replies_truncated), ([self.reply], False))
+        reply = first.tree_replies[0]
+        self.assertEqual((reply.tree_replies, reply.replies_truncated), ([], True))
+        # Comments without replies are never marked as truncated
+        self.assertFalse(roots[1].replies_truncated)
+        self.assertEqual(build_comment_tree(comments, root_id=self.reply.pk)[0].pk, self.nested.pk)
+
+    def test_depth_truncates_the_rendered_threads(self):
+        shallow = self.get(depth=1).json()
+        self.assertEqual([(thread['replies'], thread['replies_truncated']) for thread in shallow], [
+            ([], True), ([], False), ([], False),
+        ])
+
+        reply = self.get(depth=2).json()[0]['replies'][0]
+        self.assertEqual((reply['id'], reply['replies'], reply['replies_truncated']), (self.reply.pk, [], True))
+
+        full = self.get().json()[0]['replies'][0]['replies'][0]
+        self.assertEqual((full['id'], full['replies_truncated']), (self.nested.pk, False))
+
+    def test_parent_fetches_a_subtree(self):
+        replies = self.get(parent=self.threads[0].pk).json()
+
+        self.assertEqual([reply['id'] for reply in replies], [self.reply.pk])
+        self.assertEqual([nested['id'] for nested in replies[0]['replies']], [self.nested.pk])
+
+    def test_limit_and_offset_page_the_top_level_threads(self):
+        page = self.get(limit=2, offset=1).json()
+
+        self.assertEqual(page['count'], 3)
+        self.assertEqual([thread['id'] for thread in page['results']], [self.threads[1].pk, self.threads[2].pk])
+        self.assertIsNone(page['next'])
+        self.assertEqual([thread['id'] for thread in self.get(limit=1).json()['results']], [self.threads[0].pk])
+
+    def test_invalid_depth_and_parent_are_rejected(self):
+        for params in ({'depth': 0}, {'depth': 'all'}, {'parent': 'x'}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+
+class IdeaFeedTests(QueryCountAssertionsMixin, TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('author', 'author@q360.az', 'pass', first_name='Aysel')
+        # Pairs of ideas share a likes_count so popular pages must break ties on id
+        self.ideas = [
+            Idea.objects.create(title=f'Idea {index}', description='Text', submitter=self.user, likes_count=index // 2)
+            for index in range(7)
+        ]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, sort):
+        ids, url = [], f'/api/ideas/ideas/feed/?sort={sort}&page_size=2'
+        while url:
+            response, queries = self.count_queries(self.client.get, url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(queries, 1)
+            ids.extend(idea['id'] for idea in response.json()['results'])
+            url = response.json()['next']
+        return ids
+
+    def test_popular_pages_cover_every_idea_once_across_ties(self):
+        expected = [idea.pk for idea in sorted(self.ideas, key=lambda idea: (idea.likes_count, idea.pk), reverse=True)]
+        self.assertEqual(self.walk('popular'), expected)
+
+    def test_recent_pages_follow_creation_order(self):
+        self.assertEqual(self.walk('recent'), [idea.pk for idea in reversed(self.ideas)])
+
+    def test_feed_is_a_lean_projection(self):
+        idea = self.client.get('/api/ideas/ideas/feed/').json()['results'][0]
+        self.assertEqual(idea['submitter_name'], 'Aysel')
+        self.assertNotIn('description', idea)
+        self.assertNotIn('comments', idea)
+
+    def test_rejects_unknown_sort_and_malformed_cursor(self):
+        self.assertEqual(self.client.get('/api/ideas/ideas/feed/?sort=oldest').status_code, 400)
+        self.assertEqual(self.client.get('/api/ideas/ideas/feed/?cursor=not-a-cursor').status_code, 400)
+
+    def test_comments_count_follows_comment_lifecycle(self):
+        idea = self.ideas[0]
+        comment = IdeaComment.objects.create(idea=idea, author=self.user, content='Top')
+        IdeaComment.objects.create(idea=idea, author=self.user, content='Reply', parent=comment)
+        idea.refresh_from_db()
+        self.assertEqual(idea.comments_count, 2)
+
+        # Deleting the thread cascades to the reply
+        comment.delete()
+        idea.refresh_from_db()
+        self.assertEqual(idea.comments_count, 0)
+
+
+class ViewCountBufferTests(TestCase):
+    def setUp(self):
+        author = User.objects.create_user('author', 'author@q360.az', 'pass')
+        self.ideas = [
+            Idea.objects.create(title=f'Idea {index}', description='Text', submitter=author) for index in range(3)
+        ]
+        self.backend = LocalViewCountBackend()
+
+    def views(self):
+        return [Idea.objects.get(pk=idea.pk).views_count for idea in self.ideas]
+
+    def test_local_backend_coalesces_and_drains_once(self):
+        for idea_id in [1, 2, 1, 1]:
+            self.backend.increment(idea_id)
+        self.assertEqual(self.backend.drain(), {1: 3, 2: 1})
+        self.assertEqual(self.backend.drain(), {})
+
+    def test_buffer_flushes_at_threshold(self):
+        buffer = ViewCountBuffer(self.backend, flush_interval=3600, flush_threshold=3, batch_size=500)
+        buffer.record(self.ideas[0].pk)
+        buffer.record(self.ideas[1].pk)
+        self.assertEqual(self.views(), [0, 0, 0])
+
+        buffer.record(self.ideas[0].pk)
+        self.assertEqual(self.views(), [2, 1, 0])
+        self.assertEqual(self.backend.drain(), {})
+
+    def test_write_is_atomic_across_batches(self):
+        real_update = QuerySet.update
+        calls = []
+
+        def fail_second_batch(queryset, **kwargs):
+            calls.append(kwargs)
+            if len(calls) == 2:
+                raise DatabaseError('connection lost')
+            return real_update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, 'update', autospec=True, side_effect=fail_second_batch):
+            with self.assertRaises(DatabaseError):
+                write_view_counts({idea.pk: 5 for idea in self.ideas}, batch_size=1)
+        self.assertEqual(self.views(), [0, 0, 0])
+
+    def test_failed_flush_puts_counts_back(self):
+        buffer = ViewCountBuffer(self.backend, flush_interval=3600, flush_threshold=100, batch_size=500)
+        buffer.record(self.ideas[0].pk)
+        with mock.patch('ideas.tracking.write_view_counts', side_effect=DatabaseError('down')):
+            with self.assertRaises(DatabaseError):
+                buffer.flush()
+        self.assertEqual(buffer.flush(), 1)
+        self.assertEqual(self.views(), [1, 0, 0])
+
+    def test_flush_command_refuses_process_local_backend(self):
+        with self.assertRaisesMessage(CommandError, 'cannot reach them'):
+            call_command('flush_idea_views')
+
+
+class ConcurrentLikeTests(TransactionTestCase):
+    def test_parallel_likes_do_not_lose_updates(self):
+        author = User.objects.create_user('author', 'author@q360.az', 'pass')
+        idea = Idea.objects.create(title='Idea', description='Text', submitter=author)
+        users = [
+            User.objects.create_user(f'user{index}', f'user{index}@q360.az', 'pass')
+            for index in range(8)
+        ]
+        barrier = threading.Barrier(len(users))
+        errors = []
+
+        def like(user):
+            try:
+                barrier.wait()
+                add_like(idea, user)
+            except Exception as exc:  # Surface thread failures in the main thread
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=like, args=(user,)) for user in users]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        idea.refresh_from_db()
+        self.assertEqual(idea.likes_count, len(users))
+        self.assertEqual(IdeaLike.objects.filter(idea=idea).count(), len(users))
@@ -0,0 +1,168 @@
+# ideas/tracking.py
+"""
+Buffered ingestion of ``Idea.views_count``.
+
+Incrementing the column on every page view would serialize readers of a hot
+idea on its row lock. Views are instead coalesced per idea in a buffer and
+written out in batched UPDATEs once ``FLUSH_THRESHOLD`` views have been
+recorded or ``FLUSH_INTERVAL`` seconds have passed since the last flush.
+
+The buffer storage is pluggable through ``settings.IDEA_VIEW_BUFFER['BACKEND']``:
+``LocalViewCountBackend`` keeps counts in process memory (development and
+tests), ``RedisViewCountBackend`` shares them between workers so that the
+``flush_idea_views`` command and the periodic task can write out what idle
+workers buffered.
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils.module_loading import import_string
+
+from .models import Idea
+
+DEFAULTS = {
+    'BACKEND': 'ideas.tracking.LocalViewCountBackend',
+    'OPTIONS': {},
+    'FLUSH_INTERVAL': 30,
+    'FLUSH_THRESHOLD': 500,
+    'BATCH_SIZE': 500,
+}
+
+
+class LocalViewCountBackend:
+    """Per-process in-memory counter store"""
+    # Other processes (management commands, workers) cannot drain it
+    shared = False
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = Counter()
+
+    def increment(self, idea_id, amount=1):
+        with self._lock:
+            self._counts[idea_id] += amount
+
+    def drain(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return dict(counts)
+
+
+class RedisViewCountBackend:
+    """Counter store shared by all workers through a Redis hash"""
+    shared = True
+
+    def __init__(self, url='redis://localhost:6379/0', key='q360:idea_views'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.key = key
+        self.missing_key_error = redis.exceptions.ResponseError
+
+    def increment(self, idea_id, amount=1):
+        self.client.hincrby(self.key, idea_id, amount)
+
+    def drain(self):
+        # Renaming first means increments arriving mid-drain land in a fresh hash;
+        # a unique name keeps a concurrent drain from renaming over this one
+        draining_key = f'{self.key}:draining:{uuid.uuid4().hex}'
+        try:
+            self.client.rename(self.key, draining_key)
+        except self.missing_key_error:
+            # Nothing was buffered since the last drain
+            return {}
+        pipe = self.client.pipeline()
+        pipe.hgetall(draining_key)
+        pipe.delete(draining_key)
+        counts, _ = pipe.execute()
+        return {int(idea_id): int(amount) for idea_id, amount in counts.items()}
+
+
+class ViewCountBuffer:
+    def __init__(self, backend, flush_interval, flush_threshold, batch_size):
+        self.backend = backend
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.batch_size = batch_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def record(self, idea_id):
+        """Count one view of an idea, flushing when the buffer is due"""
+        self.backend.increment(idea_id)
+        with self._lock:
+            self._pending += 1
+            due = (
+                self._pending >= self.flush_threshold
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write buffered counts to the database; returns the number of views written"""
+        # Only one thread flushes at a time; the others keep buffering
+        if not self._flush_lock.acquire(blocking=False):
+            return 0
+        try:
+            with self._lock:
+                self._pending = 0
+                self._last_flush = time.monotonic()
+            counts = self.backend.drain()
+            try:
+                write_view_counts(counts, self.batch_size)
+            except Exception:
+                # Put the counts back so the next flush retries them
+                for idea_id, amount in counts.items():
+                    self.backend.increment(idea_id, amount)
+                raise
+            return sum(counts.values())
+        finally:
+            self._flush_lock.release()
+
+
+def write_view_counts(counts, batch_size=500):
+    """Apply ``{idea_id: views}`` with one CASE-based UPDATE per batch.
+
+    All batches commit together, so a failure part-way leaves nothing applied
+    and the caller can safely put every count back into the buffer.
+    """
+    items = list(counts.items())
+    with transaction.atomic():
+        for start in range(0, len(items), batch_size):
+            batch = items[start:start + batch_size]
+            delta = Case(*[When(pk=idea_id, then=Value(amount)) for idea_id, amount in batch], default=Value(0))
+            Idea.objects.filter(pk__in=[idea_id for idea_id, _ in batch]).update(
+                views_count=F('views_count') + delta
+            )
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def get_view_buffer():
+    """Return the process-wide view buffer configured in settings"""
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = {**DEFAULTS, **getattr(settings, 'IDEA_VIEW_BUFFER', {})}
+                backend = import_string(config['BACKEND'])(**config['OPTIONS'])
+                _buffer = ViewCountBuffer(
+                    backend,
+                    flush_interval=config['FLUSH_INTERVAL'],
+                    flush_threshold=config['FLUSH_THRESHOLD'],
+                    batch_size=config['BATCH_SIZE'],
+                )
+    return _buffer
+
+
+def record_idea_view(idea_id):
+    get_view_buffer().record(idea_id)
@@ -5,15 +5,21 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from q360.query_planner import QueryPlanMixin
 from .models import Idea, IdeaCategory, IdeaLike, IdeaComment
-from .serializers import IdeaSerializer, IdeaCategorySerializer, IdeaLikeSerializer, IdeaCommentSerializer
+from .serializers import IdeaSerializer, IdeaFeedSerializer, IdeaCategorySerializer, IdeaLikeSerializer, IdeaCommentSerializer
+from .pagination import KeysetPagination, CommentThreadPagination
+from .comments import load_comment_tree
+from .counters import toggle_like, remove_like
+from .tracking import record_idea_view
+from activity.stream import record_activity
 
-class IdeaCategoryViewSet(viewsets.ModelViewSet):
+class IdeaCategoryViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = IdeaCategory.objects.all()
     serializer_class = IdeaCategorySerializer
     permission_classes = [IsAuthenticated]
 
-class IdeaViewSet(viewsets.ModelViewSet):
+class IdeaViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Idea.objects.all()
     serializer_class = IdeaSerializer
     permission_classes = [IsAuthenticated]
@@ -24,25 +30,41 @@ class IdeaViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer):
         # Set the submitter to the current user
-        serializer.save(submitter=self.request.user)
+        idea = serializer.save(submitter=self.request.user)
+        record_activity('idea_created', self.request.user, f'Yeni fikir təqdim edildi: {idea.title}', target=idea)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        # Buffered; written to views_count in batches by ideas.tracking
+        record_idea_view(instance.pk)
+        serializer = self.get_serializer(instance)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def feed(self, request):
+        """Lean, keyset-paginated idea feed (?sort=recent|popular&cursor=...)"""
+        queryset = self.filter_queryset(self.get_queryset()).select_related('submitter').only(
+            'id', 'title', 'status', 'category_id', 'department_id', 'likes_count',
+            'comments_count', 'views_count', 'created_at', 'submitter__username',
+            'submitter__first_name', 'submitter__last_name',
+        )
+        paginator = KeysetPagination()
+        page = paginator.paginate_queryset(queryset, request, view=self)
+        serializer = IdeaFeedSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
 
     @action(detail=True, methods=['post'])
     def like(self, request, pk=None):
         """Like or unlike an idea"""
         idea = self.get_object()
-        like, created = IdeaLike.objects.get_or_create(
-            idea=idea,
-            user=request.user
-        )
-        if not created:
-            like.delete()
-            idea.likes_count -= 1
-            message = 'Unliked'
-        else:
-            idea.likes_count += 1
-            message = 'Liked'
-        idea.save()
-        return Response({'message': message, 'likes_count': idea.likes_count})
+        liked, likes_count = toggle_like(idea, request.user)
+        if liked:
+            record_activity(
+                'idea_liked', request.user, f'Fikir bəyənildi: {idea.title}',
+                target=idea, users=[idea.submitter],
+            )
+        message = 'Liked' if liked else 'Unliked'
+        return Response({'message': message, 'likes_count': likes_count})
 
     @action(detail=True, methods=['post'])
     def upvote(self, request, pk=None):
@@ -53,21 +75,31 @@ class IdeaViewSet(viewsets.ModelViewSet):
     def downvote(self, request, pk=None):
         """Downvote an idea (removes like if exists)"""
         idea = self.get_object()
-        try:
-            like = IdeaLike.objects.get(idea=idea, user=request.user)
-            like.delete()
-            idea.likes_count -= 1
-            idea.save()
-            return Response({'message': 'Downvoted', 'likes_count': idea.likes_count})
-        except IdeaLike.DoesNotExist:
-            return Response({'message': 'Not liked yet', 'likes_count': idea.likes_count})
+        removed, likes_count = remove_like(idea, request.user)
+        if removed:
+            return Response({'message': 'Downvoted', 'likes_count': likes_count})
+        return Response({'message': 'Not liked yet', 'likes_count': likes_count})
 
     @action(detail=True, methods=['get'])
     def comments(self, request, pk=None):
-        """Get all comments for an idea"""
+        """Get comment threads for an idea (?depth=, ?parent=, ?limit=&offset=)"""
         idea = self.get_object()
-        comments = idea.comments.filter(parent=None)  # Only top-level comments
-        serializer = IdeaCommentSerializer(comments, many=True)
+        try:
+            depth = int(request.query_params['depth']) if 'depth' in request.query_params else None
+            parent_id = int(request.query_params['parent']) if 'parent' in request.query_params else None
+        except ValueError:
+            return Response({'error': 'depth and parent must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        if depth is not None and depth < 1:
+            return Response({'error': 'depth must be at least 1'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Top-level comments (or replies below ``parent``), all loaded in one query
+        threads = load_comment_tree(idea, parent_id=parent_id, max_depth=depth)
+        paginator = CommentThreadPagination()
+        page = paginator.paginate_queryset(threads, request, view=self)
+        if page is not None:
+            serializer = IdeaCommentSerializer(page, many=True)
+            return paginator.get_paginated_response(serializer.data)
+        serializer = IdeaCommentSerializer(threads, many=True)
         return Response(serializer.data)
 
     @action(detail=True, methods=['post'])
@@ -96,15 +128,20 @@ class IdeaViewSet(viewsets.ModelViewSet):
             parent=parent
         )
         
+        record_activity(
+            'idea_commented', request.user, f'Fikrə şərh yazıldı: {idea.title}',
+            target=comment, users=[idea.submitter],
+        )
+        
         serializer = IdeaCommentSerializer(comment)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-class IdeaLikeViewSet(viewsets.ModelViewSet):
+class IdeaLikeViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = IdeaLike.objects.all()
     serializer_class = IdeaLikeSerializer
     permission_classes = [IsAuthenticated]
 
-class IdeaCommentViewSet(viewsets.ModelViewSet):
+class IdeaCommentViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = IdeaComment.objects.all()
     serializer_class = IdeaCommentSerializer
     permission_classes = [IsAuthenticated]
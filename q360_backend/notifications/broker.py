@@ -0,0 +1,166 @@
+# notifications/broker.py
+"""
+Publish/subscribe channel between notification writers and open streams.
+
+Writers call ``publish_notifications`` / ``publish_unread_count`` after their
+transaction commits; each connected ``notifications.stream`` response holds a
+subscription to its user's channel, so no stream ever polls the database.
+
+The backend is chosen by ``settings.NOTIFICATION_BROKER['BACKEND']``:
+``InMemoryBroker`` only reaches streams served by the same process
+(development and tests), ``RedisBroker`` fans out across workers through
+Redis pub/sub.
+"""
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+DEFAULTS = {
+    'BACKEND': 'notifications.broker.InMemoryBroker',
+    'OPTIONS': {},
+}
+
+
+def user_channel(user_id):
+    return f'notifications:user:{user_id}'
+
+
+class InMemorySubscription:
+    def __init__(self, broker, channel, max_pending):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        # Runs on the subscriber's event loop; a stalled client loses its oldest messages
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout=None):
+        """Next message, or ``None`` when ``timeout`` seconds pass without one"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        self.broker._unsubscribe(self)
+
+
+class InMemoryBroker:
+    """Process-local broker; publishers may run in any thread"""
+
+    def __init__(self, max_pending=100):
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    async def subscribe(self, channel):
+        subscription = InMemorySubscription(self, channel, self.max_pending)
+        with self._lock:
+            self._subscriptions.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscriptions.get(subscription.channel, set())
+            subscribers.discard(subscription)
+            if not subscribers:
+                self._subscriptions.pop(subscription.channel, None)
+
+    def publish_many(self, messages):
+        """Publish ``(channel, message)`` pairs"""
+        for channel, message in messages:
+            with self._lock:
+                subscribers = list(self._subscriptions.get(channel, ()))
+            for subscription in subscribers:
+                try:
+                    subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+                except RuntimeError:
+                    # The subscriber's loop has already shut down
+                    self._unsubscribe(subscription)
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self, timeout=None):
+        message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if message is None:
+            return None
+        return json.loads(message['data'])
+
+    async def close(self):
+        await self.pubsub.reset()
+        await self.client.close()
+
+
+class RedisBroker:
+    """Cross-process broker on Redis pub/sub"""
+
+    def __init__(self, url='redis://localhost:6379/0'):
+        import redis
+        self.url = url
+        self.client = redis.Redis.from_url(url)
+
+    async def subscribe(self, channel):
+        from redis import asyncio as aioredis
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(channel)
+        return RedisSubscription(client, pubsub)
+
+    def publish_many(self, messages):
+        pipe = self.client.pipeline(transaction=False)
+        for channel, message in messages:
+            pipe.publish(channel, json.dumps(message))
+        pipe.execute()
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Return the process-wide broker configured in settings"""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                config = {**DEFAULTS, **getattr(settings, 'NOTIFICATION_BROKER', {})}
+                _broker = import_string(config['BACKEND'])(**config['OPTIONS'])
+    return _broker
+
+
+def notification_payload(notification):
+    return {
+        'id': notification.pk,
+        'title': notification.title,
+        'message': notification.message,
+        'notification_type': notification.notification_type,
+        'related_object_id': notification.related_object_id,
+        'related_content_type': notification.related_content_type,
+        'created_at': notification.created_at.isoformat() if notification.created_at else None,
+    }
+
+
+def publish_notifications(notifications):
+    get_broker().publish_many(
+        (user_channel(notification.recipient_id), {'event': 'notification', 'data': notification_payload(notification)})
+        for notification in notifications
+    )
+
+
+def publish_unread_counts(counts):
+    """Publish ``{user_id: unread_count}``"""
+    get_broker().publish_many(
+        (user_channel(user_id), {'event': 'unread_count', 'data': {'unread_count': max(count, 0)}})
+        for user_id, count in counts.items()
+    )
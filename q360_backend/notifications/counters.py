@@ -0,0 +1,70 @@
+# notifications/counters.py
+"""
+Per-user cached unread notification counter for the frontend badge.
+
+The counter is computed from the ``notif_unread_idx`` index and then kept in
+step with ``cache.incr`` as notifications are created and read. Changes the
+counter cannot follow exactly (deletes, edits) drop the key so the next read
+recounts. Counters live in the shared cache (Redis when ``REDIS_URL`` is set)
+and expire after ``NOTIFICATION_UNREAD_CACHE_TIMEOUT`` seconds whatever their
+updates, so a drifted count is recounted within a minute. Every new value is
+also pushed to the user's open notification streams.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .broker import publish_unread_counts
+from .models import Notification
+
+CACHE_TIMEOUT = getattr(settings, 'NOTIFICATION_UNREAD_CACHE_TIMEOUT', 60)
+
+
+def unread_cache_key(user_id):
+    return f'notifications:unread:{user_id}'
+
+
+def unread_queryset(user_id):
+    return Notification.objects.filter(recipient_id=user_id, is_read=False, is_archived=False)
+
+
+def get_unread_count(user_id):
+    key = unread_cache_key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = unread_queryset(user_id).count()
+        cache.set(key, count, CACHE_TIMEOUT)
+    return max(count, 0)
+
+
+def adjust_unread_counts(user_ids, delta):
+    """Apply ``delta`` to each user's cached counter once the transaction commits"""
+    def apply():
+        counts = {}
+        for user_id in user_ids:
+            try:
+                counts[user_id] = cache.incr(unread_cache_key(user_id), delta)
+            except ValueError:
+                # Not cached: the next read counts from the database
+                pass
+        if counts:
+            publish_unread_counts(counts)
+    if user_ids:
+        transaction.on_commit(apply)
+
+
+def adjust_unread_count(user_id, delta):
+    adjust_unread_counts([user_id], delta)
+
+
+def set_unread_count(user_id, count):
+    def apply():
+        cache.set(unread_cache_key(user_id), count, CACHE_TIMEOUT)
+        publish_unread_counts({user_id: count})
+    transaction.on_commit(apply)
+
+
+def forget_unread_counts(user_ids):
+    keys = [unread_cache_key(user_id) for user_id in set(user_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
@@ -0,0 +1,12 @@
+# notifications/management/commands/deliver_outbox.py
+from django.core.management.base import BaseCommand
+from notifications.outbox import deliver_outbox
+
+class Command(BaseCommand):
+    help = 'Send due emails from the outbox, retrying failed ones whose backoff has passed'
+
+    def handle(self, *args, **options):
+        result = deliver_outbox()
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {result['sent']} emails, {result['retrying']} will be retried, {result['failed']} failed permanently"
+        ))
@@ -0,0 +1,33 @@
+# notifications/management/commands/prune_notifications.py
+from django.core.management.base import BaseCommand, CommandError
+from notifications.retention import ACTIONS, prune_notifications
+
+class Command(BaseCommand):
+    help = 'Archive or delete read notifications older than their type TTL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--action', choices=ACTIONS, help='Override NOTIFICATION_RETENTION ACTION')
+        parser.add_argument(
+            '--ttl', action='append', default=[], metavar='TYPE=DAYS',
+            help='Override the TTL of one notification type, e.g. --ttl info=7',
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be removed')
+
+    def handle(self, *args, **options):
+        ttl_days = {}
+        for item in options['ttl']:
+            notification_type, _, days = item.partition('=')
+            if not days.isdigit():
+                raise CommandError(f'Invalid --ttl value: {item}')
+            ttl_days[notification_type] = int(days)
+
+        report = prune_notifications(
+            action=options['action'],
+            ttl_days=ttl_days,
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'would be removed' if options['dry_run'] else 'removed'
+        for key, count in report.items():
+            self.stdout.write(f'{key}: {count} {verb}')
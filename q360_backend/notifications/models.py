@@ -1,5 +1,6 @@
 # notifications/models.py
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
 
 class Notification(models.Model):
@@ -29,6 +30,41 @@ class Notification(models.Model):
         verbose_name = 'Notification'
         verbose_name_plural = 'Notifications'
         ordering = ['-created_at']
+        indexes = [
+            # Serves the unread badge count and the recipient's filtered inbox listing
+            models.Index(fields=['recipient', 'is_read', 'is_archived', '-created_at'], name='notif_unread_idx'),
+            # Lets the retention job find expired rows of one type as an index range
+            models.Index(fields=['notification_type', 'created_at'], name='notif_retention_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} - {self.recipient}"
+
+class ArchivedNotification(models.Model):
+    """Cold copy of a notification moved out of the inbox table by the retention job"""
+    original_id = models.PositiveBigIntegerField()
+    title = models.CharField(max_length=200)
+    message = models.TextField()
+    notification_type = models.CharField(max_length=20, choices=Notification.NOTIFICATION_TYPE_CHOICES)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    sender = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    
+    is_read = models.BooleanField(default=False)
+    
+    related_object_id = models.PositiveIntegerField(null=True, blank=True)
+    related_content_type = models.CharField(max_length=100, blank=True)
+    
+    created_at = models.DateTimeField()
+    read_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        verbose_name = 'Archived Notification'
+        verbose_name_plural = 'Archived Notifications'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at'], name='notif_archive_recipient_idx'),
+        ]
     
     def __str__(self):
         return f"{self.title} - {self.recipient}"
@@ -61,4 +97,38 @@ class NotificationPreference(models.Model):
         verbose_name_plural = 'Notification Preferences'
     
     def __str__(self):
-        return f"Notification preferences for {self.user}"
\ No newline at end of file
+        return f"Notification preferences for {self.user}"
+
+class OutboundEmail(models.Model):
+    """A message waiting in (or delivered from) the email outbox (see notifications/outbox.py)"""
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sending', 'Sending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+    
+    category = models.CharField(max_length=50, blank=True)
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254, blank=True)
+    recipient = models.EmailField()
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    # When the message is next due; while sending it is the end of the worker's lease
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        verbose_name = 'Outbound Email'
+        verbose_name_plural = 'Outbound Emails'
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
@@ -0,0 +1,178 @@
+# notifications/outbox.py
+"""
+Transactional email outbox.
+
+``enqueue_email`` writes one ``OutboundEmail`` row per recipient inside the
+caller's transaction, so a rolled-back request sends nothing and a committed
+one cannot lose its mail. Delivery belongs to the worker: the periodic
+``deliver_outbox_task`` picks rows up, and with ``NUDGE_WORKER`` set (a real
+broker is configured) the request also queues that task after commit. The
+request itself never talks to SMTP, even with eager Celery tasks.
+
+``deliver_outbox`` claims due rows in batches (``SELECT ... FOR UPDATE SKIP
+LOCKED`` where the database supports it) by moving them to ``sending`` with
+a lease, then sends every batch over one reused backend connection. Failed
+messages are retried with exponential backoff until ``MAX_ATTEMPTS``; rows
+left in ``sending`` by a crashed worker become due again when their lease
+runs out, and that lost attempt counts too, so a message that keeps killing
+its worker ends up ``failed``. Tests use Django's locmem email backend, which the test runner
+installs automatically.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+DEFAULTS = {
+    'BATCH_SIZE': 100,
+    'MAX_BATCHES': 50,  # per delivery run, so one run cannot hold a worker forever
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 60,  # seconds before the first retry; doubles per attempt
+    'BACKOFF_MAX': 60 * 60,
+    'LEASE': 5 * 60,  # seconds a claimed batch stays reserved for its worker
+    'KEEP_SENT_DAYS': 7,
+    'KEEP_FAILED_DAYS': 30,
+    'NUDGE_WORKER': False,  # queue delivery on commit; only with a broker the worker listens on
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'EMAIL_OUTBOX', {})}
+
+
+def enqueue_email(subject, body, recipients, category='', from_email=None):
+    """Persist one outbox row per recipient; returns the number queued"""
+    rows = [
+        OutboundEmail(
+            category=category, subject=subject, body=body,
+            from_email=from_email or '', recipient=recipient,
+        )
+        for recipient in dict.fromkeys(recipients) if recipient
+    ]
+    if not rows:
+        return 0
+    config = get_config()
+    OutboundEmail.objects.bulk_create(rows, batch_size=config['BATCH_SIZE'])
+
+    # Eager tasks would run the delivery inside the request; leave it to the periodic run
+    if config['NUDGE_WORKER'] and not getattr(settings, 'CELERY_TASK_ALWAYS_EAGER', False):
+        from .tasks import deliver_outbox_task
+        transaction.on_commit(deliver_outbox_task.delay)
+    return len(rows)
+
+
+def backoff(attempts, config=None):
+    config = config or get_config()
+    return timedelta(seconds=min(config['BACKOFF_BASE'] * 2 ** (attempts - 1), config['BACKOFF_MAX']))
+
+
+def claim_batch(config=None):
+    """Reserve up to ``BATCH_SIZE`` due messages for this worker.
+
+    Messages still ``sending`` were abandoned when their lease ran out; that
+    attempt is counted, and those out of attempts are failed instead of claimed.
+    """
+    config = config or get_config()
+    now = timezone.now()
+    with transaction.atomic():
+        batch = list(
+            OutboundEmail.objects.filter(status__in=['pending', 'sending'], next_attempt_at__lte=now)
+            .order_by('next_attempt_at')
+            .select_for_update(skip_locked=True)[:config['BATCH_SIZE']]
+        )
+        abandoned = [message for message in batch if message.status == 'sending']
+        for message in abandoned:
+            message.attempts += 1
+        exhausted = {message.pk for message in abandoned if message.attempts >= config['MAX_ATTEMPTS']}
+        OutboundEmail.objects.filter(pk__in=exhausted).update(
+            status='failed', attempts=F('attempts') + 1, last_error='Delivery lease expired'
+        )
+        retried = [message.pk for message in abandoned if message.pk not in exhausted]
+        OutboundEmail.objects.filter(pk__in=retried).update(attempts=F('attempts') + 1)
+        batch = [message for message in batch if message.pk not in exhausted]
+        OutboundEmail.objects.filter(pk__in=[message.pk for message in batch]).update(
+            status='sending', next_attempt_at=now + timedelta(seconds=config['LEASE'])
+        )
+    return batch
+
+
+def _record_failures(failures, config):
+    now = timezone.now()
+    for message, error in failures:
+        message.attempts += 1
+        message.last_error = str(error)[:2000]
+        if message.attempts >= config['MAX_ATTEMPTS']:
+            message.status = 'failed'
+        else:
+            message.status = 'pending'
+            message.next_attempt_at = now + backoff(message.attempts, config)
+    OutboundEmail.objects.bulk_update(
+        [message for message, _ in failures], ['attempts', 'last_error', 'status', 'next_attempt_at']
+    )
+
+
+def deliver_outbox(connection=None):
+    """Send due outbox messages; returns counts of sent, retrying and failed messages"""
+    config = get_config()
+    connection = connection or get_connection(fail_silently=False)
+    result = {'sent': 0, 'retrying': 0, 'failed': 0}
+    opened = False
+    try:
+        for _ in range(config['MAX_BATCHES']):
+            batch = claim_batch(config)
+            if not batch:
+                break
+            sent, failures = [], []
+            try:
+                if not opened:
+                    connection.open()
+                    opened = True
+            except Exception as error:
+                # Nothing can go out; the whole batch waits for its next attempt
+                failures = [(message, error) for message in batch]
+            else:
+                for message in batch:
+                    email = EmailMessage(
+                        message.subject, message.body, message.from_email or None, [message.recipient],
+                        connection=connection,
+                    )
+                    try:
+                        email.send()
+                    except Exception as error:
+                        failures.append((message, error))
+                    else:
+                        sent.append(message.pk)
+            OutboundEmail.objects.filter(pk__in=sent).update(
+                status='sent', sent_at=timezone.now(), last_error=''
+            )
+            if failures:
+                _record_failures(failures, config)
+            result['sent'] += len(sent)
+            for message, _ in failures:
+                result['failed' if message.status == 'failed' else 'retrying'] += 1
+            if failures and not sent:
+                # The backend is down; leave the rest for the next run
+                break
+    finally:
+        if opened:
+            connection.close()
+    return result
+
+
+def prune_outbox(days=None, failed_days=None):
+    """Delete delivered messages older than ``KEEP_SENT_DAYS`` and failed ones older than
+    ``KEEP_FAILED_DAYS``; returns the number deleted"""
+    config = get_config()
+    days = config['KEEP_SENT_DAYS'] if days is None else days
+    failed_days = config['KEEP_FAILED_DAYS'] if failed_days is None else failed_days
+    now = timezone.now()
+    deleted, _ = OutboundEmail.objects.filter(
+        Q(status='sent', sent_at__lt=now - timedelta(days=days))
+        | Q(status='failed', created_at__lt=now - timedelta(days=failed_days))
+    ).delete()
+    return deleted
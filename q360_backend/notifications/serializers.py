@@ -1,5 +1,6 @@
 # notifications/serializers.py
 from rest_framework import serializers
+from q360.serializers import DynamicFieldsMixin
 from .models import Notification, NotificationPreference
 from accounts.models import User
 
@@ -8,7 +9,7 @@ class UserSerializer(serializers.ModelSerializer):
         model = User
         fields = ['id', 'username', 'first_name', 'last_name', 'email']
 
-class NotificationSerializer(serializers.ModelSerializer):
+class NotificationSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     recipient = UserSerializer(read_only=True)
     sender = UserSerializer(read_only=True)
     
@@ -16,7 +17,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         model = Notification
         fields = '__all__'
 
-class NotificationPreferenceSerializer(serializers.ModelSerializer):
+class NotificationPreferenceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
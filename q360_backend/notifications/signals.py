@@ -0,0 +1,23 @@
+# notifications/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .broker import publish_notifications
+from .counters import adjust_unread_count, forget_unread_counts
+from .models import Notification
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    if created:
+        transaction.on_commit(lambda: publish_notifications([instance]))
+        if not instance.is_read and not instance.is_archived:
+            adjust_unread_count(instance.recipient_id, 1)
+    else:
+        # Edits may flip is_read/is_archived; recount rather than guess
+        forget_unread_counts([instance.recipient_id])
+
+@receiver(post_delete, sender=Notification)
+def notification_deleted(sender, instance, **kwargs):
+    # Read or archived rows (everything the retention job removes) never counted
+    if not instance.is_read and not instance.is_archived:
+        forget_unread_counts([instance.recipient_id])
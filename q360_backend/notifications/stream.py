@@ -0,0 +1,118 @@
+# notifications/stream.py
+"""
+Server-Sent Events endpoint pushing notifications to the browser.
+
+``EventSource`` cannot send an Authorization header, and a JWT in the query
+string ends up in access logs. The client therefore first calls
+``POST /api/notifications/stream/ticket/`` with its normal token, then opens
+``GET /api/notifications/stream/?ticket=<ticket>``. A ticket is signed,
+expires after ``TICKET_MAX_AGE`` seconds and is spent on first use, so one
+copied from a log line is worthless. The stream emits:
+
+* ``unread_count`` — ``{"unread_count": n}`` on connect and on every change
+* ``notification`` — each new notification addressed to the user
+
+The response is fed from the user's broker channel only; the database is hit
+once on connect (authentication and the initial badge). Streams close after
+``MAX_AGE`` seconds and the browser reconnects on its own, which also bounds
+how long a vanished client can hold a subscription. Under an ASGI server
+(docker-compose runs uvicorn) the stream stays open. Under WSGI it would pin
+a worker, so there it only sends the current badge count and closes; the
+browser reconnects after ``RECONNECT_DELAY_MS`` and so degrades to polling.
+"""
+import asyncio
+import json
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from accounts.authentication import ClaimsJWTAuthentication
+from accounts.models import User
+from .broker import get_broker, user_channel
+from .counters import get_unread_count
+
+HEARTBEAT = getattr(settings, 'NOTIFICATION_STREAM_HEARTBEAT', 15)
+MAX_AGE = getattr(settings, 'NOTIFICATION_STREAM_MAX_AGE', 300)
+TICKET_MAX_AGE = getattr(settings, 'NOTIFICATION_STREAM_TICKET_MAX_AGE', 30)
+TICKET_SALT = 'notifications.stream.ticket'
+RECONNECT_DELAY_MS = 3000
+
+
+def sse_event(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+
+def issue_stream_ticket(user):
+    """A short-lived, single-use credential for opening ``user``'s stream"""
+    return signing.dumps({'user': user.pk, 'nonce': secrets.token_urlsafe(16)}, salt=TICKET_SALT)
+
+
+def redeem_stream_ticket(ticket):
+    """Return the user id of a valid, unused ticket and spend it; ``None`` otherwise"""
+    try:
+        payload = signing.loads(ticket, salt=TICKET_SALT, max_age=TICKET_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    if not cache.add(f'notifications:stream-ticket:{payload["nonce"]}', True, TICKET_MAX_AGE):
+        return None
+    return payload['user']
+
+
+def _authenticate(request):
+    ticket = request.GET.get('ticket')
+    if ticket:
+        user_id = redeem_stream_ticket(ticket)
+        return User.objects.filter(pk=user_id).first() if user_id is not None else None
+    # Non-browser clients can still send an Authorization header
+    result = ClaimsJWTAuthentication().authenticate(request)
+    return result[0] if result else None
+
+
+def _connect(request):
+    user = _authenticate(request)
+    if user is None or not user.is_active:
+        return None, None
+    return user, get_unread_count(user.pk)
+
+
+async def _events(subscription, unread_count):
+    loop_time = asyncio.get_running_loop().time
+    deadline = loop_time() + MAX_AGE
+    try:
+        yield f'retry: {RECONNECT_DELAY_MS}\n\n'
+        yield sse_event('unread_count', {'unread_count': unread_count})
+        while loop_time() < deadline:
+            message = await subscription.get(timeout=min(HEARTBEAT, max(deadline - loop_time(), 0)))
+            if message is None:
+                # Comment line keeps proxies from timing out an idle stream
+                yield ': keep-alive\n\n'
+            else:
+                yield sse_event(message['event'], message['data'])
+    finally:
+        await subscription.close()
+
+
+async def notification_stream(request):
+    try:
+        user, unread_count = await sync_to_async(_connect)(request)
+    except (InvalidToken, AuthenticationFailed):
+        user = None
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+    if isinstance(request, ASGIRequest):
+        subscription = await get_broker().subscribe(user_channel(user.pk))
+        events = _events(subscription, unread_count)
+    else:
+        events = [f'retry: {RECONNECT_DELAY_MS}\n\n', sse_event('unread_count', {'unread_count': unread_count})]
+    response = StreamingHttpResponse(events, content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Disable response buffering in nginx so events are flushed immediately
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,15 @@
+# notifications/tasks.py
+from celery import shared_task
+from .outbox import deliver_outbox, prune_outbox
+from .retention import prune_notifications
+
+
+@shared_task
+def deliver_outbox_task():
+    """Send due outbox emails; retries are picked up by the periodic run"""
+    return deliver_outbox()
+
+
+@shared_task
+def prune_notifications_task():
+    return {**prune_notifications(), 'outbox_deleted': prune_outbox()}
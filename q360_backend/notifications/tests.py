@@ -1,3 +1,386 @@
-from django.test import TestCase
+import datetime
+import json
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, transaction
+from asgiref.sync import sync_to_async
+from django.test import AsyncClient, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from accounts.models import User
+from evaluations.models import EvaluationCycle, Evaluation
+from . import stream
+from .broker import publish_notifications
+from .counters import get_unread_count, unread_cache_key
+from .dispatch import cycle_evaluators, dispatch, pending_cycle_evaluators
+from .models import ArchivedNotification, Notification, NotificationPreference, OutboundEmail
+from .outbox import claim_batch, deliver_outbox, enqueue_email, prune_outbox
+from .retention import prune_notifications
+
+
+@mock.patch('notifications.tasks.deliver_outbox_task.delay')
+class OutboxTests(TestCase):
+    # The test runner swaps in the locmem email backend, so mail.outbox records deliveries
+
+    def test_emails_are_queued_in_the_transaction_and_delivered_by_the_worker(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_email('Hello', 'Body', ['a@q360.az', 'b@q360.az', 'a@q360.az'], category='system')
+        self.assertEqual(OutboundEmail.objects.filter(status='pending').count(), 2)
+        self.assertEqual(len(mail.outbox), 0)
+        # Without a broker the periodic run delivers
+        delay.assert_not_called()
+
+        self.assertEqual(deliver_outbox(), {'sent': 2, 'retrying': 0, 'failed': 0})
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), ['a@q360.az', 'b@q360.az'])
+        self.assertEqual(OutboundEmail.objects.filter(status='sent').count(), 2)
+
+    def test_rolled_back_request_sends_nothing(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    enqueue_email('Hello', 'Body', ['a@q360.az'])
+                    raise RuntimeError('request failed')
+            except RuntimeError:
+                pass
+        self.assertFalse(OutboundEmail.objects.exists())
+        delay.assert_not_called()
+
+    @override_settings(EMAIL_OUTBOX={'NUDGE_WORKER': True})
+    def test_requests_nudge_the_worker_only_through_a_broker(self, delay):
+        with self.captureOnCommitCallbacks(execute=True):
+            enqueue_email('Hello', 'Body', ['a@q360.az'])
+        delay.assert_called_once()
+
+        # Eager tasks would send from inside the request
+        delay.reset_mock()
+        with self.settings(CELERY_TASK_ALWAYS_EAGER=True), self.captureOnCommitCallbacks(execute=True):
+            enqueue_email('Hello', 'Body', ['b@q360.az'])
+        delay.assert_not_called()
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_failed_delivery_backs_off_then_gives_up(self, delay):
+        enqueue_email('Hello', 'Body', ['a@q360.az'])
+        with mock.patch('django.core.mail.EmailMessage.send', side_effect=ConnectionError('smtp down')):
+            self.assertEqual(deliver_outbox(), {'sent': 0, 'retrying': 1, 'failed': 0})
+            message = OutboundEmail.objects.get()
+            self.assertEqual((message.status, message.attempts), ('pending', 1))
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            # Not due yet, so nothing is attempted
+            self.assertEqual(deliver_outbox(), {'sent': 0, 'retrying': 0, 'failed': 0})
+
+            with override_settings(EMAIL_OUTBOX={'MAX_ATTEMPTS': 2}):
+                OutboundEmail.objects.update(next_attempt_at=timezone.now())
+                self.assertEqual(deliver_outbox(), {'sent': 0, 'retrying': 0, 'failed': 1})
+        message.refresh_from_db()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('failed', 2, 'smtp down'))
+        self.assertEqual(len(mail.outbox), 0)
+
+    @override_settings(EMAIL_OUTBOX={'MAX_ATTEMPTS': 2})
+    def test_expired_leases_count_as_attempts(self, delay):
+        enqueue_email('Hello', 'Body', ['a@q360.az'])
+
+        # Each claim is abandoned, as if the message crashed its worker
+        for attempts in (0, 1):
+            self.assertEqual(len(claim_batch()), 1)
+            OutboundEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(OutboundEmail.objects.get().attempts, attempts)
+        self.assertEqual(claim_batch(), [])
+
+        message = OutboundEmail.objects.get()
+        self.assertEqual((message.status, message.attempts), ('failed', 2))
+        self.assertEqual(deliver_outbox(), {'sent': 0, 'retrying': 0, 'failed': 0})
+
+    def test_prune_drops_old_sent_and_failed_messages(self, delay):
+        enqueue_email('Hello', 'Body', ['sent@q360.az', 'failed@q360.az', 'new@q360.az', 'pending@q360.az'])
+        old = timezone.now() - datetime.timedelta(days=60)
+        OutboundEmail.objects.filter(recipient='sent@q360.az').update(status='sent', sent_at=old)
+        OutboundEmail.objects.filter(recipient='failed@q360.az').update(status='failed')
+        OutboundEmail.objects.filter(recipient='new@q360.az').update(status='failed')
+        OutboundEmail.objects.exclude(recipient='new@q360.az').update(created_at=old)
+
+        self.assertEqual(prune_outbox(), 2)
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipient', flat=True)), ['new@q360.az', 'pending@q360.az']
+        )
+
+
+@mock.patch('notifications.tasks.deliver_outbox_task.delay')
+class DispatchTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        self.users = [
+            User.objects.create_user(f'user{index}', f'user{index}@q360.az', 'pass', manager=self.manager)
+            for index in range(3)
+        ]
+
+    def evaluate(self, evaluator, evaluatee, submitted, evaluation_type='peer'):
+        return Evaluation.objects.create(
+            cycle=self.cycle, evaluator=evaluator, evaluatee=evaluatee,
+            evaluation_type=evaluation_type, is_submitted=submitted,
+        )
+
+    def test_dispatch_follows_each_recipients_preferences(self, delay):
+        muted, email_only, default = self.users
+        NotificationPreference.objects.create(user=muted, in_app_system=False, email_system=False)
+        NotificationPreference.objects.create(user=email_only, in_app_system=False)
+
+        result = dispatch('system', 'Baxım', 'Sistem baxımı', User.objects.filter(pk__in=[u.pk for u in self.users]))
+
+        self.assertEqual(result, {'in_app': 1, 'email': 2})
+        self.assertEqual(list(Notification.objects.values_list('recipient_id', flat=True)), [default.pk])
+        self.assertEqual(
+            sorted(OutboundEmail.objects.values_list('recipient', flat=True)), ['user1@q360.az', 'user2@q360.az']
+        )
+
+    def test_dispatch_rejects_unknown_categories(self, delay):
+        with self.assertRaises(ValueError):
+            dispatch('payroll', 'Title', 'Message', [self.users[0].pk])
+
+    def test_pending_evaluators_need_an_unsubmitted_evaluation_in_the_cycle(self, delay):
+        done, pending, mixed = self.users
+        other_cycle = EvaluationCycle.objects.create(
+            name='2024 Q4', start_date=datetime.date(2024, 10, 1), end_date=datetime.date(2024, 12, 31)
+        )
+        self.evaluate(done, pending, submitted=True)
+        # An unsubmitted evaluation in another cycle must not make ``done`` pending here
+        Evaluation.objects.create(
+            cycle=other_cycle, evaluator=done, evaluatee=mixed, evaluation_type='peer', is_submitted=False
+        )
+        self.evaluate(pending, done, submitted=False)
+        self.evaluate(mixed, done, submitted=True)
+        self.evaluate(mixed, pending, submitted=False)
+        self.evaluate(mixed, mixed, submitted=False, evaluation_type='self')
+
+        self.assertEqual(set(cycle_evaluators(self.cycle)), {done, pending, mixed})
+        self.assertEqual(sorted(user.pk for user in pending_cycle_evaluators(self.cycle)), [pending.pk, mixed.pk])
+
+    def test_reminder_endpoint_notifies_only_pending_evaluators(self, delay):
+        done, pending, _ = self.users
+        self.evaluate(done, pending, submitted=True)
+        self.evaluate(pending, done, submitted=False)
+        client = APIClient()
+        client.force_authenticate(self.manager)
+
+        response = client.post(
+            f'/api/evaluations/cycles/{self.cycle.pk}/notify_evaluators/', {'pending': True}, format='json'
+        )
+
+        self.assertEqual(response.json(), {'in_app': 1, 'email': 1})
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, pending)
+        self.assertEqual(notification.related_object_id, self.cycle.pk)
+        self.assertIn(self.cycle.name, notification.title)
+
+    def test_reminder_endpoint_is_for_managers_and_admins(self, delay):
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        response = client.post(f'/api/evaluations/cycles/{self.cycle.pk}/notify_evaluators/')
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Notification.objects.exists())
+
+
+class UnreadCounterTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@q360.az', 'pass')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Notification.objects.create(recipient=self.user, title='Title', message='Message', **kwargs)
+
+    def badge(self):
+        return self.client.get('/api/notifications/notifications/unread_count/').json()['unread_count']
+
+    def test_first_read_counts_and_caches(self):
+        self.notify()
+        self.notify(is_read=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_unread_count(self.user.pk), 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(get_unread_count(self.user.pk), 1)
+
+    def test_new_notifications_increment_a_cached_counter(self):
+        self.assertEqual(self.badge(), 0)
+        self.notify()
+        self.notify()
+        self.assertEqual(cache.get(unread_cache_key(self.user.pk)), 2)
+
+    def test_increment_without_cached_counter_leaves_it_to_the_next_read(self):
+        self.notify()
+        self.assertIsNone(cache.get(unread_cache_key(self.user.pk)))
+        self.assertEqual(self.badge(), 1)
+
+    def test_mark_as_read_decrements_once(self):
+        notification = self.notify()
+        self.notify()
+        self.assertEqual(self.badge(), 2)
+        url = f'/api/notifications/notifications/{notification.pk}/mark_as_read/'
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.client.post(url)
+        self.assertEqual(self.badge(), 1)
+
+    def test_mark_all_as_read_resets_and_delete_recounts(self):
+        first = self.notify()
+        self.notify()
+        self.badge()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/notifications/notifications/mark_all_as_read/')
+        self.assertEqual(self.badge(), 0)
+
+        third = self.notify()
+        self.assertEqual(self.badge(), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            third.delete()
+            first.delete()
+        self.assertIsNone(cache.get(unread_cache_key(self.user.pk)))
+        self.assertEqual(self.badge(), 0)
+
+    def test_counter_expires_so_drift_heals(self):
+        self.notify()
+        self.badge()
+        # A change the counter missed (e.g. a bulk update) stays visible only until expiry
+        Notification.objects.update(is_read=True)
+        self.assertEqual(self.badge(), 1)
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=timezone.now().timestamp() + 61):
+            self.assertEqual(self.badge(), 0)
+
+
+class NotificationStreamTests(TestCase):
+    # Without REDIS_URL the settings select the InMemoryBroker
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('user', 'user@q360.az', 'pass')
+        Notification.objects.create(recipient=self.user, title='Old', message='Unread')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def ticket(self):
+        return self.client.post('/api/notifications/stream/ticket/').json()['ticket']
+
+    async def read_event(self, content):
+        chunk = await content.__anext__()
+        return chunk.decode() if isinstance(chunk, bytes) else chunk
+
+    def test_ticket_requires_authentication(self):
+        self.assertEqual(APIClient().post('/api/notifications/stream/ticket/').status_code, 401)
+
+    async def test_stream_delivers_badge_then_published_notifications(self):
+        ticket = await sync_to_async(self.ticket)()
+        response = await AsyncClient().get(f'/api/notifications/stream/?ticket={ticket}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        try:
+            self.assertTrue((await self.read_event(content)).startswith('retry:'))
+            self.assertEqual(
+                await self.read_event(content), 'event: unread_count\ndata: {"unread_count": 1}\n\n'
+            )
+
+            notification = await sync_to_async(Notification.objects.create)(
+                recipient=self.user, title='New', message='Hello'
+            )
+            await sync_to_async(publish_notifications)([notification])
+            event = await self.read_event(content)
+        finally:
+            await content.aclose()
+        name, data = event.strip().split('\n')
+        self.assertEqual(name, 'event: notification')
+        self.assertEqual(json.loads(data[len('data: '):])['title'], 'New')
+
+    async def test_ticket_is_single_use(self):
+        ticket = await sync_to_async(self.ticket)()
+        first = await AsyncClient().get(f'/api/notifications/stream/?ticket={ticket}')
+        await first.streaming_content.aclose()
+
+        second = await AsyncClient().get(f'/api/notifications/stream/?ticket={ticket}')
+        self.assertEqual(second.status_code, 401)
+
+    def test_expired_or_forged_tickets_and_query_jwts_are_rejected(self):
+        ticket = self.ticket()
+        later = timezone.now().timestamp() + stream.TICKET_MAX_AGE + 1
+        with mock.patch('django.core.signing.time.time', return_value=later):
+            self.assertEqual(self.client.get(f'/api/notifications/stream/?ticket={ticket}').status_code, 401)
+        self.assertEqual(self.client.get(f'/api/notifications/stream/?ticket={ticket}x').status_code, 401)
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(APIClient().get(f'/api/notifications/stream/?token={token}').status_code, 401)
+
+    def test_wsgi_requests_get_a_snapshot_instead_of_holding_a_worker(self):
+        response = APIClient().get(f'/api/notifications/stream/?ticket={self.ticket()}')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join(response.streaming_content).decode()
+        self.assertTrue(body.startswith('retry:'))
+        self.assertTrue(body.endswith('event: unread_count\ndata: {"unread_count": 1}\n\n'))
+
+
+class RetentionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('user', 'user@q360.az', 'pass')
+
+    def add(self, days_old, notification_type='info', **flags):
+        notification = Notification.objects.create(
+            recipient=self.user, title='Title', message='Message', notification_type=notification_type, **flags
+        )
+        created_at = timezone.now() - datetime.timedelta(days=days_old)
+        Notification.objects.filter(pk=notification.pk).update(created_at=created_at)
+        return notification
+
+    def test_archives_expired_read_rows_in_batches(self):
+        expired = [self.add(40, is_read=True) for _ in range(5)] + [self.add(40, is_archived=True)]
+        kept = [
+            self.add(40),  # unread stays in the inbox whatever its age
+            self.add(10, is_read=True),  # younger than the info TTL
+            self.add(40, 'warning', is_read=True),  # warnings live 90 days
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            report = prune_notifications(
+                action='archive', batch_size=2, ttl_days={'success': None, 'warning': 90, 'error': None}
+            )
+        statements = [query['sql'].split()[0] for query in queries.captured_queries]
+        # Each batch of two: select ids, copy rows, insert copies and one bare DELETE, with no
+        # Collector lookups or per-row signals in between
+        batch = ['SELECT', 'SAVEPOINT', 'SELECT', 'INSERT', 'DELETE', 'RELEASE']
+        self.assertEqual(statements[:18], batch * 3)
+        self.assertEqual(statements.count('DELETE'), 3)
+
+        self.assertEqual(report['info'], 6)
+        self.assertEqual(set(Notification.objects.values_list('pk', flat=True)), {n.pk for n in kept})
+        self.assertEqual(
+            set(ArchivedNotification.objects.values_list('original_id', flat=True)), {n.pk for n in expired}
+        )
+
+    def test_delete_action_and_dry_run(self):
+        self.add(40, is_read=True)
+        self.add(200, 'error', is_read=True)
+
+        self.assertEqual(prune_notifications(action='delete', dry_run=True)['info'], 1)
+        self.assertEqual(Notification.objects.count(), 2)
+
+        report = prune_notifications(action='delete')
+        self.assertEqual((report['info'], report['error']), (1, 1))
+        self.assertFalse(Notification.objects.exists())
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+    def test_expired_archive_rows_are_deleted(self):
+        self.add(40, is_read=True)
+        prune_notifications(action='archive')
+        ArchivedNotification.objects.update(archived_at=timezone.now() - datetime.timedelta(days=400))
+
+        self.assertEqual(prune_notifications()['archive_expired'], 1)
+        self.assertFalse(ArchivedNotification.objects.exists())
+
+    def test_rejects_unknown_action(self):
+        with self.assertRaises(ValueError):
+            prune_notifications(action='shred')
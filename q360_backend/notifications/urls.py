@@ -2,11 +2,14 @@
 from rest_framework.routers import DefaultRouter
 from django.urls import path, include
 from . import views
+from .stream import notification_stream
 
 router = DefaultRouter()
 router.register(r'notifications', views.NotificationViewSet)
 router.register(r'preferences', views.NotificationPreferenceViewSet)
 
 urlpatterns = [
+    path('stream/', notification_stream, name='notification-stream'),
+    path('stream/ticket/', views.stream_ticket, name='notification-stream-ticket'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
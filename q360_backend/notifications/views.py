@@ -1,12 +1,21 @@
 # notifications/views.py
 from rest_framework import viewsets, status
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from django.utils import timezone
 from .models import Notification, NotificationPreference
 from .serializers import NotificationSerializer, NotificationPreferenceSerializer
+from .counters import get_unread_count, adjust_unread_count, set_unread_count
+from .stream import TICKET_MAX_AGE, issue_stream_ticket
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def stream_ticket(request):
+    """Single-use credential for GET /api/notifications/stream/?ticket=..."""
+    return Response({'ticket': issue_stream_ticket(request.user), 'expires_in': TICKET_MAX_AGE})
 
 class NotificationViewSet(viewsets.ModelViewSet):
     queryset = Notification.objects.all()
@@ -20,16 +29,25 @@ class NotificationViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
 
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': get_unread_count(request.user.pk)})
+
     @action(detail=False, methods=['post'])
     def mark_all_as_read(self, request):
-        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True)
+        Notification.objects.filter(recipient=request.user, is_read=False).update(is_read=True, read_at=timezone.now())
+        set_unread_count(request.user.pk, 0)
         return Response({'message': 'All notifications marked as read'})
 
     @action(detail=True, methods=['post'])
     def mark_as_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        # Conditional update so repeated calls only decrement the badge once
+        updated = Notification.objects.filter(pk=notification.pk, is_read=False).update(
+            is_read=True, read_at=timezone.now()
+        )
+        if updated and not notification.is_archived:
+            adjust_unread_count(request.user.pk, -1)
         return Response({'message': 'Notification marked as read'})
 
 class NotificationPreferenceViewSet(viewsets.ModelViewSet):
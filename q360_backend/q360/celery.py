@@ -0,0 +1,10 @@
+# q360/celery.py
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'q360.settings')
+
+app = Celery('q360')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()
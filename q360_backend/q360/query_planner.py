@@ -0,0 +1,140 @@
+# q360/query_planner.py
+"""
+Derive ``select_related``/``prefetch_related`` calls from a serializer declaration.
+
+Walking the serializer's fields tells us exactly which relations will be
+touched during serialization: nested single-object serializers (and
+relational fields that need the related object) on forward/one-to-one
+relations become joins, while ``many=True`` serializers and reverse/many-to-many
+relations become ``Prefetch`` objects whose querysets are planned recursively.
+Fields whose access pattern cannot be inferred (``SerializerMethodField`` and
+friends) can declare their needs through ``Meta.query_hints``::
+
+    class Meta:
+        query_hints = {
+            'comments_count': {'prefetch_related': ['comments']},
+        }
+"""
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Prefetch
+from rest_framework import serializers
+
+
+def _is_joinable(model_field):
+    """Forward FKs and one-to-one relations (either side) can be joined"""
+    return model_field.is_relation and (model_field.many_to_one or model_field.one_to_one)
+
+
+def _needs_related_object(field):
+    """Whether a relational field reads the related instance rather than its pk"""
+    if isinstance(field, serializers.PrimaryKeyRelatedField):
+        return False
+    return isinstance(field, (serializers.RelatedField, serializers.BaseSerializer))
+
+
+def _serializer_fields(serializer):
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    return serializer, serializer.fields
+
+
+class QueryPlan:
+    """Accumulates the select/prefetch lookups for one root queryset"""
+
+    def __init__(self):
+        self.select_related = []
+        self.prefetch_related = {}
+
+    def add_select(self, path):
+        if path not in self.select_related:
+            self.select_related.append(path)
+
+    def add_prefetch(self, lookup):
+        path = lookup.prefetch_to if isinstance(lookup, Prefetch) else lookup
+        # The first declaration wins; Django rejects duplicates with different querysets
+        self.prefetch_related.setdefault(path, lookup)
+
+    def apply(self, queryset):
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related.values())
+        return queryset
+
+
+def _apply_hints(serializer, name, prefix, plan):
+    hints = getattr(getattr(serializer, 'Meta', None), 'query_hints', {}).get(name, {})
+    for path in hints.get('select_related', []):
+        plan.add_select(prefix + path)
+    for lookup in hints.get('prefetch_related', []):
+        if isinstance(lookup, Prefetch):
+            # Prefetch objects are shared class attributes; never mutate them in place
+            lookup = Prefetch(lookup.prefetch_through, lookup.queryset, lookup.to_attr)
+            if prefix:
+                lookup.add_prefix(prefix[:-len('__')])
+            plan.add_prefetch(lookup)
+        else:
+            plan.add_prefetch(prefix + lookup)
+
+
+def _plan(serializer, model, prefix, plan):
+    serializer, fields = _serializer_fields(serializer)
+    for name, field in fields.items():
+        if field.write_only:
+            continue
+        _apply_hints(serializer, name, prefix, plan)
+        if field.source == '*' or not field.source_attrs:
+            continue
+        if not _needs_related_object(field) and not isinstance(field, serializers.ManyRelatedField):
+            continue
+
+        # Follow dotted sources (``source='user.department'``) through joinable hops
+        current_model = model
+        path = prefix
+        for index, attr in enumerate(field.source_attrs):
+            try:
+                model_field = current_model._meta.get_field(attr)
+            except FieldDoesNotExist:
+                break
+            if not model_field.is_relation:
+                break
+            related_model = model_field.related_model
+            is_last = index == len(field.source_attrs) - 1
+            if _is_joinable(model_field):
+                path = f'{path}{attr}'
+                plan.add_select(path)
+                if is_last and isinstance(field, serializers.BaseSerializer):
+                    _plan(field, related_model, f'{path}__', plan)
+                path = f'{path}__'
+                current_model = related_model
+                continue
+
+            # Reverse FK / many-to-many: fetch the related rows in one extra query
+            child_queryset = related_model._default_manager.all()
+            if is_last and isinstance(field, serializers.BaseSerializer):
+                child_queryset = plan_queryset(child_queryset, field)
+            plan.add_prefetch(Prefetch(f'{path}{attr}', queryset=child_queryset))
+            break
+
+
+def plan_queryset(queryset, serializer):
+    """Return ``queryset`` with the joins/prefetches ``serializer`` will need"""
+    plan = QueryPlan()
+    _plan(serializer, queryset.model, '', plan)
+    return plan.apply(queryset)
+
+
+class QueryPlanMixin:
+    """
+    ViewSet mixin that plans ``get_queryset()`` against the active serializer.
+
+    Planning is limited to ``planned_actions`` so that write actions which only
+    need the bare row (``submit``, ``like`` ...) do not pay for prefetches.
+    """
+    planned_actions = ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if getattr(self, 'action', None) in self.planned_actions:
+            queryset = plan_queryset(queryset, self.get_serializer())
+        return queryset
@@ -0,0 +1,77 @@
+# q360/serializers.py
+from rest_framework import permissions, serializers
+
+NESTED_CONTEXT_KEY = 'nested_serializer'
+
+
+def nested_context(context):
+    """Context for a serializer built by hand inside another one (e.g. in a method field)"""
+    return {**context, NESTED_CONTEXT_KEY: True}
+
+
+def _split_param(value):
+    return {part.strip() for part in value.split(',') if part.strip()}
+
+
+class DynamicFieldsMixin:
+    """
+    Serializer mixin adding sparse fieldsets and relation expansion driven by
+    query parameters on read requests:
+
+    * ``?fields=id,title`` limits the output to the listed fields.
+    * ``?expand=submitter,category`` nests only the listed relations; every
+      other nested serializer is rendered as a primary key (or a list of
+      them). Fields named in ``Meta.expandable_fields`` (heavy collections,
+      method fields building trees) are left out entirely unless expanded.
+      An empty ``?expand=`` flattens everything.
+
+    Without an ``expand`` parameter the declared nesting is kept, so existing
+    clients see unchanged payloads. Only the root serializer reacts to the
+    parameters; serializers instantiated inside method fields must be given
+    ``nested_context(self.context)`` so they are not mistaken for roots. Because ``QueryPlanMixin`` plans against these reduced
+    fields, relations that are not requested are not prefetched either.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get('request')
+        if request is None or request.method not in permissions.SAFE_METHODS or not self._is_root_serializer():
+            return fields
+
+        params = request.query_params
+        if params.get('fields'):
+            requested = _split_param(params['fields'])
+            fields = {name: field for name, field in fields.items() if name in requested}
+
+        if 'expand' in params:
+            expand = _split_param(params['expand'])
+            expandable = set(getattr(self.Meta, 'expandable_fields', []))
+            for name, field in list(fields.items()):
+                if name in expand:
+                    continue
+                if name in expandable:
+                    del fields[name]
+                    continue
+                flat = self._flatten_field(name, field)
+                if flat is not None:
+                    fields[name] = flat
+        return fields
+
+    def _is_root_serializer(self):
+        if self.context.get(NESTED_CONTEXT_KEY):
+            return False
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def _flatten_field(self, name, field):
+        """Return a primary-key field standing in for a nested serializer"""
+        if not isinstance(field, serializers.BaseSerializer):
+            return None
+        kwargs = {'read_only': True}
+        if field.source and field.source != name:
+            kwargs['source'] = field.source
+        if isinstance(field, serializers.ListSerializer):
+            kwargs['many'] = True
+        return serializers.PrimaryKeyRelatedField(**kwargs)
@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     'ideas',
     'reports',
     'notifications',
+    'activity',
 ]
 
 MIDDLEWARE = [
@@ -62,6 +63,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.HashingBusyMiddleware',
 ]
 
 ROOT_URLCONF = 'q360.urls'
@@ -83,6 +85,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'q360.wsgi.application'
+ASGI_APPLICATION = 'q360.asgi.application'
 
 
 # Database
@@ -92,6 +95,14 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,  # seconds a writer waits for the SQLite write lock
+        },
+        # A file-backed test database lets threaded tests run concurrent writers;
+        # the default shared in-memory one fails them with table lock errors
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -99,6 +110,23 @@ DATABASES = {
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# The first hasher is the active policy; logins re-encode hashes made by the others (see accounts/hashers.py)
+PASSWORD_HASHERS = [
+    'accounts.hashers.TunedArgon2PasswordHasher',
+    'accounts.hashers.PooledPBKDF2PasswordHasher',
+    'accounts.hashers.PooledPBKDF2SHA1PasswordHasher',
+    'accounts.hashers.PooledScryptPasswordHasher',
+]
+
+PASSWORD_HASHING = {
+    'ARGON2_TIME_COST': 2,
+    'ARGON2_MEMORY_COST': 19456,  # KiB
+    'ARGON2_PARALLELISM': 1,
+    'POOL_SIZE': None,  # hashing threads per process; None uses the CPU count
+    'MAX_PENDING': 64,  # hashes allowed to queue before requests are refused with 503
+    'QUEUE_TIMEOUT': 2.0,  # seconds to wait for queue room
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -143,7 +171,7 @@ AUTH_USER_MODEL = 'accounts.User'
 # Django REST Framework
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -157,6 +185,134 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20
 }
 
+SIMPLE_JWT = {
+    'TOKEN_OBTAIN_SERIALIZER': 'accounts.authentication.ClaimsTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.authentication.ClaimsTokenRefreshSerializer',
+}
+
+# Token claim trust (see accounts/authentication.py)
+AUTH_CLAIMS = {
+    'VERSION_TTL': 5,  # seconds before a process re-reads a user's auth version from the database
+}
+
+# Role dashboard snapshots are cached for this many seconds (see reports/dashboard.py)
+DASHBOARD_CACHE_TIMEOUT = 60
+
+# Activity stream retention (see activity/stream.py)
+ACTIVITY_STREAM = {
+    'RETENTION_DAYS': 90,
+    'FEED_MAX_ENTRIES': 500,  # per feed, older entries are compacted away
+    'INGEST_BATCH_SIZE': 500,  # staged events fanned out per transaction by the ingest-activity task
+}
+
+# Shared Redis (docker-compose sets REDIS_URL). Buffers and caches that must
+# be visible to every worker use it when set and fall back to process-local
+# stores for single-process development and tests.
+REDIS_URL = os.environ.get('REDIS_URL')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Unread notification badge counters (see notifications/counters.py). Kept
+# short so a count that drifted (e.g. in a process-local cache) heals quickly.
+NOTIFICATION_UNREAD_CACHE_TIMEOUT = 60  # seconds
+
+# Buffered Idea.views_count ingestion (see ideas/tracking.py)
+# The Redis backend shares the buffer between worker processes, so the
+# flush_idea_views command and periodic task can write out idle workers' views.
+IDEA_VIEW_BUFFER = {
+    'BACKEND': 'ideas.tracking.RedisViewCountBackend' if REDIS_URL else 'ideas.tracking.LocalViewCountBackend',
+    'OPTIONS': {'url': REDIS_URL} if REDIS_URL else {},
+    'FLUSH_INTERVAL': 30,  # seconds
+    'FLUSH_THRESHOLD': 500,  # buffered views
+}
+
+# Celery (background tasks). Tasks are queued on the broker for the worker and
+# beat services (`celery -A q360 worker` / `celery -A q360 beat`); set
+# CELERY_TASK_ALWAYS_EAGER=1 only to run them inline, e.g. in tests.
+CELERY_BROKER_URL = REDIS_URL or 'redis://localhost:6379/0'
+CELERY_RESULT_BACKEND = CELERY_BROKER_URL
+CELERY_TASK_ALWAYS_EAGER = os.environ.get('CELERY_TASK_ALWAYS_EAGER', '0') == '1'
+CELERY_TASK_SERIALIZER = 'json'
+CELERY_ACCEPT_CONTENT = ['json']
+
+# Talent matrix weighting (see reports/talent.py)
+TALENT_MATRIX = {
+    'PERFORMANCE_TYPE_WEIGHTS': {'self': 0.2, 'peer': 0.3, 'manager': 0.5},
+    'POTENTIAL_TYPE_WEIGHTS': {'self': 0.1, 'peer': 0.3, 'manager': 0.6},
+    'HIGH_THRESHOLD': 5.5,  # 1-10 scale; at or above counts as high
+}
+
+# Benchmark classification results (see reports/benchmarks.py)
+BENCHMARKS = {
+    'CACHE_TIMEOUT': 60 * 60,  # seconds; keys also change whenever scores or benchmarks do
+}
+
+# Background report generation (see reports/generation.py)
+REPORT_GENERATION = {
+    'RUN_TIMEOUT': 30 * 60,  # seconds; a report 'running' longer than this can be regenerated
+    'PDF_FONT': BASE_DIR / 'reports' / 'fonts' / 'DejaVuSans.ttf',  # TrueType font embedded in PDF reports
+}
+
+# Generated report artifact cache (see reports/cache.py)
+REPORT_CACHE = {
+    'MAX_BYTES': 1024 ** 3,  # evict_report_cache keeps stored artifacts under this size
+    'LOCK_TIMEOUT': 300,  # seconds
+}
+
+# Pub/sub backend feeding the notification event stream (see notifications/broker.py)
+# The in-memory broker only reaches streams served by the same process, so
+# the Redis broker is used whenever REDIS_URL is set.
+NOTIFICATION_BROKER = {
+    'BACKEND': 'notifications.broker.RedisBroker' if REDIS_URL else 'notifications.broker.InMemoryBroker',
+    'OPTIONS': {'url': REDIS_URL} if REDIS_URL else {},
+}
+NOTIFICATION_STREAM_HEARTBEAT = 15  # seconds between keep-alive comments
+NOTIFICATION_STREAM_MAX_AGE = 300  # seconds before the browser is asked to reconnect
+NOTIFICATION_STREAM_TICKET_MAX_AGE = 30  # seconds a single-use stream ticket stays valid
+
+# Notification retention (see notifications/retention.py). Read or archived
+# notifications older than their type's TTL leave the inbox table; ACTION is
+# 'archive' (move to ArchivedNotification) or 'delete'.
+NOTIFICATION_RETENTION = {
+    'ACTION': 'archive',
+    'TTL_DAYS': {'info': 30, 'success': 30, 'warning': 90, 'error': 180},
+    'ARCHIVE_TTL_DAYS': 365,  # None keeps archived rows forever
+    'BATCH_SIZE': 1000,
+}
+
+CELERY_BEAT_SCHEDULE = {
+    # Picks up retries and anything queued while no worker was running
+    'deliver-outbox': {
+        'task': 'notifications.tasks.deliver_outbox_task',
+        'schedule': 60,
+    },
+    # Requests only stage activity events; this writes them to the feeds
+    'ingest-activity': {
+        'task': 'activity.tasks.ingest_activity_task',
+        'schedule': 15,
+    },
+    'flush-idea-views': {
+        'task': 'ideas.tasks.flush_idea_views_task',
+        'schedule': 30,
+    },
+    'prune-notifications': {
+        'task': 'notifications.tasks.prune_notifications_task',
+        'schedule': 60 * 60 * 24,
+    },
+}
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",  # React default port
@@ -171,6 +327,19 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 DEFAULT_FROM_EMAIL = 'noreply@q360.com'
 
+# Email outbox delivery (see notifications/outbox.py)
+EMAIL_OUTBOX = {
+    'BATCH_SIZE': 100,  # messages sent per claimed batch over one connection
+    'MAX_ATTEMPTS': 5,
+    'BACKOFF_BASE': 60,  # seconds before the first retry; doubles per attempt
+    'BACKOFF_MAX': 60 * 60,
+    'KEEP_SENT_DAYS': 7,  # delivered rows are pruned by the daily notification retention task
+    'KEEP_FAILED_DAYS': 30,  # undeliverable rows stay this long for inspection
+    # Requests queue delivery on commit only when the worker's broker exists;
+    # otherwise the periodic deliver-outbox run sends the mail.
+    'NUDGE_WORKER': bool(REDIS_URL),
+}
+
 # For production, you would use something like this:
 # EMAIL_BACKEND = 'django.core.mail.backends.smtp.EmailBackend'
 # EMAIL_HOST = 'smtp.gmail.com'
@@ -0,0 +1,34 @@
+# q360/testing.py
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountAssertionsMixin:
+    """
+    TestCase mixin for asserting that an endpoint's query count does not grow
+    with the amount of data it returns.
+    """
+
+    def count_queries(self, func, *args, **kwargs):
+        with CaptureQueriesContext(connection) as context:
+            response = func(*args, **kwargs)
+        return response, len(context.captured_queries)
+
+    def assertConstantQueries(self, request, grow, expected=None, rounds=2):
+        """
+        Call ``request`` once, then ``rounds`` more times after each call to
+        ``grow`` (which should add rows the endpoint will serialize), and
+        assert the number of queries never changes. ``expected`` pins the
+        exact count when given.
+        """
+        _, baseline = self.count_queries(request)
+        if expected is not None:
+            self.assertEqual(baseline, expected, f'Expected {expected} queries, got {baseline}')
+        for _ in range(rounds):
+            grow()
+            _, count = self.count_queries(request)
+            self.assertEqual(
+                count, baseline,
+                f'Query count grew with the data: {baseline} -> {count}'
+            )
+        return baseline
@@ -0,0 +1,164 @@
+# reports/benchmarks.py
+"""
+Classification of a cycle's competency scores against ``Benchmark`` thresholds.
+
+Per-employee (or per-department) competency means come from the materialized
+``CompetencyScore`` rows in one grouped query. Every (entity, benchmark) pair
+is bucketed with a single ``np.searchsorted`` call: each benchmark's sorted
+thresholds are shifted into their own band of one flat sorted array, and the
+means are shifted by the same offset, so no per-row comparisons run in Python.
+
+Managers only see the employees in their reporting line: the scores are
+narrowed with ``PermissionContext.scope`` before anything is aggregated, so
+department means are computed over those employees as well.
+
+Results are cached per cycle, level and scope under a key that includes the
+data version of the scores and benchmarks, so new submissions or edited
+thresholds are picked up without explicit invalidation.
+"""
+import hashlib
+import json
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+
+from evaluations.models import CompetencyScore
+from .cache import data_version
+from .models import Benchmark
+
+LEVELS = ['below_average', 'average', 'good', 'excellent']
+GROUPINGS = {'employee': 'evaluatee_id', 'department': 'evaluatee__department_id'}
+DEFAULTS = {
+    'CACHE_TIMEOUT': 60 * 60,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'BENCHMARKS', {})}
+
+
+def _benchmark_version():
+    # The table is small; hashing the thresholds themselves also catches queryset updates
+    return list(Benchmark.objects.values_list(
+        'id', 'competency_id', 'average_min', 'good_min', 'excellent_min'
+    ).order_by('id'))
+
+
+def bucket_scores(means, benchmark_index, thresholds):
+    """Level index (0-3) of each mean against the thresholds of its benchmark.
+
+    ``thresholds`` is an ``(n_benchmarks, 3)`` array of average/good/excellent
+    minimums, each row non-decreasing; ``benchmark_index`` says which row
+    applies to each mean. A mean equal to a minimum reaches that level.
+    """
+    thresholds = np.asarray(thresholds, dtype=float)
+    if np.any(np.diff(thresholds, axis=1) < 0):
+        raise ValueError('Benchmark thresholds must satisfy average_min <= good_min <= excellent_min')
+    if not len(means):
+        return np.zeros(0, dtype=int)
+    low = min(thresholds.min(), means.min())
+    span = max(thresholds.max(), means.max()) - low + 1
+    offsets = np.arange(len(thresholds)) * span
+    flat = (thresholds - low + offsets[:, None]).ravel()
+    positions = np.searchsorted(flat, means - low + offsets[benchmark_index], side='right')
+    return positions - benchmark_index * thresholds.shape[1]
+
+
+def _entity_means(scores, level):
+    group = GROUPINGS[level]
+    rows = scores.filter(**{f'{group}__isnull': False}).values(
+        group, 'competency_id'
+    ).annotate(total=Sum('rating_sum'), answers=Sum('answer_count')).order_by()
+    entity, competency, means = [], [], []
+    for row in rows:
+        if row['answers']:
+            entity.append(row[group])
+            competency.append(row['competency_id'])
+            means.append(row['total'] / row['answers'])
+    return np.array(entity, dtype=int), np.array(competency, dtype=int), np.array(means, dtype=float)
+
+
+def _cycle_scores(cycle, permissions=None):
+    scores = CompetencyScore.objects.filter(cycle=cycle)
+    return scores if permissions is None else permissions.scope(scores, 'evaluatee')
+
+
+def classify_cycle(cycle, level='employee', permissions=None):
+    """Histogram and per-entity level of every benchmark for ``cycle``.
+
+    With a ``PermissionContext`` only the scores it may see are classified.
+    """
+    benchmarks = list(Benchmark.objects.values(
+        'id', 'name', 'competency_id', 'average_min', 'good_min', 'excellent_min'
+    ).order_by('id'))
+    entity, competency, means = _entity_means(_cycle_scores(cycle, permissions), level)
+
+    # Pair every score row with each benchmark defined for its competency
+    pair_rows, pair_benchmarks = [], []
+    for index, benchmark in enumerate(benchmarks):
+        rows = np.flatnonzero(competency == benchmark['competency_id'])
+        pair_rows.append(rows)
+        pair_benchmarks.append(np.full(len(rows), index))
+    pair_rows = np.concatenate(pair_rows) if pair_rows else np.array([], dtype=int)
+    pair_benchmarks = np.concatenate(pair_benchmarks) if pair_benchmarks else np.array([], dtype=int)
+
+    buckets = np.array([], dtype=int)
+    if len(pair_rows):
+        thresholds = np.array(
+            [[b['average_min'], b['good_min'], b['excellent_min']] for b in benchmarks], dtype=float
+        )
+        buckets = bucket_scores(means[pair_rows], pair_benchmarks, thresholds)
+
+    # One bincount gives every benchmark's histogram
+    counts = np.bincount(
+        pair_benchmarks * len(LEVELS) + buckets, minlength=len(benchmarks) * len(LEVELS)
+    ).reshape(len(benchmarks), len(LEVELS)) if benchmarks else np.zeros((0, len(LEVELS)), dtype=int)
+
+    results = []
+    for index, benchmark in enumerate(benchmarks):
+        selected = pair_benchmarks == index
+        results.append({
+            'benchmark_id': benchmark['id'],
+            'name': benchmark['name'],
+            'competency_id': benchmark['competency_id'],
+            'thresholds': {
+                'average_min': benchmark['average_min'],
+                'good_min': benchmark['good_min'],
+                'excellent_min': benchmark['excellent_min'],
+            },
+            'histogram': dict(zip(LEVELS, counts[index].tolist())),
+            'classifications': [
+                {'id': int(entity_id), 'mean': round(float(mean), 2), 'level': LEVELS[bucket]}
+                for entity_id, mean, bucket in zip(
+                    entity[pair_rows[selected]], means[pair_rows[selected]], buckets[selected]
+                )
+            ],
+        })
+    return {'cycle': cycle.pk, 'level': level, 'benchmarks': results}
+
+
+def _scope_key(permissions):
+    if permissions is None or permissions.is_admin:
+        return 'all'
+    return f'user:{permissions.user_id}'
+
+
+def get_cycle_classification(cycle, level='employee', permissions=None):
+    """Cached ``classify_cycle``; the key changes whenever scores or benchmarks do"""
+    if permissions is not None and permissions.is_admin:
+        permissions = None  # admins share the unscoped result
+    version = [
+        data_version(_cycle_scores(cycle, permissions)),
+        _benchmark_version(),
+        # A reporting line can change without any score changing
+        sorted(permissions.subordinate_ids) if permissions is not None else None,
+    ]
+    digest = hashlib.sha256(json.dumps(version).encode()).hexdigest()[:16]
+    key = f'benchmarks:{cycle.pk}:{level}:{_scope_key(permissions)}:{digest}'
+    result = cache.get(key)
+    if result is None:
+        result = classify_cycle(cycle, level, permissions)
+        cache.set(key, result, get_config()['CACHE_TIMEOUT'])
+    return result
@@ -0,0 +1,53 @@
+# reports/blobs.py
+"""
+Compressed storage of ``GeneratedReport`` bodies outside the database row.
+
+The full report JSON is gzip-compressed and saved on the default storage as
+``reports/content/<sha256>.json.gz``; identical bodies share one blob. The row
+keeps a small ``summary`` plus ``content_path``, ``content_etag`` (the SHA-256
+of the compressed bytes) and ``content_size``, so list endpoints never load
+report bodies. ``GeneratedReportViewSet.content`` serves the blob with ETag
+and Range support.
+"""
+import gzip
+import hashlib
+import json
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+CONTENT_DIR = 'reports/content'
+
+
+def compress_content(content):
+    raw = json.dumps(content, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    # mtime=0 keeps the bytes (and so the ETag) stable for identical content
+    return gzip.compress(raw, compresslevel=6, mtime=0)
+
+
+def store_content(content):
+    """Save ``content`` as a compressed blob; returns the row fields pointing at it"""
+    blob = compress_content(content)
+    etag = hashlib.sha256(blob).hexdigest()
+    name = f'{CONTENT_DIR}/{etag}.json.gz'
+    if not default_storage.exists(name):
+        name = default_storage.save(name, ContentFile(blob))
+    return {'content_path': name, 'content_etag': etag, 'content_size': len(blob)}
+
+
+def load_content(report):
+    """Decompressed report body, or ``None`` when the report has none yet"""
+    if not report.content_path:
+        return None
+    with default_storage.open(report.content_path, 'rb') as blob:
+        return json.loads(gzip.decompress(blob.read()))
+
+
+def summarize(content):
+    """The small part of a report body kept on the row"""
+    return {
+        'category': content.get('category'),
+        **content.get('summary', {}),
+        'competency_count': len(content.get('competencies', [])),
+        'employee_count': len(content.get('employees', [])),
+    }
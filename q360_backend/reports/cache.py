@@ -0,0 +1,152 @@
+# reports/cache.py
+"""
+Content-addressed cache of generated report artifacts.
+
+A report's ``cache_key`` is the SHA-256 of its generation inputs (template
+category, cycle, department, scope owner, format and, where the file shows
+it, title) plus a data-version stamp of the ``CompetencyScore`` rows in
+scope, so any newly submitted evaluation changes the key. Files are stored as
+``reports/cache/<key>.<ext>`` and shared by every report row with that key.
+
+Identical requests that arrive together are single-flighted: the first one
+takes a ``ReportGenerationLock`` row and generates; the others return at once
+and are completed by the lock holder (see ``reports.generation``).
+``evict_report_cache`` keeps the stored artifacts under a byte budget by
+dropping the least recently used ones.
+"""
+import hashlib
+import json
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max
+from django.utils import timezone
+
+from .blobs import CONTENT_DIR
+from .models import GeneratedReport, ReportGenerationLock
+
+DEFAULTS = {
+    'MAX_BYTES': 1024 ** 3,
+    'LOCK_TIMEOUT': 300,  # seconds a generation may hold the single-flight lock
+}
+CACHE_DIR = 'reports/cache'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_CACHE', {})}
+
+
+def data_version(scores):
+    """Stamp that changes whenever a score row in scope is added, removed or refreshed"""
+    stamp = scores.order_by().aggregate(rows=Count('id'), updated=Max('updated_at'))
+    return [stamp['rows'], stamp['updated'].isoformat() if stamp['updated'] else None]
+
+
+def report_cache_key(report, scores):
+    """SHA-256 of the generation inputs of ``report`` and the version of ``scores``"""
+    category = report.template.category
+    inputs = {
+        'category': category,
+        'format': report.format,
+        # PDF and XLSX files carry the title (heading, sheet name); CSV files do not
+        'title': report.title if report.format != 'csv' else None,
+        'cycle': report.cycle_id,
+        'department': report.department_id if category == 'department' else None,
+        'employee': report.employee_id if category == 'individual' else None,
+        # Team reports without an employee cover the requester's team
+        'manager': (report.employee_id or report.generated_by_id) if category == 'team' else None,
+        'version': data_version(scores),
+    }
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode()).hexdigest()
+
+
+def artifact_name(cache_key, extension):
+    return f'{CACHE_DIR}/{cache_key}.{extension}'
+
+
+def find_artifact(cache_key):
+    """Content and file of a completed report with this key, or ``None``"""
+    artifact = GeneratedReport.objects.filter(cache_key=cache_key, status='completed').exclude(
+        file_path=''
+    ).values('summary', 'content_path', 'content_etag', 'content_size', 'file_path', 'file_size').first()
+    if artifact is None or not default_storage.exists(artifact['file_path']):
+        return None
+    return artifact
+
+
+@contextmanager
+def single_flight(cache_key):
+    """Yield ``True`` for the one caller, in any process, allowed to generate ``cache_key`` now.
+
+    The lock is a row unique on ``cache_key``; a row older than
+    ``LOCK_TIMEOUT`` was left by a crashed generation and is taken over.
+    """
+    acquired_at = timezone.now()
+    try:
+        with transaction.atomic():
+            ReportGenerationLock.objects.create(cache_key=cache_key, acquired_at=acquired_at)
+        acquired = True
+    except IntegrityError:
+        stale = acquired_at - timedelta(seconds=get_config()['LOCK_TIMEOUT'])
+        acquired = ReportGenerationLock.objects.filter(
+            cache_key=cache_key, acquired_at__lt=stale
+        ).update(acquired_at=acquired_at) == 1
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            # Only our own row: after a takeover the key belongs to the new holder
+            ReportGenerationLock.objects.filter(cache_key=cache_key, acquired_at=acquired_at).delete()
+
+
+def evict_report_cache(max_bytes=None, dry_run=False):
+    """Delete least recently used artifacts until the total size fits ``max_bytes``.
+
+    Reports whose artifact is evicted keep their row and move to ``expired``;
+    they can be regenerated. Returns the evicted count and the bytes in use.
+    """
+    max_bytes = get_config()['MAX_BYTES'] if max_bytes is None else max_bytes
+    artifacts = list(
+        GeneratedReport.objects.exclude(cache_key='').exclude(file_path='').filter(status='completed')
+        .values('file_path').annotate(size=Max('file_size'), last_used=Max('last_accessed_at'))
+        .order_by(F('last_used').asc(nulls_first=True))
+    )
+    total = sum(artifact['size'] for artifact in artifacts)
+    evicted = 0
+    for artifact in artifacts:
+        if total <= max_bytes:
+            break
+        if not dry_run:
+            default_storage.delete(artifact['file_path'])
+            GeneratedReport.objects.filter(file_path=artifact['file_path']).update(
+                status='expired', file_path='', progress=0
+            )
+        total -= artifact['size']
+        evicted += 1
+    orphaned = _sweep_orphans(CACHE_DIR, 'file_path', dry_run) + _sweep_orphans(CONTENT_DIR, 'content_path', dry_run)
+    return {'evicted': evicted, 'orphaned': orphaned, 'bytes_in_use': total}
+
+
+def _sweep_orphans(directory, field, dry_run):
+    """Delete files under ``directory`` no report row points at (e.g. left by a failed save)"""
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return 0
+    referenced = set(GeneratedReport.objects.filter(**{f'{field}__startswith': f'{directory}/'}).values_list(
+        field, flat=True
+    ))
+    # Files younger than the lock timeout may belong to a generation still in flight
+    cutoff = timezone.now() - timedelta(seconds=get_config()['LOCK_TIMEOUT'])
+    orphans = [
+        f'{directory}/{name}' for name in files
+        if f'{directory}/{name}' not in referenced
+        and default_storage.get_modified_time(f'{directory}/{name}') < cutoff
+    ]
+    if not dry_run:
+        for name in orphans:
+            default_storage.delete(name)
+    return len(orphans)
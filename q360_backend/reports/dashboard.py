@@ -0,0 +1,156 @@
+# reports/dashboard.py
+"""
+Role dashboards for ``DashboardViewSet``.
+
+Each role's counters are gathered by a single SELECT of scalar subqueries and
+the resulting snapshot is cached per (role, user) for a short TTL. Signal
+handlers in ``reports.signals`` drop the affected snapshots once the
+transaction changing evaluations, ideas or users commits, so a concurrent
+request cannot re-cache the pre-commit numbers.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Func, IntegerField, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils import translation
+from django.utils.timesince import timesince
+
+from accounts.models import User, UserHierarchy
+from evaluations.models import Evaluation, CompetencyScore
+from ideas.models import Idea
+from activity.stream import GLOBAL_FEED, latest_activities, manager_feed, user_feed
+
+CACHE_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 60)
+RECENT_ACTIVITY_LIMIT = 5
+# Activity summaries are written in Azerbaijani, so their relative times are too
+ACTIVITY_LANGUAGE = 'az'
+ACTIVITY_TIME_FORMAT = '%(delta)s əvvəl'
+
+
+def cache_key(role, user_id=None):
+    if role == 'admin':
+        # Admin dashboards are global, so every admin shares one snapshot
+        return 'dashboard:admin'
+    return f'dashboard:{role}:{user_id}'
+
+
+def invalidate_dashboards(admin=False, managers=(), employees=()):
+    keys = [cache_key('admin')] if admin else []
+    keys += [cache_key('manager', pk) for pk in managers if pk]
+    keys += [cache_key('employee', pk) for pk in employees if pk]
+    if keys:
+        cache.delete_many(keys)
+
+
+def invalidate_dashboards_on_commit(**kwargs):
+    """``invalidate_dashboards`` once the current transaction commits"""
+    transaction.on_commit(lambda: invalidate_dashboards(**kwargs))
+
+
+def _scalar(queryset, function, field='pk'):
+    """A ``(SELECT FUNC(field) FROM ...)`` subquery with no GROUP BY"""
+    value = Func(F(field), function=function, output_field=IntegerField())
+    return Coalesce(Subquery(queryset.order_by().values(value=value)[:1]), 0)
+
+
+def _score_terms(prefix, scores):
+    """Rating sum and answer count subqueries used to derive a mean score"""
+    return {
+        f'{prefix}_rating_sum': _scalar(scores, 'SUM', 'rating_sum'),
+        f'{prefix}_answer_count': _scalar(scores, 'SUM', 'answer_count'),
+    }
+
+
+def _percent_score(row, prefix):
+    """Mean rating on the 1-5 scale expressed as 0-100"""
+    count = row.pop(f'{prefix}_answer_count')
+    total = row.pop(f'{prefix}_rating_sum')
+    return round(total / count * 20) if count else 0
+
+
+def _admin_metrics(user):
+    evaluations = Evaluation.objects.all()
+    return {
+        'total_users': _scalar(User.objects.all(), 'COUNT'),
+        'total_ideas': _scalar(Idea.objects.all(), 'COUNT'),
+        'total_evaluations': _scalar(evaluations, 'COUNT'),
+        'pending_evaluations': _scalar(evaluations.filter(is_submitted=False), 'COUNT'),
+    }
+
+
+def _manager_metrics(user):
+    # The whole reporting subtree, not only direct reports (see accounts/hierarchy.py)
+    team = UserHierarchy.objects.filter(ancestor=user, depth__gt=0).values('descendant_id')
+    evaluations = Evaluation.objects.filter(evaluatee_id__in=team)
+    return {
+        'team_members': _scalar(UserHierarchy.objects.filter(ancestor=user, depth__gt=0), 'COUNT'),
+        'team_evaluations': _scalar(evaluations, 'COUNT'),
+        'pending_team_evaluations': _scalar(evaluations.filter(is_submitted=False), 'COUNT'),
+        **_score_terms('team', CompetencyScore.objects.filter(evaluatee_id__in=team)),
+    }
+
+
+def _employee_metrics(user):
+    evaluations = Evaluation.objects.filter(evaluatee=user)
+    return {
+        'my_evaluations': _scalar(evaluations, 'COUNT'),
+        'pending_my_evaluations': _scalar(evaluations.filter(is_submitted=False), 'COUNT'),
+        'my_ideas': _scalar(Idea.objects.filter(submitter=user), 'COUNT'),
+        **_score_terms('my', CompetencyScore.objects.filter(evaluatee=user)),
+    }
+
+
+def _recent_activities(role, user):
+    """Latest events of the role's activity feed (one index range scan)"""
+    if role == 'admin':
+        feed = GLOBAL_FEED
+    elif role == 'manager':
+        feed = manager_feed(user.pk)
+    else:
+        feed = user_feed(user.pk)
+    return [
+        {'text': event.summary, 'timestamp': event.created_at.isoformat()}
+        for event in latest_activities(feed, limit=RECENT_ACTIVITY_LIMIT)
+    ]
+
+
+ROLE_METRICS = {
+    'admin': _admin_metrics,
+    'manager': _manager_metrics,
+    'employee': _employee_metrics,
+}
+
+
+def build_snapshot(role, user):
+    """Compute a role's dashboard numbers with one query, plus one for the activity feed"""
+    metrics = ROLE_METRICS[role](user)
+    # Anchor the subqueries on the requesting user's row so they run as one SELECT
+    row = User.objects.filter(pk=user.pk).annotate(**metrics).values(*metrics).get()
+    if role == 'manager':
+        row['team_performance'] = _percent_score(row, 'team')
+    elif role == 'employee':
+        row['performance_score'] = _percent_score(row, 'my')
+    row['recent_activities'] = _recent_activities(role, user)
+    return row
+
+
+def get_dashboard(user):
+    """Return the cached dashboard snapshot for ``user``, rebuilding it when stale"""
+    role = user.role if user.role in ROLE_METRICS else 'employee'
+    key = cache_key(role, user.pk)
+    snapshot = cache.get(key)
+    if snapshot is None:
+        snapshot = build_snapshot(role, user)
+        cache.set(key, snapshot, CACHE_TIMEOUT)
+
+    data = dict(snapshot)
+    now = timezone.now()
+    with translation.override(ACTIVITY_LANGUAGE):
+        data['recent_activities'] = [
+            {**activity, 'time': ACTIVITY_TIME_FORMAT % {'delta': timesince(parse_datetime(activity['timestamp']), now)}}
+            for activity in snapshot['recent_activities']
+        ]
+    return data
@@ -0,0 +1,254 @@
+# reports/generation.py
+"""
+Background generation of ``GeneratedReport`` files.
+
+``GeneratedReportViewSet`` creates the row in ``pending`` state and queues
+``reports.tasks.generate_report_task``; the task calls ``generate_report``,
+which aggregates the materialized ``CompetencyScore`` rows for the template's
+scope, stores the result as a compressed blob, writes the file in the requested
+format to the default storage and records progress on the row as it goes.
+The requester gets an in-app notification when the report is ready or failed.
+
+Reports whose inputs and data are unchanged reuse the existing artifact
+through ``reports.cache`` instead of being generated again. A run whose worker
+died leaves its row in ``running``; once ``RUN_TIMEOUT`` has passed the report
+counts as abandoned and can be regenerated.
+"""
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import F, Sum
+from django.utils import timezone
+
+from activity.stream import record_activity
+from evaluations.models import CompetencyScore
+from notifications.dispatch import dispatch
+from .blobs import store_content, summarize
+from .cache import artifact_name, find_artifact, report_cache_key, single_flight
+from .models import GeneratedReport
+from .writers import DEFAULT_PDF_FONT, FILE_EXTENSIONS, write_rows
+
+DEFAULTS = {
+    'RUN_TIMEOUT': 30 * 60,  # seconds a run may stay in 'running' before it counts as abandoned
+    'PDF_FONT': DEFAULT_PDF_FONT,
+}
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'REPORT_GENERATION', {})}
+
+
+class ReportScopeError(ValueError):
+    pass
+
+
+def _set_progress(report, progress, **fields):
+    # Targeted UPDATE so pollers see progress without racing a full save()
+    fields['progress'] = progress
+    GeneratedReport.objects.filter(pk=report.pk).update(**fields)
+    for name, value in fields.items():
+        setattr(report, name, value)
+
+
+def generation_in_progress(report):
+    """Whether ``report`` is queued or running, ignoring runs older than ``RUN_TIMEOUT``"""
+    if report.status == 'pending':
+        return True
+    if report.status != 'running' or report.started_at is None:
+        return False
+    return report.started_at > timezone.now() - timedelta(seconds=get_config()['RUN_TIMEOUT'])
+
+
+def scope_scores(report):
+    """CompetencyScore rows covered by ``report``'s template category and filters"""
+    category = report.template.category
+    scores = CompetencyScore.objects.all()
+    if report.cycle_id:
+        scores = scores.filter(cycle_id=report.cycle_id)
+    if category == 'individual':
+        if not report.employee_id:
+            raise ReportScopeError('Individual reports need an employee.')
+        scores = scores.filter(evaluatee_id=report.employee_id)
+    elif category == 'team':
+        # The team is the direct reports of the selected employee (or of the requester)
+        manager_id = report.employee_id or report.generated_by_id
+        if not manager_id:
+            raise ReportScopeError('Team reports need a manager.')
+        scores = scores.filter(evaluatee__manager_id=manager_id)
+    elif category == 'department':
+        if not report.department_id:
+            raise ReportScopeError('Department reports need a department.')
+        scores = scores.filter(evaluatee__department_id=report.department_id)
+    return scores
+
+
+def _grouped(scores, *fields, **names):
+    rows = scores.values(*fields).annotate(
+        answers=Sum('answer_count'),
+        rating_total=Sum('rating_sum'),
+        **names,
+    ).order_by(*fields)
+    for row in rows:
+        answers = row.pop('answers') or 0
+        total = row.pop('rating_total') or 0
+        row['answer_count'] = answers
+        row['mean'] = round(total / answers, 2) if answers else None
+        yield row
+
+
+def build_report_content(report, scores=None):
+    """Aggregate the report's scope into a JSON-serializable dict (a few grouped queries)"""
+    scores = scope_scores(report) if scores is None else scores
+    totals = scores.aggregate(answers=Sum('answer_count'), rating_total=Sum('rating_sum'))
+    answers = totals['answers'] or 0
+
+    competencies = [
+        {'competency_id': row['competency_id'], 'competency': row['competency_name'],
+         'answer_count': row['answer_count'], 'mean': row['mean']}
+        for row in _grouped(scores, 'competency_id', competency_name=F('competency__name'))
+    ]
+    by_type = list(_grouped(scores, 'evaluation_type'))
+    content = {
+        'category': report.template.category,
+        'summary': {
+            'answer_count': answers,
+            'mean': round(totals['rating_total'] / answers, 2) if answers else None,
+            'evaluatee_count': scores.values('evaluatee_id').distinct().count(),
+        },
+        'competencies': competencies,
+        'evaluation_types': by_type,
+    }
+    if report.template.category != 'individual':
+        content['employees'] = [
+            {'employee_id': row['evaluatee_id'],
+             'employee': f"{row['evaluatee__first_name']} {row['evaluatee__last_name']}".strip()
+             or row['evaluatee__username'],
+             'answer_count': row['answer_count'], 'mean': row['mean']}
+            for row in _grouped(
+                scores, 'evaluatee_id', 'evaluatee__username', 'evaluatee__first_name', 'evaluatee__last_name',
+            )
+        ]
+    return content
+
+
+def content_rows(content):
+    """Flatten report content into table rows for the file writers"""
+    summary = content['summary']
+    yield ['Summary']
+    yield ['Answers', 'Mean', 'Employees']
+    yield [summary['answer_count'], summary['mean'], summary['evaluatee_count']]
+    yield []
+    yield ['Competency', 'Answers', 'Mean']
+    for row in content['competencies']:
+        yield [row['competency'], row['answer_count'], row['mean']]
+    yield []
+    yield ['Evaluation type', 'Answers', 'Mean']
+    for row in content['evaluation_types']:
+        yield [row['evaluation_type'], row['answer_count'], row['mean']]
+    if 'employees' in content:
+        yield []
+        yield ['Employee', 'Answers', 'Mean']
+        for row in content['employees']:
+            yield [row['employee'], row['answer_count'], row['mean']]
+
+
+def write_report_file(report, rows, cache_key):
+    """Write ``rows`` to the content-addressed artifact for ``cache_key``; returns the stored name"""
+    name = artifact_name(cache_key, FILE_EXTENSIONS[report.format])
+    if default_storage.exists(name):
+        return name
+    # Spool through a temporary file so large reports never sit in memory
+    with tempfile.TemporaryFile() as buffer:
+        write_rows(report.format, rows, buffer, title=report.title, pdf_font=get_config()['PDF_FONT'])
+        buffer.seek(0)
+        return default_storage.save(name, File(buffer))
+
+
+def _build_artifact(report, scores, cache_key):
+    content = build_report_content(report, scores)
+    blob = store_content(content)
+    _set_progress(report, 60, summary=summarize(content), **blob)
+    file_path = write_report_file(report, content_rows(content), cache_key)
+    return {
+        'summary': report.summary, **blob,
+        'file_path': file_path, 'file_size': default_storage.size(file_path),
+    }
+
+
+def _notify(report, title, message, notification_type):
+    if report.generated_by_id:
+        dispatch('reports', title, message, [report.generated_by_id],
+                 notification_type=notification_type, related_object=report)
+
+
+def _finish(report, **fields):
+    """Move a running ``report`` to its final state; ``False`` if another run already did"""
+    if not GeneratedReport.objects.filter(pk=report.pk, status='running').update(**fields):
+        return False
+    for name, value in fields.items():
+        setattr(report, name, value)
+    return True
+
+
+def _complete(report, artifact):
+    now = timezone.now()
+    if _finish(report, status='completed', progress=100, completed_at=now, last_accessed_at=now, **artifact):
+        _notify(report, 'Hesabat hazırdır', f'{report.title} hesabatı yükləməyə hazırdır.', 'success')
+        record_activity('report_generated', report.generated_by, f'Hesabat yaradıldı: {report.title}', target=report)
+
+
+def _fail(report, exc):
+    if _finish(report, status='failed', error=str(exc), completed_at=timezone.now()):
+        _notify(report, 'Hesabat hazırlanmadı', f'{report.title}: {exc}', 'error')
+
+
+def _followers(report, cache_key):
+    """Runs that found ``cache_key`` locked and left their report to the lock holder"""
+    return GeneratedReport.objects.select_related('generated_by').filter(
+        cache_key=cache_key, status='running'
+    ).exclude(pk=report.pk)
+
+
+def generate_report(report_id):
+    """Generate one pending report; returns its status when the run ends.
+
+    When another worker holds the single-flight lock for the same cache key,
+    the run returns at once with the report still ``running``: the lock holder
+    completes (or fails) it together with its own report after releasing the
+    lock, so no worker sits waiting on another.
+    """
+    report = GeneratedReport.objects.select_related('template').get(pk=report_id)
+    if report.status == 'completed' or report.status == 'running' and generation_in_progress(report):
+        return report.status
+
+    _set_progress(report, 5, status='running', started_at=timezone.now(), error='')
+    leader = False
+    try:
+        scores = scope_scores(report)
+        cache_key = report_cache_key(report, scores)
+        _set_progress(report, 10, cache_key=cache_key)
+        artifact = find_artifact(cache_key)
+        if artifact is None:
+            with single_flight(cache_key) as leader:
+                if leader:
+                    artifact = find_artifact(cache_key) or _build_artifact(report, scores, cache_key)
+            if not leader:
+                return report.status
+    except Exception as exc:
+        _fail(report, exc)
+        if leader:
+            for follower in _followers(report, cache_key):
+                _fail(follower, exc)
+        if not isinstance(exc, ReportScopeError):
+            raise
+        return report.status
+
+    _complete(report, artifact)
+    if leader:
+        # Followers recorded the key before trying the lock, so all of them are visible now
+        for follower in _followers(report, cache_key):
+            _complete(follower, artifact)
+    return report.status
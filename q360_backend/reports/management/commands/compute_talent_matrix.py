@@ -0,0 +1,21 @@
+# reports/management/commands/compute_talent_matrix.py
+from django.core.management.base import BaseCommand, CommandError
+from evaluations.models import EvaluationCycle
+from reports.talent import compute_talent_matrix
+
+class Command(BaseCommand):
+    help = 'Recompute the talent matrix of evaluation cycles from their competency scores'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cycle', type=int, help='Only recompute the cycle with this ID')
+
+    def handle(self, *args, **options):
+        cycles = EvaluationCycle.objects.all()
+        if options['cycle']:
+            cycles = cycles.filter(pk=options['cycle'])
+            if not cycles.exists():
+                raise CommandError(f"Evaluation cycle {options['cycle']} does not exist")
+
+        for cycle in cycles:
+            written = compute_talent_matrix(cycle)
+            self.stdout.write(f'Wrote {written} talent matrix rows for cycle: {cycle.name}')
@@ -0,0 +1,18 @@
+# reports/management/commands/evict_report_cache.py
+from django.core.management.base import BaseCommand
+from reports.cache import evict_report_cache
+
+class Command(BaseCommand):
+    help = 'Evict least recently used report artifacts until the cache fits its size budget'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--max-bytes', type=int, help='Override REPORT_CACHE MAX_BYTES')
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be evicted')
+
+    def handle(self, *args, **options):
+        result = evict_report_cache(max_bytes=options['max_bytes'], dry_run=options['dry_run'])
+        verb = 'would be evicted' if options['dry_run'] else 'evicted'
+        self.stdout.write(
+            f"{result['evicted']} artifacts {verb}, {result['orphaned']} orphaned files, "
+            f"{result['bytes_in_use']} bytes in use"
+        )
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:36
+
+from django.db import migrations, models
+
+
+def mark_existing_completed(apps, schema_editor):
+    # Reports created before the generator existed already hold their content
+    GeneratedReport = apps.get_model("reports", "GeneratedReport")
+    GeneratedReport.objects.update(status="completed", progress=100)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0002_dashboardwidget_dashboardmetric"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generatedreport",
+            name="completed_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="progress",
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="status",
+            field=models.CharField(
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("completed", "Completed"),
+                    ("failed", "Failed"),
+                ],
+                default="pending",
+                max_length=20,
+            ),
+        ),
+        migrations.AlterField(
+            model_name="generatedreport",
+            name="content",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(mark_existing_completed, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.30 on 2026-10-18 09:45
+
+import gzip
+import hashlib
+import json
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+
+def move_content_to_blobs(apps, schema_editor):
+    # Same layout as reports.blobs.store_content, inlined so later edits there cannot change this migration
+    GeneratedReport = apps.get_model("reports", "GeneratedReport")
+    reports = GeneratedReport.objects.exclude(content={}).only("pk", "content")
+    for report in reports.iterator(chunk_size=100):
+        content = report.content
+        raw = json.dumps(content, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+        blob = gzip.compress(raw, compresslevel=6, mtime=0)
+        etag = hashlib.sha256(blob).hexdigest()
+        name = f"reports/content/{etag}.json.gz"
+        if not default_storage.exists(name):
+            name = default_storage.save(name, ContentFile(blob))
+        summary = content.get("summary") if isinstance(content, dict) else None
+        GeneratedReport.objects.filter(pk=report.pk).update(
+            summary=summary if isinstance(summary, dict) else {},
+            content_path=name,
+            content_etag=etag,
+            content_size=len(blob),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0004_generatedreport_cache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="generatedreport",
+            name="summary",
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="content_path",
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="content_etag",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="generatedreport",
+            name="content_size",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(move_content_to_blobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="generatedreport",
+            name="content",
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-18 10:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("reports", "0005_generatedreport_content_blob"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ReportGenerationLock",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cache_key", models.CharField(max_length=64, unique=True)),
+                ("acquired_at", models.DateTimeField()),
+            ],
+        ),
+    ]
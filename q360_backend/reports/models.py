@@ -32,12 +32,25 @@ class GeneratedReport(models.Model):
         ('excel', 'Excel'),
         ('csv', 'CSV'),
     ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+        ('expired', 'Expired'),  # Artifact evicted from the report cache
+    ]
     
     template = models.ForeignKey(ReportTemplate, on_delete=models.CASCADE)
     title = models.CharField(max_length=200)
-    content = models.JSONField()  # Store report data as JSON
     format = models.CharField(max_length=10, choices=REPORT_FORMAT_CHOICES, default='pdf')
     
+    # Background generation state (see reports/generation.py)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)  # percent
+    error = models.TextField(blank=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    
     generated_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
     generated_at = models.DateTimeField(auto_now_add=True)
     
@@ -48,6 +61,17 @@ class GeneratedReport(models.Model):
     
     file_path = models.CharField(max_length=500, blank=True)
     
+    # The report body lives in a compressed blob (see reports/blobs.py); only a summary stays on the row
+    summary = models.JSONField(default=dict, blank=True)
+    content_path = models.CharField(max_length=500, blank=True)
+    content_etag = models.CharField(max_length=64, blank=True)
+    content_size = models.PositiveIntegerField(default=0)  # compressed bytes
+    
+    # Content-addressed artifact cache (see reports/cache.py)
+    cache_key = models.CharField(max_length=64, blank=True, db_index=True)
+    file_size = models.PositiveBigIntegerField(default=0)
+    last_accessed_at = models.DateTimeField(null=True, blank=True)
+    
     class Meta:
         verbose_name = 'Generated Report'
         verbose_name_plural = 'Generated Reports'
@@ -56,6 +80,14 @@ class GeneratedReport(models.Model):
     def __str__(self):
         return self.title
 
+class ReportGenerationLock(models.Model):
+    """Single-flight lock for one report cache key, shared by every worker process (see reports/cache.py)"""
+    cache_key = models.CharField(max_length=64, unique=True)
+    acquired_at = models.DateTimeField()
+    
+    def __str__(self):
+        return self.cache_key
+
 class Benchmark(models.Model):
     name = models.CharField(max_length=200)
     description = models.TextField(blank=True)
@@ -1,5 +1,9 @@
 # reports/serializers.py
+from django.db.models import Q
 from rest_framework import serializers
+from rest_framework.exceptions import PermissionDenied
+from q360.serializers import DynamicFieldsMixin
+from accounts.permissions import get_permission_context
 from .models import ReportTemplate, GeneratedReport, Benchmark, TalentMatrix, DashboardMetric, DashboardWidget
 from accounts.models import User, Department
 from evaluations.models import EvaluationCycle, Competency
@@ -24,30 +28,91 @@ class CompetencySerializer(serializers.ModelSerializer):
         model = Competency
         fields = '__all__'
 
-class ReportTemplateSerializer(serializers.ModelSerializer):
+class ReportTemplateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ReportTemplate
         fields = '__all__'
 
-class GeneratedReportSerializer(serializers.ModelSerializer):
+class GeneratedReportSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     template = ReportTemplateSerializer(read_only=True)
     generated_by = UserSerializer(read_only=True)
     cycle = EvaluationCycleSerializer(read_only=True)
     department = DepartmentSerializer(read_only=True)
     employee = UserSerializer(read_only=True)
     
+    # Generation inputs are written by id
+    template_id = serializers.PrimaryKeyRelatedField(
+        source='template', queryset=ReportTemplate.objects.filter(is_active=True), write_only=True
+    )
+    cycle_id = serializers.PrimaryKeyRelatedField(
+        source='cycle', queryset=EvaluationCycle.objects.all(), write_only=True, required=False, allow_null=True
+    )
+    department_id = serializers.PrimaryKeyRelatedField(
+        source='department', queryset=Department.objects.all(), write_only=True, required=False, allow_null=True
+    )
+    employee_id = serializers.PrimaryKeyRelatedField(
+        source='employee', queryset=User.objects.all(), write_only=True, required=False, allow_null=True
+    )
+    
     class Meta:
         model = GeneratedReport
         fields = '__all__'
+        read_only_fields = [
+            'file_path', 'status', 'progress', 'error', 'started_at', 'completed_at',
+            'summary', 'content_path', 'content_etag', 'content_size', 'cache_key', 'file_size', 'last_accessed_at',
+        ]
+    
+    def validate(self, attrs):
+        template = attrs.get('template', getattr(self.instance, 'template', None))
+        if template is not None:
+            if template.category == 'individual' and not attrs.get('employee'):
+                raise serializers.ValidationError({'employee_id': 'Individual reports need an employee.'})
+            if template.category == 'department' and not attrs.get('department'):
+                raise serializers.ValidationError({'department_id': 'Department reports need a department.'})
+            self._check_scope(template, attrs)
+        return attrs
+    
+    def _check_scope(self, template, attrs):
+        """The report shows everyone in its scope, so the requester must be allowed to see all of them"""
+        request = self.context['request']
+        context = get_permission_context(request)
+        if context.is_admin:
+            return
+        if template.category == 'company':
+            raise PermissionDenied('Only administrators can generate company reports.')
+        employee = attrs.get('employee', getattr(self.instance, 'employee', None))
+        if template.category == 'individual':
+            users = User.objects.filter(pk=employee.pk)
+        elif template.category == 'team':
+            # Mirrors reports.generation.scope_scores: the manager's direct reports
+            manager = employee or getattr(self.instance, 'generated_by', None) or request.user
+            users = User.objects.filter(Q(pk=manager.pk) | Q(manager=manager))
+        else:
+            users = User.objects.filter(department=attrs.get('department', getattr(self.instance, 'department', None)))
+        if not context.can_access_all(users):
+            raise PermissionDenied('You can only generate reports within your reporting line.')
 
-class BenchmarkSerializer(serializers.ModelSerializer):
+class GeneratedReportStatusSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = GeneratedReport
+        fields = ['id', 'status', 'progress', 'error', 'file_path', 'started_at', 'completed_at']
+
+class BenchmarkSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     competency = CompetencySerializer(read_only=True)
     
     class Meta:
         model = Benchmark
         fields = '__all__'
+    
+    def validate(self, attrs):
+        # reports.benchmarks.bucket_scores relies on ordered thresholds
+        names = ['average_min', 'good_min', 'excellent_min']
+        values = [attrs.get(name, getattr(self.instance, name, None)) for name in names]
+        if None not in values and not values[0] <= values[1] <= values[2]:
+            raise serializers.ValidationError('Thresholds must satisfy average_min <= good_min <= excellent_min.')
+        return attrs
 
-class TalentMatrixSerializer(serializers.ModelSerializer):
+class TalentMatrixSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     employee = UserSerializer(read_only=True)
     cycle = EvaluationCycleSerializer(read_only=True)
     
@@ -55,7 +120,7 @@ class TalentMatrixSerializer(serializers.ModelSerializer):
         model = TalentMatrix
         fields = '__all__'
 
-class DashboardMetricSerializer(serializers.ModelSerializer):
+class DashboardMetricSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     department = DepartmentSerializer(read_only=True)
     employee = UserSerializer(read_only=True)
     cycle = EvaluationCycleSerializer(read_only=True)
@@ -64,7 +129,7 @@ class DashboardMetricSerializer(serializers.ModelSerializer):
         model = DashboardMetric
         fields = '__all__'
 
-class DashboardWidgetSerializer(serializers.ModelSerializer):
+class DashboardWidgetSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     department = DepartmentSerializer(read_only=True)
     
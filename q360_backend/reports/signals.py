@@ -0,0 +1,28 @@
+# reports/signals.py
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from accounts.hierarchy import manager_ids_above
+from accounts.models import User
+from evaluations.models import Evaluation
+from ideas.models import Idea
+from .dashboard import invalidate_dashboards_on_commit
+
+@receiver(post_save, sender=Evaluation)
+def evaluation_saved(sender, instance, **kwargs):
+    # Covers creation as well as submit(), which saves the evaluation
+    # Every manager up the chain sees this evaluation in their team numbers
+    invalidate_dashboards_on_commit(admin=True, managers=manager_ids_above(instance.evaluatee_id), employees=[instance.evaluatee_id])
+
+@receiver(post_save, sender=Idea)
+def idea_saved(sender, instance, created, **kwargs):
+    if created:
+        invalidate_dashboards_on_commit(admin=True, managers=manager_ids_above(instance.submitter_id), employees=[instance.submitter_id])
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # accounts.signals records the old chain when the manager changes
+    previous = instance.__dict__.pop('_previous_manager_ids', None)
+    if created or previous is not None:
+        # The new chain is read from the manager, whether or not the subtree has moved yet
+        managers = [instance.manager_id, *manager_ids_above(instance.manager_id)] if instance.manager_id else []
+        invalidate_dashboards_on_commit(admin=True, managers=sorted({*managers, *(previous or [])}))
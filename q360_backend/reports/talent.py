@@ -0,0 +1,140 @@
+# reports/talent.py
+"""
+Batch computation of a cycle's ``TalentMatrix``.
+
+All ``CompetencyScore`` rows of the cycle (the materialized per evaluatee,
+competency and evaluation type totals of the submitted answers) are read in
+one query and reduced with NumPy:
+
+* within each (employee, evaluation type) the competency means are averaged
+  with ``Competency.weight`` (weighted by answer count),
+* the type means are combined with the configured type weights, renormalized
+  over the types the employee actually received,
+* performance uses every competency, potential only those flagged
+  ``measures_potential`` (falling back to all competencies with the potential
+  type weights when an employee has none of them).
+
+Scores are mapped from the 1-5 rating scale to the matrix's 1-10 scale,
+assigned a quadrant and written with a single bulk upsert.
+"""
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from evaluations.models import CompetencyScore, Evaluation
+from .models import TalentMatrix
+
+DEFAULTS = {
+    'PERFORMANCE_TYPE_WEIGHTS': {'self': 0.2, 'peer': 0.3, 'manager': 0.5},
+    'POTENTIAL_TYPE_WEIGHTS': {'self': 0.1, 'peer': 0.3, 'manager': 0.6},
+    'HIGH_THRESHOLD': 5.5,  # on the 1-10 scale
+}
+EVALUATION_TYPES = [value for value, _ in Evaluation.EVALUATION_TYPE_CHOICES]
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'TALENT_MATRIX', {})}
+
+
+def _type_weighted_scores(employee_index, type_index, weighted_sum, weighted_count, n_employees, type_weights):
+    """Combine per-type weighted means into one score per employee (NaN when no data)"""
+    n_types = len(type_weights)
+    keys = employee_index * n_types + type_index
+    size = n_employees * n_types
+    sums = np.bincount(keys, weights=weighted_sum, minlength=size).reshape(n_employees, n_types)
+    counts = np.bincount(keys, weights=weighted_count, minlength=size).reshape(n_employees, n_types)
+    present = counts > 0
+    means = np.divide(sums, counts, out=np.zeros_like(sums), where=present)
+    weights = np.where(present, type_weights, 0.0)
+    total_weight = weights.sum(axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total_weight > 0, (means * weights).sum(axis=1) / total_weight, np.nan)
+
+
+def _to_matrix_scale(scores):
+    # Ratings run 1-5; the matrix stores 1-10
+    return np.round(1 + (scores - 1) * 9 / 4, 2)
+
+
+def quadrants(performance, potential, threshold):
+    high_perf = performance >= threshold
+    high_pot = potential >= threshold
+    return np.where(
+        high_perf,
+        np.where(high_pot, 'high_perf_high_pot', 'high_perf_low_pot'),
+        np.where(high_pot, 'low_perf_high_pot', 'low_perf_low_pot'),
+    )
+
+
+def compute_talent_scores(rows, config=None):
+    """Reduce score rows to ``(employee_ids, performance, potential, quadrants)`` arrays.
+
+    ``rows`` are ``(evaluatee_id, evaluation_type, competency weight,
+    measures_potential, rating_sum, answer_count)`` tuples.
+    """
+    config = config or get_config()
+    if not rows:
+        empty = np.array([])
+        return empty.astype(int), empty, empty, empty.astype(str)
+
+    evaluatee, evaluation_type, weight, measures_potential, rating_sum, answer_count = zip(*rows)
+    employee_ids, employee_index = np.unique(np.array(evaluatee), return_inverse=True)
+    type_positions = {value: position for position, value in enumerate(EVALUATION_TYPES)}
+    type_index = np.array([type_positions[value] for value in evaluation_type])
+    weight = np.array(weight, dtype=float)
+    potential_mask = np.array(measures_potential, dtype=bool)
+    weighted_sum = weight * np.array(rating_sum, dtype=float)
+    weighted_count = weight * np.array(answer_count, dtype=float)
+
+    performance_weights = np.array([config['PERFORMANCE_TYPE_WEIGHTS'].get(t, 0.0) for t in EVALUATION_TYPES])
+    potential_weights = np.array([config['POTENTIAL_TYPE_WEIGHTS'].get(t, 0.0) for t in EVALUATION_TYPES])
+    n_employees = len(employee_ids)
+
+    performance = _type_weighted_scores(
+        employee_index, type_index, weighted_sum, weighted_count, n_employees, performance_weights
+    )
+    potential_all = _type_weighted_scores(
+        employee_index, type_index, weighted_sum, weighted_count, n_employees, potential_weights
+    )
+    potential_flagged = _type_weighted_scores(
+        employee_index, type_index,
+        np.where(potential_mask, weighted_sum, 0.0), np.where(potential_mask, weighted_count, 0.0),
+        n_employees, potential_weights,
+    )
+    potential = np.where(np.isnan(potential_flagged), potential_all, potential_flagged)
+
+    # Employees only rated through zero-weighted types have no usable score
+    scored = ~np.isnan(performance) & ~np.isnan(potential)
+    performance = _to_matrix_scale(performance[scored])
+    potential = _to_matrix_scale(potential[scored])
+    return employee_ids[scored], performance, potential, quadrants(performance, potential, config['HIGH_THRESHOLD'])
+
+
+def compute_talent_matrix(cycle):
+    """Recompute every ``TalentMatrix`` row of ``cycle``; returns the number of rows written"""
+    rows = list(CompetencyScore.objects.filter(cycle=cycle).values_list(
+        'evaluatee_id', 'evaluation_type', 'competency__weight', 'competency__measures_potential',
+        'rating_sum', 'answer_count',
+    ).order_by())
+    employee_ids, performance, potential, quadrant = compute_talent_scores(rows)
+
+    entries = [
+        TalentMatrix(
+            employee_id=int(employee_id), cycle=cycle,
+            performance_score=float(perf), potential_score=float(pot), quadrant=str(quad),
+        )
+        for employee_id, perf, pot, quad in zip(employee_ids, performance, potential, quadrant)
+    ]
+    started = timezone.now()
+    with transaction.atomic():
+        TalentMatrix.objects.bulk_create(
+            entries,
+            batch_size=1000,
+            update_conflicts=True,
+            unique_fields=['employee', 'cycle'],
+            update_fields=['performance_score', 'potential_score', 'quadrant', 'updated_at'],
+        )
+        # Employees who no longer have scores in this cycle drop out of the matrix
+        TalentMatrix.objects.filter(cycle=cycle, updated_at__lt=started).delete()
+    return len(entries)
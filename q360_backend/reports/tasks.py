@@ -0,0 +1,8 @@
+# reports/tasks.py
+from celery import shared_task
+from .generation import generate_report
+
+
+@shared_task
+def generate_report_task(report_id):
+    return generate_report(report_id)
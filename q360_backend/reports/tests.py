@@ -1,3 +1,526 @@
-from django.test import TestCase
+import datetime
+import io
+import json
+import re
+import tempfile
+import zipfile
+import zlib
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from fontTools.ttLib import TTFont
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User, Department
+from activity.models import ActivityEvent, ActivityFeedEntry
+from evaluations.models import Competency, CompetencyScore, EvaluationCycle, Evaluation
+from notifications.models import Notification
+from .benchmarks import bucket_scores, classify_cycle
+from .blobs import compress_content, store_content
+from .cache import report_cache_key, single_flight
+from .dashboard import cache_key
+from .generation import build_report_content, generate_report
+from .models import Benchmark, GeneratedReport, ReportGenerationLock, ReportTemplate, TalentMatrix
+from .serializers import BenchmarkSerializer
+from .talent import compute_talent_matrix
+from .writers import DEFAULT_PDF_FONT, write_pdf, write_xlsx
+
+
+class DashboardTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.department = Department.objects.create(name='Engineering')
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.employee = User.objects.create_user(
+            'employee', 'employee@q360.az', 'pass', department=self.department, manager=self.manager
+        )
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+
+    def test_activity_times_are_azerbaijani(self):
+        event = ActivityEvent.objects.create(
+            verb='idea_created', actor=self.employee, summary='Yeni fikir təqdim edildi: Test',
+            created_at=timezone.now() - timedelta(hours=2, minutes=5),
+        )
+        ActivityFeedEntry.objects.create(feed=f'user:{self.employee.pk}', event=event, created_at=event.created_at)
+
+        activity = self.client.get('/api/reports/dashboard/').json()['recent_activities'][0]
+
+        self.assertEqual(activity['time'], '2\xa0saat, 5\xa0dəqiqə əvvəl')
+
+    def test_snapshots_are_dropped_only_after_commit(self):
+        self.client.get('/api/reports/dashboard/')
+        key = cache_key('employee', self.employee.pk)
+        self.assertIsNotNone(cache.get(key))
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            Evaluation.objects.create(
+                cycle=self.cycle, evaluatee=self.employee, evaluator=self.manager, evaluation_type='manager'
+            )
+            # A request racing the open transaction must not lose the snapshot yet
+            self.assertIsNotNone(cache.get(key))
+        self.assertTrue(callbacks)
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.client.get('/api/reports/dashboard/').json()['my_evaluations'], 1)
+
+    def test_manager_change_drops_old_and_new_chain_snapshots(self):
+        director = User.objects.create_user('director', 'director@q360.az', 'pass', role='manager')
+        new_manager = User.objects.create_user('new', 'new@q360.az', 'pass', role='manager', manager=director)
+        for manager in (self.manager, new_manager, director):
+            self.client.force_authenticate(manager)
+            self.client.get('/api/reports/dashboard/')
+        keys = [cache_key('manager', manager.pk) for manager in (self.manager, new_manager, director)]
+        self.assertEqual(len(cache.get_many(keys)), 3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.employee.manager = new_manager
+            self.employee.save()
+
+        self.assertEqual(cache.get_many(keys), {})
+
+
+class ReportWriterTests(TestCase):
+    def test_xlsx_has_typed_cells_and_a_valid_sheet_name(self):
+        buffer = io.BytesIO()
+        write_xlsx([['Səriştə', 'Orta'], ['Əməkdaşlıq', 4.5], [None, True, datetime.date(2025, 3, 31)]],
+                   buffer, sheet_name='2025 Q1: [yekun]')
+
+        with zipfile.ZipFile(buffer) as archive:
+            self.assertIn('[Content_Types].xml', archive.namelist())
+            workbook = archive.read('xl/workbook.xml').decode()
+            sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<sheet name="2025 Q1   yekun " sheetId="1"', workbook)
+        self.assertIn('<c r="A2" t="inlineStr"><is><t xml:space="preserve">Əməkdaşlıq</t></is></c>', sheet)
+        self.assertIn('<c r="B2"><v>4.5</v></c>', sheet)
+        self.assertIn('<row r="3"><c r="B3" t="b"><v>1</v></c>', sheet)
+        self.assertIn('<t xml:space="preserve">2025-03-31</t>', sheet)
+
+    def test_pdf_embeds_a_subset_with_the_azerbaijani_glyphs_it_uses(self):
+        buffer = io.BytesIO()
+        write_pdf([['Əməkdaşlıq', 'Şəffaflıq', 'Çeviklik', 4.5]], buffer, title='Ümumi hesabat – Göstəricilər')
+        data = buffer.getvalue()
+
+        match = re.search(rb'/Length (\d+)\s*/Length1 (\d+)\s*>>\s*stream\r?\n', data)
+        font_file = zlib.decompress(data[match.end():match.end() + int(match.group(1))])
+        self.assertEqual(len(font_file), int(match.group(2)))
+        subset = TTFont(io.BytesIO(font_file))
+        cmap = subset.getBestCmap()
+        for char in 'əƏşŞıÇÜö–':
+            self.assertIn(ord(char), cmap, char)
+        self.assertNotIn(ord('Z'), cmap)
+        self.assertLess(len(subset.getGlyphOrder()), len(TTFont(DEFAULT_PDF_FONT).getGlyphOrder()) // 10)
+
+        # Glyphs map back to Unicode for search and copy
+        self.assertRegex(data, rb'<[0-9A-F]{4}> <0259>')
+        self.assertRegex(data, rb'/BaseFont /[A-Z]{6}\+DejaVuSans')
+
+    def test_pdf_starts_a_page_every_lines_per_page_lines(self):
+        buffer = io.BytesIO()
+        write_pdf(([f'Sətir {index}'] for index in range(120)), buffer, lines_per_page=50)
+        self.assertRegex(buffer.getvalue(), rb'/Count 3\b')
+
+        empty = io.BytesIO()
+        write_pdf([], empty)
+        self.assertRegex(empty.getvalue(), rb'/Count 1\b')
+
+
+class RegenerateReportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.template = ReportTemplate.objects.create(name='Komanda', category='team')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _report(self, **fields):
+        return GeneratedReport.objects.create(
+            template=self.template, title='Komanda hesabatı', generated_by=self.user, **fields
+        )
+
+    @mock.patch('reports.views.generate_report_task.delay')
+    def test_running_report_cannot_be_regenerated(self, delay):
+        report = self._report(status='running', started_at=timezone.now() - timedelta(minutes=5))
+
+        response = self.client.post(f'/api/reports/generated-reports/{report.pk}/regenerate/')
+
+        self.assertEqual(response.status_code, 409)
+        delay.assert_not_called()
+
+    @mock.patch('reports.views.generate_report_task.delay')
+    def test_abandoned_run_can_be_regenerated(self, delay):
+        report = self._report(status='running', progress=60, started_at=timezone.now() - timedelta(hours=2))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/reports/generated-reports/{report.pk}/regenerate/')
+
+        self.assertEqual(response.status_code, 202)
+        report.refresh_from_db()
+        self.assertEqual((report.status, report.progress), ('pending', 0))
+        delay.assert_called_once_with(report.pk)
+        # The row is pending again, so a second request waits for that run
+        self.assertEqual(self.client.post(f'/api/reports/generated-reports/{report.pk}/regenerate/').status_code, 409)
+
+
+@mock.patch('reports.views.generate_report_task.delay')
+class ReportAccessTests(TestCase):
+    def setUp(self):
+        sales, support = Department.objects.create(name='Satış'), Department.objects.create(name='Dəstək')
+        self.admin = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.director = User.objects.create_user('director', 'director@q360.az', 'pass', role='manager')
+        self.manager = User.objects.create_user(
+            'manager', 'manager@q360.az', 'pass', role='manager', manager=self.director, department=sales
+        )
+        self.dev = User.objects.create_user('dev', 'dev@q360.az', 'pass', manager=self.manager, department=sales)
+        self.outsider = User.objects.create_user('outsider', 'outsider@q360.az', 'pass', department=support)
+        self.sales, self.support = sales, support
+        self.templates = {
+            category: ReportTemplate.objects.create(name=category, category=category)
+            for category in ('individual', 'team', 'department', 'company')
+        }
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        competency = Competency.objects.create(name='Kommunikasiya')
+        for evaluatee, evaluation_type, mean in [
+            (self.dev, 'manager', 4), (self.dev, 'self', 2), (self.manager, 'manager', 3), (self.outsider, 'peer', 5),
+        ]:
+            CompetencyScore.objects.create(
+                cycle=self.cycle, evaluatee=evaluatee, competency=competency,
+                evaluation_type=evaluation_type, answer_count=2, rating_sum=2 * mean,
+            )
+        self.client = APIClient()
+
+    def create(self, user, category, **fields):
+        self.client.force_authenticate(user)
+        data = {'template_id': self.templates[category].pk, 'title': 'Hesabat', 'cycle_id': self.cycle.pk, **fields}
+        return self.client.post('/api/reports/generated-reports/', data, format='json').status_code
+
+    def content(self, category, **fields):
+        report = GeneratedReport.objects.create(
+            template=self.templates[category], title='Hesabat', cycle=self.cycle, **fields
+        )
+        return build_report_content(report)
+
+    def test_each_role_generates_reports_only_within_its_scope(self, delay):
+        cases = [
+            (self.dev, 'individual', {'employee_id': self.dev.pk}, 202),
+            (self.dev, 'individual', {'employee_id': self.outsider.pk}, 403),
+            (self.dev, 'team', {}, 202),
+            (self.dev, 'team', {'employee_id': self.manager.pk}, 403),
+            (self.dev, 'department', {'department_id': self.sales.pk}, 403),
+            (self.dev, 'company', {}, 403),
+            (self.manager, 'individual', {'employee_id': self.dev.pk}, 202),
+            (self.manager, 'individual', {'employee_id': self.outsider.pk}, 403),
+            (self.manager, 'team', {}, 202),
+            (self.manager, 'team', {'employee_id': self.director.pk}, 403),
+            (self.manager, 'department', {'department_id': self.sales.pk}, 202),
+            (self.manager, 'department', {'department_id': self.support.pk}, 403),
+            (self.manager, 'company', {}, 403),
+            (self.director, 'team', {'employee_id': self.manager.pk}, 202),
+            (self.admin, 'individual', {'employee_id': self.outsider.pk}, 202),
+            (self.admin, 'company', {}, 202),
+            (self.manager, 'individual', {}, 400),
+        ]
+        for user, category, fields, expected in cases:
+            with self.subTest(user=user.username, category=category, fields=fields):
+                self.assertEqual(self.create(user, category, **fields), expected)
+        self.assertEqual(GeneratedReport.objects.count(), 8)
+
+    def test_reports_are_listed_and_served_only_within_scope(self, delay):
+        about_outsider = GeneratedReport.objects.create(
+            template=self.templates['individual'], title='Hesabat', employee=self.outsider, generated_by=self.admin
+        )
+        about_dev = GeneratedReport.objects.create(
+            template=self.templates['individual'], title='Hesabat', employee=self.dev, generated_by=self.admin
+        )
+        own = GeneratedReport.objects.create(template=self.templates['team'], title='Hesabat', generated_by=self.dev)
+
+        for user, visible in [
+            (self.dev, {about_dev.pk, own.pk}),
+            (self.director, {about_dev.pk}),
+            (self.outsider, {about_outsider.pk}),
+            (self.admin, {about_outsider.pk, about_dev.pk, own.pk}),
+        ]:
+            self.client.force_authenticate(user)
+            rows = self.client.get('/api/reports/generated-reports/').json()
+            rows = rows['results'] if isinstance(rows, dict) else rows
+            self.assertEqual({row['id'] for row in rows}, visible, user.username)
+
+        self.client.force_authenticate(self.dev)
+        for name in ('', 'status/', 'content/', 'download/'):
+            response = self.client.get(f'/api/reports/generated-reports/{about_outsider.pk}/{name}')
+            self.assertEqual(response.status_code, 404, name)
+
+    def test_content_covers_each_category_scope(self, delay):
+        individual = self.content('individual', employee=self.dev)
+        self.assertEqual(individual['summary'], {'answer_count': 4, 'mean': 3.0, 'evaluatee_count': 1})
+        self.assertEqual(
+            [(row['evaluation_type'], row['mean']) for row in individual['evaluation_types']],
+            [('manager', 4.0), ('self', 2.0)],
+        )
+        self.assertNotIn('employees', individual)
+
+        # A team is the direct reports of the selected employee, or of the requester
+        for fields in ({'employee': self.manager}, {'generated_by': self.manager}):
+            team = self.content('team', **fields)
+            self.assertEqual([row['employee_id'] for row in team['employees']], [self.dev.pk])
+        self.assertEqual(self.content('team', employee=self.director)['employees'][0]['employee_id'], self.manager.pk)
+
+        department = self.content('department', department=self.sales)
+        self.assertEqual(
+            {row['employee_id']: row['mean'] for row in department['employees']}, {self.manager.pk: 3.0, self.dev.pk: 3.0}
+        )
+        self.assertEqual(department['summary'], {'answer_count': 6, 'mean': 3.0, 'evaluatee_count': 2})
+
+        company = self.content('company')
+        self.assertEqual(company['summary'], {'answer_count': 8, 'mean': 3.5, 'evaluatee_count': 3})
+        self.assertEqual(company['competencies'], [
+            {'competency_id': company['competencies'][0]['competency_id'], 'competency': 'Kommunikasiya',
+             'answer_count': 8, 'mean': 3.5},
+        ])
+
+
+class ReportCacheTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storage = override_settings(MEDIA_ROOT=media.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        self.user = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.template = ReportTemplate.objects.create(name='Şirkət', category='company')
+
+    def _report(self, **fields):
+        fields = {'title': 'Şirkət hesabatı', 'format': 'pdf', **fields}
+        return GeneratedReport.objects.create(template=self.template, generated_by=self.user, **fields)
+
+    def test_title_is_part_of_the_key_when_the_file_shows_it(self):
+        scores = CompetencyScore.objects.all()
+
+        self.assertNotEqual(
+            report_cache_key(self._report(), scores), report_cache_key(self._report(title='İllik'), scores)
+        )
+        self.assertEqual(
+            report_cache_key(self._report(format='csv'), scores),
+            report_cache_key(self._report(format='csv', title='İllik'), scores),
+        )
+
+    def test_lock_is_held_by_one_caller_until_released(self):
+        with single_flight('key') as first:
+            with single_flight('key') as second:
+                self.assertEqual((first, second), (True, False))
+
+        self.assertFalse(ReportGenerationLock.objects.exists())
+        with single_flight('key') as again:
+            self.assertTrue(again)
+
+    def test_lock_left_by_a_crashed_run_is_taken_over(self):
+        ReportGenerationLock.objects.create(cache_key='key', acquired_at=timezone.now() - timedelta(hours=1))
+
+        with single_flight('key') as acquired:
+            self.assertTrue(acquired)
+        self.assertFalse(ReportGenerationLock.objects.exists())
+
+    def test_lock_holder_completes_the_runs_that_found_it_locked(self):
+        leader, follower = self._report(), self._report()
+
+        with single_flight(report_cache_key(follower, CompetencyScore.objects.all())):
+            # Returns at once instead of waiting for the other worker
+            self.assertEqual(generate_report(follower.pk), 'running')
+        self.assertEqual(generate_report(leader.pk), 'completed')
+
+        leader.refresh_from_db()
+        follower.refresh_from_db()
+        self.assertEqual(follower.status, 'completed')
+        self.assertEqual(follower.file_path, leader.file_path)
+        self.assertEqual(Notification.objects.filter(notification_type='success').count(), 2)
+
+
+class ReportContentTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        storage = override_settings(MEDIA_ROOT=media.name)
+        storage.enable()
+        self.addCleanup(storage.disable)
+        user = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.content = {'summary': {'answer_count': 3}, 'competencies': [{'competency': 'Əməkdaşlıq'}]}
+        self.blob = compress_content(self.content)
+        self.report = GeneratedReport.objects.create(
+            template=ReportTemplate.objects.create(name='Şirkət', category='company'), title='Şirkət hesabatı',
+            status='completed', generated_by=user, **store_content(self.content),
+        )
+        self.url = f'/api/reports/generated-reports/{self.report.pk}/content/'
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def get(self, **headers):
+        response = self.client.get(self.url, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_gzip_and_identity_bodies_have_their_own_etags(self):
+        gzipped, body = self.get(HTTP_ACCEPT_ENCODING='gzip, br')
+        identity, plain = self.get()
+
+        self.assertEqual(body, self.blob)
+        self.assertEqual(json.loads(plain), self.content)
+        self.assertNotEqual(gzipped['ETag'], identity['ETag'])
+        for response in (gzipped, identity):
+            self.assertIn('Accept-Encoding', response['Vary'])
+        # A tag cached for one encoding does not validate the other
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=gzipped['ETag'])[0].status_code, 200)
+        not_modified, _ = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_IF_NONE_MATCH=gzipped['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertIn('Accept-Encoding', not_modified['Vary'])
+
+    def test_ranges_address_the_gzip_bytes(self):
+        response, body = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=10-19')
+
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 10-19/{len(self.blob)}')
+        self.assertEqual(body, self.blob[10:20])
+        self.assertEqual(self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE='bytes=-5')[1], self.blob[-5:])
+
+    def test_invalid_ranges_are_ignored(self):
+        for header in ('bytes=20-10', 'bytes=-', 'items=0-5', 'bytes=0-1,4-5'):
+            response, body = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE=header)
+            self.assertEqual((response.status_code, body), (200, self.blob), header)
+
+    def test_unsatisfiable_range_is_rejected(self):
+        response, _ = self.get(HTTP_ACCEPT_ENCODING='gzip', HTTP_RANGE=f'bytes={len(self.blob)}-')
+
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response['Content-Range'], f'bytes */{len(self.blob)}')
+
+
+class TalentMatrixTests(TestCase):
+    def setUp(self):
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.employees = [
+            User.objects.create_user(name, f'{name}@q360.az', 'pass', manager=self.manager)
+            for name in ('aysel', 'murad', 'leyla')
+        ]
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        delivery = Competency.objects.create(name='Nəticəyönümlülük')
+        growth = Competency.objects.create(name='İnkişaf', weight=2, measures_potential=True)
+        # (employee, competency, evaluation type, mean over four answers)
+        for employee, competency, evaluation_type, mean in [
+            (0, delivery, 'manager', 5), (0, delivery, 'peer', 3),
+            (1, delivery, 'manager', 1), (1, growth, 'manager', 4),
+            (2, delivery, 'manager', 2),
+        ]:
+            CompetencyScore.objects.create(
+                cycle=self.cycle, evaluatee=self.employees[employee], competency=competency,
+                evaluation_type=evaluation_type, answer_count=4, rating_sum=4 * mean,
+            )
+        self.client = APIClient()
+
+    def matrix(self):
+        return {
+            row.employee.username: (row.performance_score, row.potential_score, row.quadrant)
+            for row in TalentMatrix.objects.filter(cycle=self.cycle).select_related('employee')
+        }
+
+    def test_scores_combine_type_and_competency_weights(self):
+        self.assertEqual(compute_talent_matrix(self.cycle), 3)
+
+        self.assertEqual(self.matrix(), {
+            # Type weights renormalized over peer and manager; potential falls back to every competency
+            'aysel': (8.31, 8.5, 'high_perf_high_pot'),
+            # Weighted mean (1*1 + 4*2) / 3 = 3 lands on the threshold; potential uses the flagged competency
+            'murad': (5.5, 7.75, 'high_perf_high_pot'),
+            'leyla': (3.25, 3.25, 'low_perf_low_pot'),
+        })
+
+    def test_recompute_updates_rows_and_drops_unscored_employees(self):
+        compute_talent_matrix(self.cycle)
+        CompetencyScore.objects.filter(evaluatee=self.employees[2]).delete()
+        CompetencyScore.objects.filter(evaluatee=self.employees[0], evaluation_type='peer').update(rating_sum=20)
+
+        self.client.force_authenticate(self.manager)
+        response = self.client.post('/api/reports/talent-matrix/recompute/', {'cycle': self.cycle.pk}, format='json')
+
+        self.assertEqual(response.json(), {'cycle': self.cycle.pk, 'rows': 2})
+        self.assertEqual(self.matrix()['aysel'], (10.0, 10.0, 'high_perf_high_pot'))
+        self.assertNotIn('leyla', self.matrix())
+
+    def test_employees_see_only_their_own_row_and_cannot_recompute(self):
+        compute_talent_matrix(self.cycle)
+        self.client.force_authenticate(self.employees[0])
+
+        rows = self.client.get('/api/reports/talent-matrix/').json()
+        rows = rows['results'] if isinstance(rows, dict) else rows
+        self.assertEqual([row['employee']['id'] for row in rows], [self.employees[0].pk])
+        response = self.client.post('/api/reports/talent-matrix/recompute/', {'cycle': self.cycle.pk}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+class BenchmarkTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user('admin', 'admin@q360.az', 'pass', role='admin')
+        self.manager = User.objects.create_user('manager', 'manager@q360.az', 'pass', role='manager')
+        self.report = User.objects.create_user('report', 'report@q360.az', 'pass', manager=self.manager)
+        self.outsider = User.objects.create_user('outsider', 'outsider@q360.az', 'pass')
+        self.cycle = EvaluationCycle.objects.create(
+            name='2025 Q1', start_date=datetime.date(2025, 1, 1), end_date=datetime.date(2025, 3, 31)
+        )
+        self.competency = Competency.objects.create(name='Kommunikasiya')
+        self.client = APIClient()
+
+    def test_means_on_a_threshold_reach_that_level(self):
+        levels = bucket_scores(
+            np.array([1.99, 2, 2.99, 3, 4, 5, 3]), np.array([0, 0, 0, 0, 0, 0, 1]),
+            np.array([[2, 3, 4], [3, 3, 3]]),
+        )
+
+        self.assertEqual(levels.tolist(), [0, 1, 1, 2, 3, 3, 3])
+
+    def test_misordered_thresholds_are_rejected(self):
+        with self.assertRaises(ValueError):
+            bucket_scores(np.array([3.0]), np.array([0]), np.array([[4, 3, 2]]))
+        serializer = BenchmarkSerializer(data={'name': 'Ters', 'average_min': 4, 'good_min': 3, 'excellent_min': 2})
+        self.assertFalse(serializer.is_valid())
+
+    def test_empty_benchmarks_and_scores(self):
+        self.assertEqual(bucket_scores(np.array([]), np.array([], dtype=int), np.array([[2, 3, 4]])).tolist(), [])
+        self.assertEqual(classify_cycle(self.cycle)['benchmarks'], [])
+
+        Benchmark.objects.create(
+            name='Kommunikasiya', competency=self.competency, average_min=2, good_min=3, excellent_min=4
+        )
+        benchmark = classify_cycle(self.cycle)['benchmarks'][0]
+        self.assertEqual(benchmark['histogram'], {'below_average': 0, 'average': 0, 'good': 0, 'excellent': 0})
+        self.assertEqual(benchmark['classifications'], [])
+
+    def classified(self, user):
+        self.client.force_authenticate(user)
+        response = self.client.get('/api/reports/benchmarks/classify/', {'cycle': self.cycle.pk})
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row['level'] for row in response.json()['benchmarks'][0]['classifications']}
+
+    def test_managers_classify_only_their_reporting_line(self):
+        Benchmark.objects.create(
+            name='Kommunikasiya', competency=self.competency, average_min=2, good_min=3, excellent_min=4
+        )
+        for employee, mean in ((self.report, 3), (self.outsider, 5)):
+            CompetencyScore.objects.create(
+                cycle=self.cycle, evaluatee=employee, competency=self.competency,
+                evaluation_type='manager', answer_count=2, rating_sum=2 * mean,
+            )
+
+        # The admin result is cached first; the manager must not be served it
+        self.assertEqual(self.classified(self.admin), {self.report.pk: 'good', self.outsider.pk: 'excellent'})
+        self.assertEqual(self.classified(self.manager), {self.report.pk: 'good'})
+        self.client.force_authenticate(self.report)
+        response = self.client.get('/api/reports/benchmarks/classify/', {'cycle': self.cycle.pk})
+        self.assertEqual(response.status_code, 403)
@@ -1,20 +1,35 @@
 # reports/views.py
+import gzip
+import re
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from q360.query_planner import QueryPlanMixin
+from accounts.permissions import IsAdmin, IsManager, ReportingScopeFilter, get_permission_context
+from evaluations.models import EvaluationCycle
 from .models import ReportTemplate, GeneratedReport, Benchmark, TalentMatrix
 from .serializers import (
     ReportTemplateSerializer, GeneratedReportSerializer, 
-    BenchmarkSerializer, TalentMatrixSerializer
+    BenchmarkSerializer, TalentMatrixSerializer, GeneratedReportStatusSerializer
 )
-from accounts.models import User
-from evaluations.models import Evaluation
-from ideas.models import Idea
+from .benchmarks import GROUPINGS, get_cycle_classification
+from .dashboard import get_dashboard
+from .generation import generation_in_progress
+from .tasks import generate_report_task
+from .talent import compute_talent_matrix
+from .writers import CONTENT_TYPES
 
-class ReportTemplateViewSet(viewsets.ModelViewSet):
+class ReportTemplateViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = ReportTemplate.objects.all()
     serializer_class = ReportTemplateSerializer
     permission_classes = [IsAuthenticated]
@@ -22,7 +37,7 @@ class ReportTemplateViewSet(viewsets.ModelViewSet):
     filterset_fields = ['category', 'is_active']
     search_fields = ['name', 'description']
 
-class GeneratedReportViewSet(viewsets.ModelViewSet):
+class GeneratedReportViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = GeneratedReport.objects.all()
     serializer_class = GeneratedReportSerializer
     permission_classes = [IsAuthenticated]
@@ -31,7 +46,133 @@ class GeneratedReportViewSet(viewsets.ModelViewSet):
     search_fields = ['title']
     ordering_fields = ['generated_at']
 
-class BenchmarkViewSet(viewsets.ModelViewSet):
+    def get_queryset(self):
+        # Reports the user requested, plus those about someone in their reporting scope
+        queryset = super().get_queryset()
+        context = get_permission_context(self.request)
+        if context.is_admin:
+            return queryset
+        about_scope = context.scope(GeneratedReport.objects.all(), 'employee').values('pk')
+        return queryset.filter(Q(generated_by_id=context.user_id) | Q(pk__in=about_scope))
+
+    def _queue_generation(self, report):
+        transaction.on_commit(lambda: generate_report_task.delay(report.pk))
+
+    def perform_create(self, serializer):
+        # The file is produced in the background; clients poll `status` or wait for the notification
+        report = serializer.save(generated_by=self.request.user, status='pending')
+        self._queue_generation(report)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        response.status_code = status.HTTP_202_ACCEPTED
+        return response
+
+    @action(detail=True, methods=['get'])
+    def status(self, request, pk=None):
+        report = self.get_object()
+        return Response(GeneratedReportStatusSerializer(report).data)
+
+    @action(detail=True, methods=['post'])
+    def regenerate(self, request, pk=None):
+        report = self.get_object()
+        # A run abandoned by a dead worker stays 'running' but no longer blocks regeneration
+        in_progress = generation_in_progress(report)
+        if not in_progress:
+            # Conditional on the status read above, so two concurrent requests cannot both queue
+            in_progress = not GeneratedReport.objects.filter(pk=report.pk, status=report.status).update(
+                status='pending', progress=0, error=''
+            )
+        if in_progress:
+            return Response({'error': 'Report generation is already in progress'}, status=status.HTTP_409_CONFLICT)
+        self._queue_generation(report)
+        return Response({'message': 'Report generation queued'}, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        report = self.get_object()
+        if report.status != 'completed' or not report.file_path:
+            return Response({'error': 'Report file is not ready'}, status=status.HTTP_409_CONFLICT)
+        # Recency drives LRU eviction of the shared artifact
+        GeneratedReport.objects.filter(pk=report.pk).update(last_accessed_at=timezone.now())
+        return FileResponse(
+            default_storage.open(report.file_path, 'rb'),
+            as_attachment=True,
+            filename=report.file_path.rsplit('/', 1)[-1],
+            content_type=CONTENT_TYPES[report.format],
+        )
+
+    @action(detail=True, methods=['get'])
+    def content(self, request, pk=None):
+        """Full report body from its compressed blob, with ETag and byte-range support"""
+        report = self.get_object()
+        if not report.content_path:
+            return Response({'error': 'Report content is not ready'}, status=status.HTTP_404_NOT_FOUND)
+
+        # The gzip and identity bodies are different representations, so they get different tags
+        accepts_gzip = 'gzip' in request.headers.get('Accept-Encoding', '')
+        etag = f'"{report.content_etag}-gzip"' if accepts_gzip else f'"{report.content_etag}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponse(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+            patch_vary_headers(response, ['Accept-Encoding'])
+            return response
+
+        if not accepts_gzip:
+            # Rare clients without gzip get the decompressed body, without ranges
+            blob = default_storage.open(report.content_path, 'rb')
+            response = StreamingHttpResponse(gzip.GzipFile(fileobj=blob), content_type='application/json')
+            response['ETag'] = etag
+            patch_vary_headers(response, ['Accept-Encoding'])
+            return response
+
+        # Ranges address the stored gzip bytes, which are the representation sent
+        size = report.content_size
+        start, end = 0, size - 1
+        range_header = request.headers.get('Range')
+        if_range = request.headers.get('If-Range')
+        partial = bool(range_header) and (if_range is None or if_range == etag)
+        if partial:
+            match = re.fullmatch(r'bytes=(\d*)-(\d*)', range_header.strip())
+            first, last = match.groups() if match else ('', '')
+            # Malformed ranges (and multiple ranges) are ignored: the full body is sent
+            partial = bool(first or last) and not (first and last and int(first) > int(last))
+        if partial:
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                # A zero-length suffix selects nothing, like a start past the end
+                start = max(size - int(last), 0) if int(last) else size
+            if start >= size:
+                return HttpResponse(
+                    status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                    headers={'Content-Range': f'bytes */{size}'},
+                )
+
+        blob = default_storage.open(report.content_path, 'rb')
+        blob.seek(start)
+        length = end - start + 1
+
+        def chunks(remaining=length, block=64 * 1024):
+            with blob:
+                while remaining > 0:
+                    data = blob.read(min(block, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield data
+
+        response = StreamingHttpResponse(chunks(), content_type='application/json')
+        response['Content-Encoding'] = 'gzip'
+        response['Content-Length'] = str(length)
+        response['Accept-Ranges'] = 'bytes'
+        response['ETag'] = etag
+        patch_vary_headers(response, ['Accept-Encoding'])
+        if partial:
+            response.status_code = status.HTTP_206_PARTIAL_CONTENT
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        return response
+
+class BenchmarkViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = Benchmark.objects.all()
     serializer_class = BenchmarkSerializer
     permission_classes = [IsAuthenticated]
@@ -39,75 +180,49 @@ class BenchmarkViewSet(viewsets.ModelViewSet):
     filterset_fields = ['competency']
     search_fields = ['name', 'description']
 
-class TalentMatrixViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated, IsAdmin | IsManager])
+    def classify(self, request):
+        try:
+            cycle = EvaluationCycle.objects.get(pk=request.query_params.get('cycle'))
+        except (EvaluationCycle.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'A valid cycle is required'}, status=status.HTTP_400_BAD_REQUEST)
+        level = request.query_params.get('level', 'employee')
+        if level not in GROUPINGS:
+            return Response(
+                {'error': f"level must be one of: {', '.join(GROUPINGS)}"}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            result = get_cycle_classification(cycle, level, get_permission_context(request))
+        except ValueError as exc:
+            # Thresholds saved out of order before the serializer checked them
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        if request.query_params.get('histograms_only') in ('1', 'true'):
+            result = {**result, 'benchmarks': [
+                {key: value for key, value in benchmark.items() if key != 'classifications'}
+                for benchmark in result['benchmarks']
+            ]}
+        return Response(result)
+
+class TalentMatrixViewSet(QueryPlanMixin, viewsets.ModelViewSet):
     queryset = TalentMatrix.objects.all()
     serializer_class = TalentMatrixSerializer
     permission_classes = [IsAuthenticated]
-    filter_backends = [DjangoFilterBackend]
+    filter_backends = [ReportingScopeFilter, DjangoFilterBackend]
+    scope_field = 'employee'
     filterset_fields = ['employee', 'cycle', 'quadrant']
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin | IsManager])
+    def recompute(self, request):
+        try:
+            cycle = EvaluationCycle.objects.get(pk=request.data.get('cycle'))
+        except (EvaluationCycle.DoesNotExist, ValueError, TypeError):
+            return Response({'error': 'A valid cycle is required'}, status=status.HTTP_400_BAD_REQUEST)
+        written = compute_talent_matrix(cycle)
+        return Response({'cycle': cycle.pk, 'rows': written})
+
 class DashboardViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
     
     def list(self, request):
-        user = request.user
-        
-        # Get dashboard summary data
-        if user.is_admin:
-            # Admin dashboard data
-            total_users = User.objects.count()
-            total_ideas = Idea.objects.count()
-            total_evaluations = Evaluation.objects.count()
-            pending_evaluations = Evaluation.objects.filter(is_submitted=False).count()
-            
-            data = {
-                'total_users': total_users,
-                'total_ideas': total_ideas,
-                'total_evaluations': total_evaluations,
-                'pending_evaluations': pending_evaluations,
-                'recent_activities': [
-                    {'text': 'Yeni istifadəçi qeydiyyatdan keçdi', 'time': '2 saat əvvəl'},
-                    {'text': 'Yeni fikir təqdim edildi', 'time': '5 saat əvvəl'},
-                    {'text': 'Qiymətləndirmə tamamlandı', 'time': '1 gün əvvəl'},
-                ]
-            }
-        elif user.is_manager:
-            # Manager dashboard data
-            team_members = User.objects.filter(manager=user).count()
-            team_evaluations = Evaluation.objects.filter(evaluatee__manager=user).count()
-            pending_team_evaluations = Evaluation.objects.filter(
-                evaluatee__manager=user, 
-                is_submitted=False
-            ).count()
-            
-            data = {
-                'team_members': team_members,
-                'team_evaluations': team_evaluations,
-                'pending_team_evaluations': pending_team_evaluations,
-                'team_performance': 85,  # Mock data
-                'recent_activities': [
-                    {'text': 'Komanda üzvü qiymətləndirməsini tamamladı', 'time': '3 saat əvvəl'},
-                    {'text': 'Yeni komanda yaradıldı', 'time': '1 gün əvvəl'},
-                ]
-            }
-        else:
-            # Employee dashboard data
-            my_evaluations = Evaluation.objects.filter(evaluatee=user).count()
-            pending_evaluations = Evaluation.objects.filter(
-                evaluatee=user, 
-                is_submitted=False
-            ).count()
-            my_ideas = Idea.objects.filter(submitter=user).count()
-            
-            data = {
-                'my_evaluations': my_evaluations,
-                'pending_my_evaluations': pending_evaluations,
-                'my_ideas': my_ideas,
-                'performance_score': 78,  # Mock data
-                'recent_activities': [
-                    {'text': 'Qiymətləndirmə forması tamamlandı', 'time': '2 saat əvvəl'},
-                    {'text': 'Yeni fikir təqdim edildi', 'time': '1 gün əvvəl'},
-                ]
-            }
-        
-        return Response(data)
\ No newline at end of file
+        # Role-specific counters, scores and recent activity from a cached snapshot
+        return Response(get_dashboard(request.user))
@@ -0,0 +1,182 @@
+# reports/writers.py
+"""
+Writers turning rows (lists of cells) into report files.
+
+The CSV and XLSX writers consume their rows one at a time and write straight
+to the target file object, so memory use does not depend on the number of
+rows. PDF files are laid out with fpdf2.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, datetime
+from itertools import chain
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from fpdf import FPDF
+
+FILE_EXTENSIONS = {'csv': 'csv', 'excel': 'xlsx', 'pdf': 'pdf'}
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'excel': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'pdf': 'application/pdf',
+}
+# DejaVu Sans covers the Azerbaijani alphabet; see fonts/LICENSE
+DEFAULT_PDF_FONT = Path(__file__).resolve().parent / 'fonts' / 'DejaVuSans.ttf'
+
+
+def write_csv(rows, fileobj):
+    """Write rows to a binary file object as UTF-8 CSV (with BOM for Excel)"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='', write_through=True)
+    writer = csv.writer(text)
+    for row in rows:
+        writer.writerow(row)
+    text.detach()
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(65 + remainder) + name
+    return name
+
+
+def _xlsx_cell(reference, value):
+    if value is None or value == '':
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    if isinstance(value, (date, datetime)):
+        value = value.isoformat()
+    # Inline strings avoid a shared-strings table that would grow with the sheet
+    text = escape(str(value))
+    return f'<c r="{reference}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+class XlsxWriter:
+    """Single-sheet XLSX writer streaming rows into the zip archive.
+
+    Usage: ``with XlsxWriter(fileobj) as sheet: sheet.write_row([...])``.
+    ``fileobj`` only needs ``write`` (and ``tell``/``flush``); a
+    non-seekable stream is fine.
+    """
+
+    CONTENT_TYPES_XML = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    )
+    ROOT_RELS_XML = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    )
+    WORKBOOK_XML = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{name}" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    )
+    WORKBOOK_RELS_XML = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    )
+
+    def __init__(self, fileobj, sheet_name='Report'):
+        self.archive = zipfile.ZipFile(fileobj, 'w', compression=zipfile.ZIP_DEFLATED)
+        self.archive.writestr('[Content_Types].xml', self.CONTENT_TYPES_XML)
+        self.archive.writestr('_rels/.rels', self.ROOT_RELS_XML)
+        # Excel rejects sheet names with these characters or longer than 31
+        sheet_name = re.sub(r'[\[\]:*?/\\]', ' ', sheet_name)[:31] or 'Report'
+        self.archive.writestr('xl/workbook.xml', self.WORKBOOK_XML.format(name=escape(sheet_name)))
+        self.archive.writestr('xl/_rels/workbook.xml.rels', self.WORKBOOK_RELS_XML)
+        self.sheet = self.archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True)
+        self._write(
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+        )
+        self.row_count = 0
+
+    def _write(self, text):
+        self.sheet.write(text.encode('utf-8'))
+
+    def write_row(self, values):
+        self.row_count += 1
+        cells = ''.join(
+            _xlsx_cell(f'{_column_name(index)}{self.row_count}', value)
+            for index, value in enumerate(values)
+        )
+        self._write(f'<row r="{self.row_count}">{cells}</row>')
+
+    def close(self):
+        self._write('</sheetData></worksheet>')
+        self.sheet.close()
+        self.archive.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def write_xlsx(rows, fileobj, sheet_name='Report'):
+    with XlsxWriter(fileobj, sheet_name) as sheet:
+        for row in rows:
+            sheet.write_row(row)
+
+
+def write_pdf(rows, fileobj, title='', lines_per_page=50, font_path=DEFAULT_PDF_FONT):
+    """Write rows as plain text lines on A4 pages.
+
+    fpdf2 embeds a subset of the TrueType font at ``font_path`` with the
+    glyphs used and a ToUnicode map, so Azerbaijani letters (ə, ş, ğ, ı...)
+    render, search and copy everywhere. Unlike the other writers the document
+    is assembled in memory before it is written.
+    """
+    pdf = FPDF(unit='pt', format='A4')
+    pdf.set_auto_page_break(False)
+    pdf.add_font('Report', fname=str(font_path))
+    pdf.set_font('Report', size=9)
+    lines = chain([title, ''] if title else [], (
+        '   '.join('' if cell is None else str(cell) for cell in row) for row in rows
+    ))
+    for index, line in enumerate(lines):
+        if index % lines_per_page == 0:
+            pdf.add_page()
+        if line:
+            pdf.text(40, 42 + index % lines_per_page * 12, line)
+    if not pdf.page:
+        pdf.add_page()
+    fileobj.write(pdf.output())
+
+
+def write_rows(report_format, rows, fileobj, title='', pdf_font=DEFAULT_PDF_FONT):
+    if report_format == 'csv':
+        write_csv(rows, fileobj)
+    elif report_format == 'excel':
+        write_xlsx(rows, fileobj, sheet_name=title or 'Report')
+    elif report_format == 'pdf':
+        write_pdf(rows, fileobj, title=title, font_path=pdf_font)
+    else:
+        raise ValueError(f'Unsupported report format: {report_format}')